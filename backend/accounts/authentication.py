@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+CHAMPS_PROFIL = (
+    'id', 'email', 'username', 'nom', 'prenom', 'role', 'magasin_id',
+    'is_active', 'is_staff', 'is_superuser',
+)
+# CHAMPS_PROFIL dans l'ordre des colonnes, attendu par Model.from_db
+_CHAMPS_MODELE = [champ.attname for champ in User._meta.concrete_fields if champ.attname in CHAMPS_PROFIL]
+# Claims posés par CustomTokenObtainPairSerializer.get_token et au refresh
+CLAIMS_PROFIL = ('email', 'username', 'nom', 'prenom', 'role', 'magasin_id', 'is_staff', 'is_superuser')
+CLAIM_DATE_PROFIL = 'profil_at'
+CLAIM_VERSION_PROFIL = 'profil_v'
+
+CLE_GENERATION = 'auth:profils:generation'
+
+
+def _cle_version(user_id):
+    return f'auth:profil:{user_id}:version'
+
+
+def version_profil(user_id):
+    """
+    Version courante du profil, lue dans le cache partagé entre processus :
+    compteur entier de l'utilisateur, incrémenté à chaque modification, et
+    génération commune, incrémentée quand un magasin change. Une clé absente
+    (jamais créée ou évincée) repart d'une valeur aléatoire : aucun token ni
+    profil antérieur ne peut lui correspondre. None si le cache n'en garde rien.
+    """
+    cles = [CLE_GENERATION, _cle_version(user_id)]
+    valeurs = cache.get_many(cles)
+    if len(valeurs) < len(cles):
+        for cle in cles:
+            if cle not in valeurs:
+                cache.add(cle, random.getrandbits(48), timeout=None)
+        valeurs = cache.get_many(cles)
+        if len(valeurs) < len(cles):
+            return None
+    return f'{valeurs[cles[0]]}.{valeurs[cles[1]]}'
+
+
+def _incrementer(cle):
+    try:
+        cache.incr(cle)
+    except ValueError:
+        # Clé absente : la prochaine lecture la recrée avec une autre valeur
+        pass
+
+
+class CacheProfils:
+    """
+    Profils utilisateur (dict de CHAMPS_PROFIL, magasin_nom et version) en
+    mémoire du processus, expirés après `ttl` secondes, au plus `taille_max`
+    entrées (LRU). Un profil n'est servi que si sa version est la version
+    courante du cache partagé : une modification faite par un autre processus
+    l'écarte aussitôt.
+    """
+
+    def __init__(self, ttl, taille_max):
+        self.ttl = ttl
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._profils = OrderedDict()
+
+    def get(self, user_id, version):
+        if version is None:
+            return None
+        with self._verrou:
+            entree = self._profils.get(user_id)
+            if entree is None:
+                return None
+            profil, expiration = entree
+            if expiration < time.monotonic() or profil['version'] != version:
+                del self._profils[user_id]
+                return None
+            self._profils.move_to_end(user_id)
+            return profil
+
+    def set(self, user_id, profil):
+        if profil['version'] is None:
+            return
+        with self._verrou:
+            self._profils[user_id] = (profil, time.monotonic() + self.ttl)
+            self._profils.move_to_end(user_id)
+            while len(self._profils) > self.taille_max:
+                self._profils.popitem(last=False)
+
+    def invalider(self, user_id):
+        with self._verrou:
+            self._profils.pop(user_id, None)
+
+    def vider(self):
+        with self._verrou:
+            self._profils.clear()
+
+
+profils = CacheProfils(
+    ttl=getattr(settings, 'AUTH_PROFIL_TTL', 300),
+    taille_max=getattr(settings, 'AUTH_PROFIL_TAILLE_MAX', 10000),
+)
+
+
+def profil(user_id, version=None):
+    """Profil de l'utilisateur, depuis le cache ou la base ; None s'il n'existe pas"""
+    if version is None:
+        version = version_profil(user_id)
+    resultat = profils.get(user_id, version)
+    if resultat is None:
+        # Version lue avant la base : une modification concurrente l'incrémente
+        # et le profil lu ici ne sera plus servi
+        resultat = User.objects.filter(id=user_id).values(*CHAMPS_PROFIL, magasin_nom=F('magasin__nom')).first()
+        if resultat is not None:
+            resultat['version'] = version
+            profils.set(user_id, resultat)
+    return resultat
+
+
+def invalider_profil(user_id):
+    _incrementer(_cle_version(user_id))
+    profils.invalider(user_id)
+
+
+def invalider_profils():
+    """Tous les profils (nom de magasin modifié)"""
+    _incrementer(CLE_GENERATION)
+    profils.vider()
+
+
+def ecrire_claims(token, profil):
+    """Pose les claims de profil sur un token, avec la version du profil lu"""
+    for claim in CLAIMS_PROFIL:
+        token[claim] = profil[claim]
+    # Chaîne, comme dans la réponse de connexion
+    token['magasin_id'] = str(profil['magasin_id']) if profil['magasin_id'] else None
+    token[CLAIM_VERSION_PROFIL] = profil['version']
+    token[CLAIM_DATE_PROFIL] = int(time.time())
+
+
+def _profil_des_claims(token, user_id, version):
+    """
+    Profil lu dans les claims s'ils portent la version courante du profil et
+    ont été posés depuis moins de AUTH_PROFIL_TTL secondes. Sinon None.
+    """
+    if version is None or token.get(CLAIM_VERSION_PROFIL) != version:
+        return None
+    date = token.get(CLAIM_DATE_PROFIL)
+    if date is None or date < time.time() - profils.ttl or any(claim not in token for claim in CLAIMS_PROFIL):
+        return None
+    donnees = {claim: token[claim] for claim in CLAIMS_PROFIL}
+    donnees['magasin_id'] = int(donnees['magasin_id']) if donnees['magasin_id'] else None
+    # Un compte inactif ne peut ni se connecter ni rafraîchir son token
+    return dict(donnees, id=user_id, is_active=True)
+
+
+def utilisateur(profil):
+    """
+    Instance User construite sans requête, utilisable en clé étrangère. Les
+    champs hors profil sont différés (chargés à la demande). Ses valeurs
+    peuvent dater de l'émission du token : User.save() la refuse.
+    """
+    user = User.from_db('default', _CHAMPS_MODELE, [profil[champ] for champ in _CHAMPS_MODELE])
+    user.depuis_token = True
+    return user
+
+
+class JWTProfilAuthentication(JWTAuthentication):
+    """
+    Authentification JWT sans requête en base : l'utilisateur est construit
+    depuis le cache de profils ou les claims du token s'ils sont à la version
+    courante (une lecture du cache partagé), sinon depuis la base.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Le token ne contient aucun identifiant d'utilisateur reconnu.")
+
+        version = version_profil(user_id)
+        donnees = (
+            profils.get(user_id, version)
+            or _profil_des_claims(validated_token, user_id, version)
+            or profil(user_id, version)
+        )
+        if donnees is None:
+            raise AuthenticationFailed('Utilisateur introuvable.', code='user_not_found')
+        if not donnees['is_active']:
+            raise AuthenticationFailed('Compte utilisateur désactivé.', code='user_inactive')
+        return utilisateur(donnees)
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from accounts.views import CustomTokenObtainPairView
+
+EMAIL = 'bench-login@stockpro.invalid'
+MOT_DE_PASSE = 'Bench-login-2024'
+
+
+class _Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le temps CPU d'une connexion sur /api/auth/login/, comparé au coût "
+        "d'un hachage du hacheur configuré. Un utilisateur temporaire est créé puis "
+        "supprimé (transaction annulée)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        if n < 1:
+            raise CommandError("--requests doit être au moins 1")
+        try:
+            with transaction.atomic():
+                self._mesurer(n)
+                raise _Annulation
+        except _Annulation:
+            pass
+
+    def _mesurer(self, n):
+        user = get_user_model().objects.create_user(EMAIL, MOT_DE_PASSE, nom='Bench', prenom='Login')
+        hasher = get_hasher()
+        self.stdout.write(f"Hacheur : {hasher.algorithm}")
+
+        debut = time.process_time()
+        for _ in range(n):
+            user.check_password(MOT_DE_PASSE)
+        par_hachage = (time.process_time() - debut) / n
+
+        vue = CustomTokenObtainPairView.as_view()
+        factory = APIRequestFactory()
+        # Première connexion hors mesure (chargement paresseux, conversion de hachage)
+        vue(factory.post('/api/auth/login/', {'email': EMAIL, 'password': MOT_DE_PASSE}, format='json'))
+
+        requetes = 0
+        debut_cpu, debut_mur = time.process_time(), time.perf_counter()
+        for _ in range(n):
+            with CaptureQueriesContext(connection) as contexte:
+                reponse = vue(factory.post('/api/auth/login/', {'email': EMAIL, 'password': MOT_DE_PASSE}, format='json'))
+            if reponse.status_code != 200:
+                raise CommandError(f"Connexion refusée ({reponse.status_code}) : {reponse.data}")
+            requetes += len(contexte.captured_queries)
+        par_connexion = (time.process_time() - debut_cpu) / n
+        mur = (time.perf_counter() - debut_mur) / n
+
+        self.stdout.write(f"Hachage seul : {par_hachage * 1000:.1f} ms CPU")
+        self.stdout.write(
+            f"Connexion : {par_connexion * 1000:.1f} ms CPU, {mur * 1000:.1f} ms écoulées, "
+            f"{requetes / n:.1f} requête(s) SQL, soit {par_connexion / par_hachage:.2f} hachage(s) par connexion"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from accounts.tokens import statistiques_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les refresh tokens expirés et leur révocation, par lots pour "
+        "ne pas verrouiller les tables longtemps. À planifier (cron) : sans "
+        "purge, chaque connexion et chaque rotation font grossir les tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être strictement positif")
+        self._statistiques('Avant')
+
+        # BlacklistedToken est supprimé en cascade
+        expires = OutstandingToken.objects.filter(expires_at__lt=timezone.now()).order_by('id')
+        total = 0
+        while True:
+            ids = list(expires.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+
+        self._statistiques('Après')
+        self.stdout.write(self.style.SUCCESS(f"{total} ligne(s) supprimée(s)"))
+
+    def _statistiques(self, moment):
+        stats = statistiques_tokens()
+        self.stdout.write(
+            f"{moment} : {stats['outstanding']} token(s) émis, {stats['blacklisted']} révoqué(s), "
+            f"{stats['expires']} expiré(s)"
+        )
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+NOM_INDEX = 'outstanding_expires_at_idx'
+
+
+def _index():
+    return models.Index(fields=['expires_at'], name=NOM_INDEX)
+
+
+def creer_index(apps, schema_editor):
+    # Table de rest_framework_simplejwt.token_blacklist : l'index est posé
+    # ici pour ne pas modifier les migrations de l'application tierce
+    schema_editor.add_index(apps.get_model('token_blacklist', 'OutstandingToken'), _index())
+
+
+def supprimer_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('token_blacklist', 'OutstandingToken'), _index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_user_role'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
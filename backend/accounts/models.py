@@ -1,11 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import UserManager as BaseUserManager
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
 class UserManager(BaseUserManager):
+    def get_by_natural_key(self, username):
+        # Utilisé par ModelBackend à la connexion : le magasin est servi avec
+        # l'utilisateur pour les claims du token et la réponse
+        return self.select_related('magasin').get(**{self.model.USERNAME_FIELD: username})
+    
     def create_user(self, email, password=None, **extra_fields):
         """
         Crée et sauvegarde un utilisateur avec l'email donné.
@@ -81,6 +87,10 @@ class User(AbstractUser):
             })
     
     def save(self, *args, **kwargs):
+        # Instance de request.user construite depuis le token (authentication.utilisateur)
+        if getattr(self, 'depuis_token', False):
+            raise TypeError("Utilisateur issu du token : le recharger depuis la base avant de l'enregistrer.")
+        
         # Générer un username basé sur l'email si vide
         if not self.username:
             self.username = self.email.split('@')[0]
@@ -103,6 +113,27 @@ class User(AbstractUser):
             return self.image.url
         return None
 
+@receiver([post_save, post_delete], sender=User)
+def invalider_profil_utilisateur(sender, instance, update_fields=None, **kwargs):
+    """Le profil en cache et les claims déjà émis ne font plus foi"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    from .authentication import invalider_profil
+    invalider_profil(instance.id)
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalider_profil_revoque(sender, instance, created, **kwargs):
+    """Un token révoqué (déconnexion, rotation) force la relecture du profil"""
+    if created and instance.token.user_id is not None:
+        from .authentication import invalider_profil
+        invalider_profil(instance.token.user_id)
+
+@receiver(post_save, sender='stores.Magasin')
+def invalider_profils_magasin(sender, **kwargs):
+    """Les profils en cache portent le nom du magasin"""
+    from .authentication import invalider_profils
+    invalider_profils()
+
 @receiver(post_delete, sender=User)
 def delete_user_presences(sender, instance, **kwargs):
     """Supprimer automatiquement les présences quand un utilisateur est supprimé"""
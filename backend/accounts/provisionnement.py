@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from stores.models import Magasin
+from .models import User
+from .serializers import UtilisateurLotSerializer
+
+TAILLE_MAX_LOT = 500
+
+
+class Provisionnement:
+    """
+    Création d'utilisateurs en lot : validation de toutes les lignes en une
+    passe (une requête pour les emails existants, une pour les magasins),
+    hachage des mots de passe en parallèle puis un seul bulk_create.
+
+    Tout ou rien : si une ligne est invalide, aucun utilisateur n'est créé et
+    `erreurs` indique le problème de chaque ligne (index à partir de 0).
+    """
+
+    def __init__(self, createur):
+        self.createur = createur
+        self.erreurs = []
+
+    def _erreur(self, index, detail):
+        self.erreurs.append({'ligne': index, 'erreurs': detail})
+
+    def valider(self, lignes):
+        """Retourne la liste des (index, User non sauvegardé, mot de passe) ; remplit self.erreurs"""
+        valides = {}
+        for index, ligne in enumerate(lignes):
+            serializer = UtilisateurLotSerializer(data=ligne)
+            if not serializer.is_valid():
+                self._erreur(index, serializer.errors)
+                continue
+            donnees = dict(serializer.validated_data)
+            donnees['email'] = User.objects.normalize_email(donnees['email'])
+            if donnees['email'].lower() in valides:
+                self._erreur(index, {'email': ['Email en double dans le lot.']})
+                continue
+            # Avant la recherche des magasins : fixe celui des lignes d'un manager
+            erreur = self._hors_perimetre(donnees)
+            if erreur:
+                self._erreur(index, erreur)
+                continue
+            valides[donnees['email'].lower()] = (index, donnees)
+
+        existants = {
+            email.lower() for email in
+            User.objects.filter(email__in=[d['email'] for _, d in valides.values()]).values_list('email', flat=True)
+        }
+        magasins = Magasin.objects.in_bulk({d['magasin'] for _, d in valides.values() if d.get('magasin')})
+
+        utilisateurs = []
+        for cle, (index, donnees) in valides.items():
+            if cle in existants:
+                self._erreur(index, {'email': ['Un utilisateur avec cet email existe déjà.']})
+                continue
+            magasin_id = donnees.pop('magasin', None)
+            if magasin_id and magasin_id not in magasins:
+                self._erreur(index, {'magasin': ['Magasin introuvable.']})
+                continue
+            mot_de_passe = donnees.pop('password')
+            # Magasin déjà chargé : clean() ne le relit pas ligne par ligne
+            user = User(magasin=magasins[magasin_id] if magasin_id else None, **donnees)
+            if not user.username:
+                user.username = user.email.split('@')[0]
+            if user.role == 'admin':
+                user.magasin = None
+            try:
+                # Règles de User.clean() (rôle/magasin) ; l'unicité de l'email
+                # et l'existence du magasin sont vérifiées ci-dessus, en bloc
+                user.clean_fields(exclude=['password', 'magasin', 'image'])
+                user.clean()
+            except ValidationError as e:
+                self._erreur(index, e.message_dict)
+                continue
+            utilisateurs.append((index, user, mot_de_passe))
+        self.erreurs.sort(key=lambda erreur: erreur['ligne'])
+        return utilisateurs
+
+    def _hors_perimetre(self, donnees):
+        """Un manager ne crée que des employés de son magasin"""
+        if self.createur.role == 'admin':
+            return None
+        if donnees['role'] != 'employe':
+            return {'role': ['Un manager ne peut créer que des employés.']}
+        if donnees.get('magasin') not in (None, self.createur.magasin_id):
+            return {'magasin': ['Magasin hors de votre périmètre.']}
+        donnees['magasin'] = self.createur.magasin_id
+        return None
+
+    def creer(self, lignes):
+        """Crée les utilisateurs si toutes les lignes sont valides ; retourne la liste créée"""
+        utilisateurs = self.valider(lignes)
+        if self.erreurs or not utilisateurs:
+            return []
+
+        workers = getattr(settings, 'AUTH_HACHAGE_WORKERS', None) or os.cpu_count() or 1
+        # PBKDF2 (hashlib) libère le GIL : les hachages s'exécutent en parallèle
+        with ThreadPoolExecutor(max_workers=min(workers, len(utilisateurs))) as pool:
+            hachages = pool.map(make_password, [mot_de_passe for _, _, mot_de_passe in utilisateurs])
+            for (_, user, _), hachage in zip(utilisateurs, hachages):
+                user.password = hachage
+
+        emails = [user.email for _, user, _ in utilisateurs]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user, _ in utilisateurs], batch_size=500)
+                # bulk_create n'émet pas post_save : listes de managers à recalculer
+                from stock.notifications import invalider
+                transaction.on_commit(invalider)
+        except IntegrityError:
+            # Email créé entre la validation et l'insertion (requête concurrente)
+            existants = {email.lower() for email in User.objects.filter(email__in=emails).values_list('email', flat=True)}
+            if not existants:
+                raise
+            for index, user, _ in utilisateurs:
+                if user.email.lower() in existants:
+                    self._erreur(index, {'email': ['Un utilisateur avec cet email existe déjà.']})
+            return []
+
+        # Les clés générées ne sont pas renvoyées par MySQL : relecture par email
+        return list(User.objects.select_related('magasin').filter(email__in=emails).order_by('id'))
@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
+from django.utils import timezone
+from .authentication import CLAIMS_PROFIL, ecrire_claims, profil, version_profil
 from .models import User
+from .tokens import RefreshTokenRevocable
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'email'
@@ -12,37 +17,71 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         self.fields.pop('username', None)
     
     def validate(self, attrs):
-        email = attrs.get('email')
-        password = attrs.get('password')
+        """
+        Authentifie une seule fois (un seul hachage du mot de passe) et
+        conserve l'utilisateur dans self.user pour la réponse de la vue.
+        """
+        user = authenticate(request=self.context.get('request'),
+                            username=attrs['email'], password=attrs['password'])
         
-        if email and password:
-            user = authenticate(request=self.context.get('request'),
-                              username=email, password=password)
-            
-            if not user:
-                raise serializers.ValidationError('Email ou mot de passe incorrect.')
-            
-            if not user.is_active:
-                raise serializers.ValidationError('Compte utilisateur désactivé.')
-            
-            # Utiliser l'email comme username pour la validation parent
-            attrs['username'] = email
-            
-        return super().validate(attrs)
+        if not user:
+            raise serializers.ValidationError('Email ou mot de passe incorrect.')
+        
+        if not user.is_active:
+            raise serializers.ValidationError('Compte utilisateur désactivé.')
+        
+        self.user = user
+        refresh = self.get_token(user)
+        
+        if api_settings.UPDATE_LAST_LOGIN:
+            # UPDATE direct : User.save() relancerait full_clean à chaque connexion
+            user.last_login = timezone.now()
+            User.objects.filter(pk=user.pk).update(last_login=user.last_login)
+        
+        return {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }
     
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         
-        # Ajouter des claims personnalisés
-        token['email'] = user.email
-        token['role'] = user.role
-        token['nom'] = user.nom
-        token['prenom'] = user.prenom
-        token['magasin_id'] = str(user.magasin.id) if user.magasin else None
+        # Claims de profil, lus par JWTProfilAuthentication sans requête,
+        # pris sur l'utilisateur déjà chargé par authenticate()
+        donnees = {claim: getattr(user, claim) for claim in CLAIMS_PROFIL}
+        donnees['version'] = version_profil(user.id)
+        ecrire_claims(token, donnees)
         
         return token
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh qui réécrit les claims de profil d'après le profil courant"""
+    token_class = RefreshTokenRevocable
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        rotation = api_settings.ROTATE_REFRESH_TOKENS
+        
+        # Révoquer avant de relire le profil : la révocation l'invalide
+        if rotation and api_settings.BLACKLIST_AFTER_ROTATION:
+            refresh.blacklist()
+        
+        donnees = profil(refresh[api_settings.USER_ID_CLAIM])
+        if donnees is None or not donnees['is_active']:
+            raise AuthenticationFailed('Compte utilisateur désactivé ou supprimé.', code='user_inactive')
+        ecrire_claims(refresh, donnees)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if rotation:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        
+        return data
+
 class UserSerializer(serializers.ModelSerializer):
     image_url = serializers.ReadOnlyField()
     magasin_id = serializers.SerializerMethodField()
@@ -85,6 +124,16 @@ class UserCreateSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+class UtilisateurLotSerializer(serializers.Serializer):
+    """Ligne de création en lot : magasin par id, vérifié en bloc par Provisionnement"""
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(write_only=True, min_length=6)
+    nom = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    prenom = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, default='employe')
+    magasin = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    username = serializers.CharField(max_length=150, required=False, allow_blank=True)
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
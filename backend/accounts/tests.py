@@ -0,0 +1,138 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from stores.models import Magasin
+from .authentication import JWTProfilAuthentication, profils, version_profil
+from .models import User
+from .provisionnement import Provisionnement
+from .serializers import CustomTokenObtainPairSerializer
+
+
+class CreationEnLotTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.magasin = Magasin.objects.create(nom='Magasin 1', adresse='1 rue', latitude=0, longitude=0)
+        cls.autre_magasin = Magasin.objects.create(nom='Magasin 2', adresse='2 rue', latitude=0, longitude=0)
+        cls.manager = User.objects.create_user(
+            'manager@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='manager', magasin=cls.magasin
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.manager)
+
+    def test_manager_sans_magasin_dans_les_lignes(self):
+        lignes = [{'email': f'employe{i}@x.fr', 'password': 'motdepasse', 'nom': 'E', 'prenom': str(i)} for i in range(3)]
+        reponse = self.client.post('/api/auth/users/bulk/', lignes, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+        self.assertEqual(len(reponse.data), 3)
+        self.assertEqual(
+            set(User.objects.filter(email__startswith='employe').values_list('magasin_id', flat=True)),
+            {self.magasin.id},
+        )
+
+    def test_manager_hors_perimetre(self):
+        lignes = [
+            {'email': 'a@x.fr', 'password': 'motdepasse', 'magasin': self.autre_magasin.id},
+            {'email': 'b@x.fr', 'password': 'motdepasse', 'role': 'manager'},
+            {'email': 'c@x.fr', 'password': 'motdepasse'},
+        ]
+        reponse = self.client.post('/api/auth/users/bulk/', lignes, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([erreur['ligne'] for erreur in reponse.data['erreurs']], [0, 1])
+        self.assertFalse(User.objects.filter(email__in=['a@x.fr', 'b@x.fr', 'c@x.fr']).exists())
+
+    def test_email_cree_pendant_le_lot(self):
+        valider = Provisionnement.valider
+
+        def valider_puis_concurrent(provisionnement, lignes):
+            utilisateurs = valider(provisionnement, lignes)
+            User.objects.create_user('employe1@x.fr', 'motdepasse', nom='E', prenom='1', role='employe', magasin=self.magasin)
+            return utilisateurs
+
+        lignes = [{'email': f'employe{i}@x.fr', 'password': 'motdepasse', 'nom': 'E', 'prenom': str(i)} for i in range(3)]
+        with patch.object(Provisionnement, 'valider', valider_puis_concurrent):
+            reponse = self.client.post('/api/auth/users/bulk/', lignes, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([erreur['ligne'] for erreur in reponse.data['erreurs']], [1])
+        self.assertEqual(list(User.objects.filter(email__startswith='employe').values_list('email', flat=True)), ['employe1@x.fr'])
+
+    def test_magasins_des_managers_lus_en_bloc(self):
+        admin = User.objects.create_user('admin@x.fr', 'motdepasse', nom='A', prenom='A', role='admin')
+        self.client.force_authenticate(admin)
+
+        def requetes(nombre):
+            lignes = [
+                {'email': f'manager{nombre}-{i}@x.fr', 'password': 'motdepasse', 'role': 'manager',
+                 'magasin': [self.magasin.id, self.autre_magasin.id][i % 2]}
+                for i in range(nombre)
+            ]
+            with CaptureQueriesContext(connection) as contexte:
+                reponse = self.client.post('/api/auth/users/bulk/', lignes, format='json')
+            self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+            return len(contexte.captured_queries)
+
+        self.assertEqual(requetes(2), requetes(6))
+
+
+class AuthentificationProfilTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.magasin = Magasin.objects.create(nom='Magasin 1', adresse='1 rue', latitude=0, longitude=0)
+        cls.user = User.objects.create_user(
+            'employe@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='employe', magasin=cls.magasin
+        )
+
+    def setUp(self):
+        cache.clear()
+        profils.vider()
+
+    def _token(self):
+        reponse = self.client.post('/api/auth/login/', {'email': 'employe@x.fr', 'password': 'motdepasse'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK, reponse.data)
+        return AccessToken(reponse.data['access'])
+
+    def test_utilisateur_du_token_non_enregistrable(self):
+        user = JWTProfilAuthentication().get_user(self._token())
+        self.assertEqual(user.magasin_id, self.magasin.id)
+        # Champ hors profil : chargé depuis la base plutôt que vide
+        self.assertIsNotNone(user.password)
+        self.assertTrue(user.check_password('motdepasse'))
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_modification_par_un_autre_processus(self):
+        token = self._token()
+        self.assertEqual(JWTProfilAuthentication().get_user(token).nom, 'Nom')
+
+        # Modification faite ailleurs : seul le cache partagé en garde trace
+        User.objects.filter(pk=self.user.pk).update(nom='Autre')
+        cache.incr(f'auth:profil:{self.user.pk}:version')
+        with self.assertNumQueries(1):
+            self.assertEqual(JWTProfilAuthentication().get_user(token).nom, 'Autre')
+
+    def test_versions_successives_distinctes(self):
+        token = self._token()
+        version = version_profil(self.user.pk)
+        self.assertEqual(token['profil_v'], version)
+        self.user.refresh_from_db()
+        self.user.nom = 'Autre'
+        self.user.save()
+        self.assertNotEqual(version_profil(self.user.pk), version)
+        # Même milliseconde que l'émission : les claims ne sont plus crus
+        with self.assertNumQueries(1):
+            self.assertEqual(JWTProfilAuthentication().get_user(token).nom, 'Autre')
+
+    def test_claims_de_connexion_sans_relecture_du_profil(self):
+        with CaptureQueriesContext(connection) as contexte:
+            token = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.assertFalse([requete for requete in contexte.captured_queries if 'accounts_user' in requete['sql']])
+        self.assertEqual((token['nom'], token['magasin_id']), ('Nom', str(self.magasin.id)))
+        self.assertEqual(token['profil_v'], version_profil(self.user.pk))
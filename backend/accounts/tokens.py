@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Revocations:
+    """
+    JTI révoqués déjà vus par ce processus (LRU de `taille_max` entrées).
+    Une révocation étant définitive, seule la présence est mise en cache :
+    un JTI absent est toujours vérifié en base.
+    """
+
+    def __init__(self, taille_max):
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._jtis = OrderedDict()
+
+    def __contains__(self, jti):
+        with self._verrou:
+            if jti not in self._jtis:
+                return False
+            self._jtis.move_to_end(jti)
+            return True
+
+    def __len__(self):
+        with self._verrou:
+            return len(self._jtis)
+
+    def ajouter(self, jti):
+        with self._verrou:
+            self._jtis[jti] = None
+            self._jtis.move_to_end(jti)
+            while len(self._jtis) > self.taille_max:
+                self._jtis.popitem(last=False)
+
+
+revocations = Revocations(getattr(settings, 'AUTH_REVOCATIONS_TAILLE_MAX', 10000))
+
+
+class RefreshTokenRevocable(RefreshToken):
+    """RefreshToken dont la vérification de révocation passe d'abord par `revocations`"""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in revocations:
+            raise TokenError(_('Token is blacklisted'))
+        try:
+            super().check_blacklist()
+        except TokenError:
+            revocations.ajouter(jti)
+            raise
+
+    def blacklist(self):
+        resultat = super().blacklist()
+        revocations.ajouter(self.payload[api_settings.JTI_CLAIM])
+        return resultat
+
+
+def statistiques_tokens():
+    """Taille des tables de révocation, à surveiller avec la latence du refresh"""
+    return {
+        'outstanding': OutstandingToken.objects.count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+        'expires': OutstandingToken.objects.filter(expires_at__lt=timezone.now()).count(),
+        'revocations_en_memoire': len(revocations),
+    }
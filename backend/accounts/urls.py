@@ -7,7 +7,9 @@ urlpatterns = [
     path('login/', views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('logout/', views.logout_view, name='logout'),
     path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('tokens/stats/', views.token_stats_view, name='token_stats'),
     path('me/', views.current_user_view, name='current_user'),
     path('users/', views.UserListCreateView.as_view(), name='user_list_create'),
+    path('users/bulk/', views.UserBulkCreateView.as_view(), name='user_bulk_create'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user_detail'),
 ]
\ No newline at end of file
@@ -1,19 +1,23 @@
+import logging
+
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
 from django.db import transaction
 from attendance.models import Presence
 from .models import User
+from .provisionnement import Provisionnement, TAILLE_MAX_LOT
+from .tokens import RefreshTokenRevocable, statistiques_tokens
 from .serializers import (
     UserSerializer, 
     UserCreateSerializer, 
     CustomTokenObtainPairSerializer,
-    LoginSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
     
@@ -28,22 +32,10 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 'details': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Récupérer l'utilisateur
-        email = request.data.get('email')
-        user = User.objects.select_related('magasin').filter(email=email).first()
-        
-        if not user:
-            return Response({
-                'error': 'Utilisateur non trouvé'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Générer les tokens
-        refresh = RefreshToken.for_user(user)
-        
+        # Tokens et utilisateur (magasin compris) issus de l'authentification
         return Response({
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-            'user': UserSerializer(user).data
+            **serializer.validated_data,
+            'user': UserSerializer(serializer.user).data
         })
 
 class UserListCreateView(generics.ListCreateAPIView):
@@ -73,6 +65,31 @@ class UserListCreateView(generics.ListCreateAPIView):
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+class UserBulkCreateView(APIView):
+    """Création d'utilisateurs en lot, avec les erreurs de validation par ligne"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+        
+        lignes = request.data
+        if isinstance(lignes, dict):
+            lignes = lignes.get('utilisateurs')
+        if not isinstance(lignes, list) or not lignes:
+            return Response({'error': 'Une liste d\'utilisateurs est attendue.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lignes) > TAILLE_MAX_LOT:
+            return Response({'error': f'Au plus {TAILLE_MAX_LOT} utilisateurs par envoi.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        provisionnement = Provisionnement(user)
+        crees = provisionnement.creer(lignes)
+        if provisionnement.erreurs:
+            return Response({'erreurs': provisionnement.erreurs}, status=status.HTTP_400_BAD_REQUEST)
+        
+        logger.info(f"Création en lot de {len(crees)} utilisateur(s) par {user.email}")
+        return Response(UserSerializer(crees, many=True).data, status=status.HTTP_201_CREATED)
+
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.select_related('magasin').all()
     serializer_class = UserSerializer
@@ -128,8 +145,16 @@ def logout_view(request):
     try:
         refresh_token = request.data.get("refresh")
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = RefreshTokenRevocable(refresh_token)
             token.blacklist()
         return Response({"message": "Déconnexion réussie"}, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({"error": "Token invalide"}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({"error": "Token invalide"}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def token_stats_view(request):
+    """Taille des tables de tokens (émis, révoqués, expirés à purger)"""
+    if not hasattr(request.user, 'role') or request.user.role != 'admin':
+        return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+    return Response(statistiques_tokens())
@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.authentication import profil, utilisateur
+from accounts.models import User
+from attendance.models import Presence
+from attendance.services import pointer
+
+SEQUENCE = ('arrivee', 'arrivee', 'pause_entree', 'pause_sortie', 'depart')
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du pointage : les employés d'un magasin pointent tous en "
+        "même temps (arrivée envoyée deux fois, pause, fin de pause, départ) et "
+        "l'on mesure la latence de chaque pointage. Les présences du jour de test "
+        "(--jour, dans le futur par défaut) sont supprimées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('magasin_id', type=int)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--jour', type=date.fromisoformat, default=date(2099, 12, 31))
+        parser.add_argument('--p99-ms', type=float, default=20.0)
+
+    def handle(self, *args, **options):
+        jour = options['jour']
+        ids = list(
+            User.objects.filter(magasin_id=options['magasin_id'], is_active=True)
+            .order_by('id').values_list('id', flat=True)[:options['users']]
+        )
+        if not ids:
+            raise CommandError("Aucun utilisateur actif dans ce magasin")
+        if Presence.objects.filter(user_id__in=ids, date_pointage=jour).exists():
+            raise CommandError(f"Des présences existent déjà le {jour} : choisir un autre --jour")
+
+        utilisateurs = [utilisateur(profil(user_id)) for user_id in ids]
+        latences, erreurs = [], []
+        verrou = threading.Lock()
+        depart = threading.Barrier(len(utilisateurs))
+
+        def employe(user):
+            mesures = []
+            try:
+                depart.wait()
+                for type_pointage in SEQUENCE:
+                    debut = time.perf_counter()
+                    pointer(user, type_pointage, 0.0, 0.0, jour=jour)
+                    mesures.append(time.perf_counter() - debut)
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+                with verrou:
+                    latences.extend(mesures)
+
+        threads = [threading.Thread(target=employe, args=(user,)) for user in utilisateurs]
+        debut = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.monotonic() - debut
+
+        try:
+            incompletes = Presence.objects.filter(user_id__in=ids, date_pointage=jour, heure_sortie__isnull=True).count()
+            lignes = Presence.objects.filter(user_id__in=ids, date_pointage=jour).count()
+        finally:
+            Presence.objects.filter(user_id__in=ids, date_pointage=jour).delete()
+
+        if erreurs:
+            raise CommandError(f"{len(erreurs)} employé(s) en échec : {erreurs[0]!r}")
+        if lignes != len(ids) or incompletes:
+            raise CommandError(f"{lignes} présence(s) pour {len(ids)} employé(s), {incompletes} sans départ")
+
+        latences.sort()
+        p50 = latences[len(latences) // 2] * 1000
+        p99 = latences[min(len(latences) - 1, int(len(latences) * 0.99))] * 1000
+        self.stdout.write(
+            f"{len(ids)} employé(s), {len(latences)} pointages en {duree:.2f}s : "
+            f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {latences[-1] * 1000:.1f} ms"
+        )
+        if p99 > options['p99_ms']:
+            raise CommandError(f"p99 {p99:.1f} ms au-dessus de l'objectif de {options['p99_ms']} ms")
+        self.stdout.write(self.style.SUCCESS("Pointages cohérents, objectif de latence tenu"))
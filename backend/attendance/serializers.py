@@ -1,8 +1,25 @@
+import logging
 from rest_framework import serializers
 from django.utils import timezone
-from datetime import date
+from datetime import date, datetime
+from accounts.authentication import profil
 from .models import Presence
 
+logger = logging.getLogger(__name__)
+
+class PointageSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=Presence.TYPE_CHOICES)
+    latitude = serializers.FloatField(required=False, default=0)
+    longitude = serializers.FloatField(required=False, default=0)
+    # 'YYYY-MM-DD' ou date ISO complète ; jour courant si absent
+    date_pointage = serializers.CharField(required=False)
+    
+    def validate_date_pointage(self, value):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+        except ValueError:
+            raise serializers.ValidationError('Date invalide.')
+
 class PresenceSerializer(serializers.ModelSerializer):
     user_id = serializers.SerializerMethodField()
     magasin_id = serializers.SerializerMethodField()
@@ -20,10 +37,10 @@ class PresenceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
     
     def get_user_id(self, obj):
-        return str(obj.user.id) if obj.user else None
+        return str(obj.user_id) if obj.user_id else None
     
     def get_magasin_id(self, obj):
-        return str(obj.magasin.id) if obj.magasin else None
+        return str(obj.magasin_id) if obj.magasin_id else None
     
     def get_user_email(self, obj):
         return obj.user.email if obj.user else 'Email inconnu'
@@ -35,24 +52,15 @@ class PresenceSerializer(serializers.ModelSerializer):
         return obj.user.prenom if obj.user else 'Prénom inconnu'
     
     def create(self, validated_data):
-        print(f"=== SERIALIZER CREATE ===")
-        print(f"Données validées: {validated_data}")
-        
         # Assigner l'utilisateur actuel
         validated_data['user'] = self.context['request'].user
         user = validated_data['user']
-        print(f"Utilisateur assigné: {user.email}")
         
-        # Assigner le magasin de l'utilisateur
+        # Assigner le magasin de l'utilisateur (nom lu dans le profil en cache)
         if user.magasin_id:
-            from stores.models import Magasin
-            try:
-                magasin = Magasin.objects.get(id=user.magasin_id)
-                validated_data['magasin'] = magasin
-                validated_data['magasin_nom'] = magasin.nom
-                print(f"Magasin assigné: {magasin.nom}")
-            except Magasin.DoesNotExist:
-                validated_data['magasin_nom'] = 'Magasin inconnu'
+            validated_data.pop('magasin', None)
+            validated_data['magasin_id'] = user.magasin_id
+            validated_data['magasin_nom'] = (profil(user.id) or {}).get('magasin_nom') or 'Magasin inconnu'
         
         # Assurer que la date de pointage est définie
         if 'date_pointage' not in validated_data:
@@ -62,9 +70,8 @@ class PresenceSerializer(serializers.ModelSerializer):
         if validated_data.get('type') == 'arrivee' and 'heure_entree' not in validated_data:
             validated_data['heure_entree'] = timezone.now()
         
-        print(f"Données finales: {validated_data}")
         result = super().create(validated_data)
-        print(f"✅ Présence créée dans serializer: {result.id}")
+        logger.debug("Présence créée : id=%s user=%s", result.id, user.id)
         
         return result
 
@@ -75,10 +82,6 @@ class PresenceSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
     
     def update(self, instance, validated_data):
-        print(f"=== SERIALIZER UPDATE ===")
-        print(f"Instance ID: {instance.id}")
-        print(f"Données validées: {validated_data}")
-        
         # Mettre à jour les champs selon le type
         type_pointage = validated_data.get('type', instance.type)
         now = timezone.now()
@@ -97,6 +100,6 @@ class PresenceSerializer(serializers.ModelSerializer):
             validated_data['heure_sortie'] = now
         
         result = super().update(instance, validated_data)
-        print(f"✅ Présence mise à jour dans serializer: {result.id}")
+        logger.debug("Présence mise à jour : id=%s type=%s", result.id, type_pointage)
         
         return result
\ No newline at end of file
@@ -0,0 +1,79 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.authentication import profil
+from .models import Presence
+
+logger = logging.getLogger(__name__)
+
+# type de pointage -> (champ horodaté, champ qui doit déjà l'être)
+TRANSITIONS = {
+    'arrivee': ('heure_entree', None),
+    'pause_entree': ('pause_entree', 'heure_entree'),
+    'pause_sortie': ('pause_sortie', 'pause_entree'),
+    'depart': ('heure_sortie', 'heure_entree'),
+}
+
+
+class PointageRefuse(Exception):
+    """Transition impossible depuis l'état courant de la présence du jour"""
+
+
+def pointer(user, type_pointage, latitude, longitude, jour=None):
+    """
+    Applique un pointage à la présence du jour de `user` (arrivée → pause →
+    départ). Retourne (presence, creee).
+
+    L'arrivée tente directement l'INSERT : si la ligne existe déjà, y compris
+    créée à l'instant par un pointage concurrent, la contrainte unique
+    (user, date_pointage) échoue et l'on rejoue le pointage comme transition
+    sur la ligne existante, verrouillée. Sans SELECT préalable, pas de verrou
+    d'intervalle InnoDB ni d'interblocage entre deux arrivées simultanées.
+
+    Répéter le dernier pointage (double envoi) renvoie la présence inchangée.
+    """
+    jour = jour or timezone.localdate()
+    maintenant = timezone.now()
+
+    if type_pointage == 'arrivee':
+        donnees = profil(user.id)
+        try:
+            with transaction.atomic():
+                presence = Presence.objects.create(
+                    user=user,
+                    magasin_id=user.magasin_id,
+                    magasin_nom=(donnees or {}).get('magasin_nom') or '',
+                    date_pointage=jour,
+                    heure_entree=maintenant,
+                    latitude=latitude,
+                    longitude=longitude,
+                    type='arrivee',
+                )
+            return presence, True
+        except IntegrityError:
+            logger.info("Pointage arrivée concurrent ou répété : user=%s jour=%s", user.id, jour)
+
+    with transaction.atomic():
+        presence = Presence.objects.select_for_update().filter(user_id=user.id, date_pointage=jour).first()
+        if presence is None:
+            raise PointageRefuse("Vous devez d'abord pointer votre arrivée")
+        presence.user = user
+
+        champ, prerequis = TRANSITIONS[type_pointage]
+        if getattr(presence, champ) is not None and presence.type == type_pointage:
+            return presence, False
+        if getattr(presence, champ) is not None or (prerequis and getattr(presence, prerequis) is None):
+            raise PointageRefuse(f"Action {type_pointage} non autorisée dans l'état actuel")
+
+        setattr(presence, champ, maintenant)
+        champs = [champ, 'type', 'latitude', 'longitude', 'updated_at']
+        if type_pointage == 'pause_sortie':
+            presence.duree_pause = int((maintenant - presence.pause_entree).total_seconds() / 60)
+            champs.append('duree_pause')
+        presence.type = type_pointage
+        presence.latitude = latitude
+        presence.longitude = longitude
+        presence.save(update_fields=champs)
+    return presence, False
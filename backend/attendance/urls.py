@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('presences/', views.PresenceListCreateView.as_view(), name='presence_list_create'),
     path('presences/<int:pk>/', views.PresenceDetailView.as_view(), name='presence_detail'),
+    path('pointage/', views.PointageView.as_view(), name='pointage'),
 
     # Endpoints Planning
 
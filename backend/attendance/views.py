@@ -7,8 +7,10 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db import transaction
 from django.utils import timezone
 from datetime import date, datetime
+from rest_framework.views import APIView
 from .models import Presence
-from .serializers import PresenceSerializer
+from .serializers import PointageSerializer, PresenceSerializer
+from .services import PointageRefuse, pointer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,9 +34,7 @@ class PresenceListCreateView(generics.ListCreateAPIView):
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         try:
-            print(f"=== CRÉATION/MISE À JOUR PRÉSENCE ===")
-            print(f"Utilisateur: {request.user.id} ({request.user.email})")
-            print(f"Données reçues: {request.data}")
+            logger.debug("Création/mise à jour présence : user=%s données=%s", request.user.id, request.data)
             
             # Vérifier que l'utilisateur a un magasin assigné
             if not request.user.magasin_id:
@@ -49,8 +49,6 @@ class PresenceListCreateView(generics.ListCreateAPIView):
             else:
                 date_pointage = date.today()
             
-            print(f"Date de pointage: {date_pointage}")
-            
             # Chercher une présence existante pour ce jour
             presence_existante = Presence.objects.filter(
                 user=request.user,
@@ -58,10 +56,8 @@ class PresenceListCreateView(generics.ListCreateAPIView):
             ).first()
             
             type_pointage = request.data.get('type', 'arrivee')
-            print(f"Type de pointage: {type_pointage}")
             
             if presence_existante:
-                print(f"Présence existante trouvée: {presence_existante.id}")
                 # Mettre à jour la présence existante
                 serializer = self.get_serializer(presence_existante, data=request.data, partial=True)
                 serializer.is_valid(raise_exception=True)
@@ -91,11 +87,10 @@ class PresenceListCreateView(generics.ListCreateAPIView):
                 presence_existante.longitude = float(request.data.get('longitude', 0))
                 presence_existante.save()
                 
-                print(f"✅ Présence mise à jour: {presence_existante.id}")
+                logger.debug("Présence mise à jour : id=%s type=%s", presence_existante.id, type_pointage)
                 return Response(PresenceSerializer(presence_existante).data, status=status.HTTP_200_OK)
             
             else:
-                print("Création d'une nouvelle présence")
                 # Créer une nouvelle présence (seulement pour arrivée)
                 if type_pointage != 'arrivee':
                     return Response({
@@ -111,11 +106,11 @@ class PresenceListCreateView(generics.ListCreateAPIView):
                 serializer.is_valid(raise_exception=True)
                 presence = serializer.save()
                 
-                print(f"✅ Nouvelle présence créée: {presence.id}")
+                logger.debug("Présence créée : id=%s", presence.id)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
                 
         except Exception as e:
-            print(f"❌ Erreur création/mise à jour présence: {str(e)}")
+            logger.exception("Erreur création/mise à jour présence")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -128,6 +123,35 @@ class PresenceListCreateView(generics.ListCreateAPIView):
 
     
 
+class PointageView(APIView):
+    """
+    Pointage de l'utilisateur connecté (arrivée, pause, fin de pause, départ)
+    en une transition verrouillée sur la présence du jour
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = PointageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not request.user.magasin_id:
+            return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        donnees = serializer.validated_data
+        try:
+            presence, creee = pointer(
+                request.user, donnees['type'], donnees['latitude'], donnees['longitude'],
+                jour=donnees.get('date_pointage'),
+            )
+        except PointageRefuse as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        logger.info("Pointage %s : user=%s presence=%s", donnees['type'], request.user.id, presence.id)
+        return Response(
+            PresenceSerializer(presence).data,
+            status=status.HTTP_201_CREATED if creee else status.HTTP_200_OK
+        )
+
+
 class PresenceDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PresenceSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -142,18 +166,15 @@ class PresenceDetailView(generics.RetrieveUpdateDestroyAPIView):
     @transaction.atomic
     def update(self, request, *args, **kwargs):
         try:
-            print(f"=== MISE À JOUR PRÉSENCE DIRECTE ===")
-            print(f"Données reçues: {request.data}")
-            
             partial = kwargs.pop('partial', False)
             instance = self.get_object()
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
             presence = serializer.save()
             
-            print(f"✅ Présence mise à jour: ID={presence.id}")
+            logger.debug("Présence mise à jour : id=%s", presence.id)
             return Response(serializer.data)
             
         except Exception as e:
-            print(f"❌ Erreur mise à jour présence: {str(e)}")
+            logger.exception("Erreur mise à jour présence")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
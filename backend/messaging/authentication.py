@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from accounts.authentication import profil, utilisateur
+
+SEL_TICKET = 'messaging.flux'
+
+
+def emettre_ticket(user):
+    """Ticket signé donnant accès au seul flux d'événements, pendant EVENEMENTS_TICKET_TTL_S secondes"""
+    return signing.dumps(user.id, salt=SEL_TICKET)
+
+
+class TicketFluxAuthentication(BaseAuthentication):
+    """
+    Ticket de flux lu dans le paramètre ?ticket= : EventSource ne permet pas
+    d'envoyer d'en-tête Authorization, et un JWT dans l'URL finirait dans les
+    journaux du serveur. Le ticket n'ouvre que le flux et expire vite : le
+    client en demande un nouveau (stream/ticket/) à chaque ouverture.
+    """
+
+    def authenticate(self, request):
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        try:
+            user_id = signing.loads(ticket, salt=SEL_TICKET, max_age=getattr(settings, 'EVENEMENTS_TICKET_TTL_S', 60))
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('Ticket de flux expiré.', code='ticket_expire')
+        except signing.BadSignature:
+            raise AuthenticationFailed('Ticket de flux invalide.', code='ticket_invalide')
+        donnees = profil(user_id)
+        if donnees is None or not donnees['is_active']:
+            raise AuthenticationFailed('Utilisateur introuvable ou désactivé.', code='user_inactive')
+        return utilisateur(donnees), None
+
+    def authenticate_header(self, request):
+        # 401 plutôt que 403 : le client redemande un ticket
+        return 'Ticket'
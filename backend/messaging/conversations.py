@@ -0,0 +1,43 @@
+from django.db.models import Case, Count, F, Max, Q, When
+
+from .models import Message
+
+
+def de_l_utilisateur(user):
+    return Message.objects.filter(Q(sender=user) | Q(receiver=user))
+
+
+def entre(user, interlocuteur_id):
+    return Message.objects.filter(
+        Q(sender=user, receiver_id=interlocuteur_id) | Q(sender_id=interlocuteur_id, receiver=user)
+    )
+
+
+def resume(user):
+    """
+    Une ligne par interlocuteur : dernier message et nombre de messages non lus
+    reçus de lui, de la conversation la plus récente à la plus ancienne.
+
+    Un seul GROUP BY sur les messages de l'utilisateur donne le dernier id et
+    le compte de non-lus par interlocuteur ; les derniers messages sont
+    ensuite lus par clé primaire avec expéditeur et destinataire.
+    """
+    groupes = list(
+        de_l_utilisateur(user).order_by()
+        .annotate(interlocuteur=Case(When(sender=user, then=F('receiver_id')), default=F('sender_id')))
+        .values('interlocuteur')
+        .annotate(dernier_id=Max('id'), non_lus=Count('id', filter=Q(receiver=user, read=False)))
+        .order_by('-dernier_id')
+    )
+    derniers = Message.objects.select_related('sender', 'receiver').in_bulk([g['dernier_id'] for g in groupes])
+
+    conversations = []
+    for groupe in groupes:
+        message = derniers[groupe['dernier_id']]
+        interlocuteur = message.receiver if message.sender_id == user.id else message.sender
+        conversations.append({
+            'interlocuteur': interlocuteur,
+            'dernier_message': message,
+            'non_lus': groupe['non_lus'],
+        })
+    return conversations
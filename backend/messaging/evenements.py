@@ -0,0 +1,123 @@
+import json
+import threading
+from collections import deque
+
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+TAILLE_MAX_RATTRAPAGE = 100
+TAILLE_MAX_EPHEMERES = 50
+
+
+class Bus:
+    """
+    Pub/sub en mémoire du processus. Un événement incrémente la version de
+    l'utilisateur et réveille les connexions en attente, qui relisent alors
+    la base à partir de leur curseur. Une connexion inactive ne fait donc
+    aucune requête.
+
+    Les événements sans ligne en base (accusés de lecture) sont conservés en
+    mémoire avec leur version, dans la limite de TAILLE_MAX_EPHEMERES par
+    utilisateur, et ne sont remis qu'aux connexions du processus.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+        self._ephemeres = {}
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def publier(self, user_ids, evenement=None):
+        with self._condition:
+            for user_id in user_ids:
+                version = self._versions.get(user_id, 0) + 1
+                self._versions[user_id] = version
+                if evenement is not None:
+                    self._ephemeres.setdefault(user_id, deque(maxlen=TAILLE_MAX_EPHEMERES)).append((version, evenement))
+            self._condition.notify_all()
+
+    def ephemeres(self, user_id, version):
+        """Événements en mémoire publiés pour user_id après `version`, en (type, données)"""
+        with self._condition:
+            return [evenement for v, evenement in self._ephemeres.get(user_id, ()) if v > version]
+
+    def attendre(self, user_id, version, timeout):
+        """Bloque jusqu'à un événement pour user_id postérieur à `version` ; False à l'expiration"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout)
+
+
+bus = Bus()
+
+
+def signaler(user_ids, evenement=None):
+    """
+    Réveille les flux des utilisateurs donnés une fois la transaction courante
+    commitée, en leur remettant `evenement` = (type, données) s'il est fourni.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: bus.publier(user_ids, evenement))
+
+
+class Curseur:
+    """Derniers id de notification et de message remis au client, sérialisés 'n-m'"""
+
+    def __init__(self, notification=0, message=0):
+        self.notification = notification
+        self.message = message
+
+    @classmethod
+    def lire(cls, valeur):
+        try:
+            notification, message = (int(partie) for partie in valeur.split('-'))
+        except (AttributeError, ValueError):
+            return None
+        return cls(notification, message)
+
+    @classmethod
+    def actuel(cls, user):
+        """Curseur positionné après les derniers éléments existants de l'utilisateur"""
+        from stock.models import Notification
+        from .models import Message
+
+        return cls(
+            Notification.objects.filter(destinataire=user).order_by('-id').values_list('id', flat=True).first() or 0,
+            Message.objects.filter(receiver=user).order_by('-id').values_list('id', flat=True).first() or 0,
+        )
+
+    def __str__(self):
+        return f'{self.notification}-{self.message}'
+
+
+def nouveautes(user, curseur):
+    """
+    Notifications et messages reçus après le curseur, au plus
+    TAILLE_MAX_RATTRAPAGE de chaque. Retourne une liste de (type, données)
+    et fait avancer le curseur.
+    """
+    from stock.models import Notification
+    from stock.serializers import NotificationFluxSerializer
+    from .models import Message
+    from .serializers import MessageSerializer
+
+    notifications = list(
+        Notification.objects.filter(destinataire=user, id__gt=curseur.notification)
+        .select_related('mouvement').order_by('id')[:TAILLE_MAX_RATTRAPAGE]
+    )
+    messages = list(Message.objects.filter(receiver=user, id__gt=curseur.message).order_by('id')[:TAILLE_MAX_RATTRAPAGE])
+    if notifications:
+        curseur.notification = notifications[-1].id
+    if messages:
+        curseur.message = messages[-1].id
+    return (
+        [('notification', donnees) for donnees in NotificationFluxSerializer(notifications, many=True).data]
+        + [('message', donnees) for donnees in MessageSerializer(messages, many=True).data]
+    )
+
+
+def trame_sse(evenement, donnees, curseur):
+    return f"id: {curseur}\nevent: {evenement}\ndata: {json.dumps(donnees, cls=JSONEncoder)}\n\n"
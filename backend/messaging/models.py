@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.conf import settings
 
 class Message(models.Model):
@@ -22,4 +24,17 @@ class Message(models.Model):
     class Meta:
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+        indexes = [
+            # Non-lus par destinataire et historique par expéditeur
+            models.Index(fields=['receiver', 'read', 'timestamp'], name='message_receiver_read_ts_idx'),
+            models.Index(fields=['sender', 'timestamp'], name='message_sender_ts_idx'),
+        ]
+
+
+@receiver(post_save, sender=Message)
+def signaler_message(sender, instance, created, **kwargs):
+    """Réveille le flux d'événements du destinataire"""
+    if created:
+        from .evenements import signaler
+        signaler([instance.receiver_id])
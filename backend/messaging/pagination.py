@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ConversationCursorPagination(CursorPagination):
+    """
+    Messages d'une conversation, du plus récent au plus ancien, par curseur
+    sur (timestamp, id) : le coût d'une page ne dépend pas de l'historique.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 200
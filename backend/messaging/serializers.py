@@ -11,11 +11,25 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'timestamp', 'sender']
     
     def get_sender_id(self, obj):
-        return str(obj.sender.id) if obj.sender else None
+        return str(obj.sender_id) if obj.sender_id else None
     
     def get_receiver_id(self, obj):
-        return str(obj.receiver.id) if obj.receiver else None
+        return str(obj.receiver_id) if obj.receiver_id else None
     
     def create(self, validated_data):
         validated_data['sender'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class InterlocuteurSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    email = serializers.EmailField()
+    nom = serializers.CharField()
+    prenom = serializers.CharField()
+    role = serializers.CharField()
+
+
+class ConversationSerializer(serializers.Serializer):
+    interlocuteur = InterlocuteurSerializer()
+    dernier_message = MessageSerializer()
+    non_lus = serializers.IntegerField()
@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+from django.core import signing
+from django.test import TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from stores.models import Magasin
+from . import views
+
+
+@override_settings(EVENEMENTS_DUREE_MAX_S=0)
+class FluxEvenementsTests(TransactionTestCase):
+    # Hors transaction de test : le flux ferme la connexion pendant l'attente
+    client_class = APIClient
+
+    def setUp(self):
+        magasin = Magasin.objects.create(nom='Magasin 1', adresse='1 rue', latitude=0, longitude=0)
+        self.user = User.objects.create_user(
+            'employe@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='employe', magasin=magasin
+        )
+
+    def _ticket(self):
+        self.client.force_authenticate(self.user)
+        reponse = self.client.post('/api/messaging/stream/ticket/')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+        return reponse.data
+
+    def _flux(self, ticket):
+        return APIClient().get('/api/messaging/stream/', {'ticket': ticket})
+
+    def test_ouverture_avec_ticket(self):
+        donnees = self._ticket()
+        self.assertEqual(donnees['curseur'], '0-0')
+        reponse = self._flux(donnees['ticket'])
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK)
+        self.assertIn('id: 0-0', b''.join(reponse.streaming_content).decode())
+        reponse.close()
+
+    def test_jwt_en_parametre_refuse(self):
+        reponse = self.client.post('/api/auth/login/', {'email': 'employe@x.fr', 'password': 'motdepasse'}, format='json')
+        flux = APIClient().get('/api/messaging/stream/', {'token': reponse.data['access']})
+        self.assertEqual(flux.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._flux(reponse.data['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ticket_expire(self):
+        ticket = self._ticket()['ticket']
+        with patch('django.core.signing.time.time', return_value=signing.time.time() + 3600):
+            self.assertEqual(self._flux(ticket).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signature_d_un_autre_usage_refusee(self):
+        self.assertEqual(self._flux(signing.dumps(self.user.id)).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_limite_de_flux(self):
+        ticket = self._ticket()['ticket']
+        with patch.object(views, '_places_flux', views.threading.Semaphore(1)):
+            ouvert = self._flux(ticket)
+            self.assertEqual(ouvert.status_code, status.HTTP_200_OK)
+            self.assertEqual(self._flux(ticket).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            ouvert.close()
+            reponse = self._flux(ticket)
+            self.assertEqual(reponse.status_code, status.HTTP_200_OK)
+            reponse.close()
+
+    def test_place_rendue_sur_erreur(self):
+        ticket = self._ticket()['ticket']
+        places = views.threading.Semaphore(1)
+        with patch.object(views, '_places_flux', places), \
+                patch.object(views.Curseur, 'actuel', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self._flux(ticket)
+        self.assertTrue(places.acquire(blocking=False))
@@ -4,4 +4,10 @@ from . import views
 urlpatterns = [
     path('messages/', views.MessageListCreateView.as_view(), name='message_list_create'),
     path('messages/<int:pk>/', views.MessageDetailView.as_view(), name='message_detail'),
+    path('conversations/', views.ConversationListView.as_view(), name='conversation_list'),
+    path('conversations/<int:interlocuteur_id>/messages/', views.ConversationMessagesView.as_view(), name='conversation_messages'),
+    path('conversations/<int:interlocuteur_id>/read/', views.ConversationLectureView.as_view(), name='conversation_lecture'),
+    path('stream/', views.EvenementsStreamView.as_view(), name='evenements_stream'),
+    path('stream/ticket/', views.EvenementsTicketView.as_view(), name='evenements_ticket'),
+    path('poll/', views.EvenementsPollView.as_view(), name='evenements_poll'),
 ]
\ No newline at end of file
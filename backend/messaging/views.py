@@ -1,9 +1,21 @@
-from rest_framework import generics, permissions
+import threading
+import time
+
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
-from django.db.models import Q
+from django.conf import settings
+from django.db import connection
+from django.http import StreamingHttpResponse
+from accounts.authentication import JWTProfilAuthentication
+from .authentication import TicketFluxAuthentication, emettre_ticket
+from .evenements import Curseur, bus, nouveautes, signaler, trame_sse
+from . import conversations
 from .models import Message
-from .serializers import MessageSerializer
+from .pagination import ConversationCursorPagination
+from .serializers import MessageSerializer, ConversationSerializer
 
 class MessageListCreateView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
@@ -14,9 +26,7 @@ class MessageListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return Message.objects.filter(
-            Q(sender=user) | Q(receiver=user)
-        )
+        return conversations.de_l_utilisateur(user)
 
 class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MessageSerializer
@@ -24,6 +34,198 @@ class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return Message.objects.filter(
-            Q(sender=user) | Q(receiver=user)
-        )
\ No newline at end of file
+        return conversations.de_l_utilisateur(user)
+
+
+
+class ConversationListView(APIView):
+    """Boîte de réception : une ligne par interlocuteur avec dernier message et non-lus"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        resume = conversations.resume(request.user)
+        return Response({
+            'non_lus': sum(conversation['non_lus'] for conversation in resume),
+            'conversations': ConversationSerializer(resume, many=True).data,
+        })
+
+
+class ConversationMessagesView(generics.ListAPIView):
+    """Messages échangés avec un interlocuteur, paginés par curseur"""
+    serializer_class = MessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # L'ordre est imposé par le curseur (timestamp, id) : pas d'OrderingFilter
+    filter_backends = []
+    pagination_class = ConversationCursorPagination
+
+    def get_queryset(self):
+        return conversations.entre(self.request.user, self.kwargs['interlocuteur_id'])
+
+
+
+class ConversationLectureView(APIView):
+    """
+    Marque comme lus, en un seul UPDATE, les messages reçus d'un interlocuteur
+    jusqu'à l'id `jusqu_a` (tous si absent), et envoie un accusé de lecture
+    à l'interlocuteur.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, interlocuteur_id):
+        user = request.user
+        messages = Message.objects.filter(sender_id=interlocuteur_id, receiver=user, read=False)
+        jusqu_a = request.data.get('jusqu_a')
+        if jusqu_a is not None:
+            try:
+                messages = messages.filter(id__lte=int(jusqu_a))
+            except (TypeError, ValueError):
+                return Response({'error': 'jusqu_a doit être un id de message'}, status=status.HTTP_400_BAD_REQUEST)
+
+        lus = messages.update(read=True)
+        if lus:
+            signaler([interlocuteur_id], ('lecture', {
+                'lecteur': str(user.id), 'jusqu_a': jusqu_a, 'messages': lus,
+            }))
+        return Response({
+            'lus': lus,
+            'non_lus': Message.objects.filter(receiver=user, read=False).count(),
+        })
+
+
+class EvenementsTicketView(APIView):
+    """
+    Ticket d'ouverture du flux (?ticket=), valable EVENEMENTS_TICKET_TTL_S
+    secondes, et curseur courant à passer en ?since= à la première ouverture.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'ticket': emettre_ticket(request.user),
+            'curseur': str(Curseur.actuel(request.user)),
+            'expire_dans': getattr(settings, 'EVENEMENTS_TICKET_TTL_S', 60),
+        })
+
+
+_places_flux = threading.Semaphore(getattr(settings, 'EVENEMENTS_FLUX_MAX', 8))
+
+
+class _FluxLimite:
+    """Contenu du flux : rend sa place à la fermeture de la réponse, même jamais parcourue"""
+
+    def __init__(self, flux):
+        self._flux = flux
+        self._ferme = False
+
+    def __iter__(self):
+        return self._flux
+
+    def close(self):
+        self._flux.close()
+        if not self._ferme:
+            self._ferme = True
+            _places_flux.release()
+
+
+class EvenementsStreamView(APIView):
+    """
+    Flux Server-Sent Events des nouvelles notifications et des messages reçus.
+
+    Le curseur 'n-m' (dernier id de notification et de message) est repris de
+    l'en-tête Last-Event-ID envoyé par EventSource à la reconnexion, ou du
+    paramètre ?since=. La connexion est fermée après EVENEMENTS_DUREE_MAX_S
+    secondes ; le client se reconnecte et rattrape depuis la base ce qui a pu
+    être publié par un autre processus.
+
+    Chaque flux occupe un thread du serveur : au-delà de EVENEMENTS_FLUX_MAX
+    flux ouverts dans le processus, la réponse est 503 et le client réessaie
+    plus tard ou se replie sur poll/.
+    """
+    authentication_classes = [TicketFluxAuthentication, JWTProfilAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if not _places_flux.acquire(blocking=False):
+            return Response(
+                {'error': 'Trop de flux ouverts, réessayer plus tard.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '30'},
+            )
+        # La place revient à la fermeture de la réponse ; jusque-là, toute
+        # erreur doit la rendre
+        transmise = False
+        try:
+            response = self._reponse(request, user)
+            transmise = True
+            return response
+        finally:
+            if not transmise:
+                _places_flux.release()
+
+    def _reponse(self, request, user):
+        curseur = (
+            Curseur.lire(request.headers.get('Last-Event-ID'))
+            or Curseur.lire(request.query_params.get('since'))
+            or Curseur.actuel(user)
+        )
+        keepalive = getattr(settings, 'EVENEMENTS_KEEPALIVE_S', 15)
+        fin = time.monotonic() + getattr(settings, 'EVENEMENTS_DUREE_MAX_S', 300)
+
+        def flux():
+            yield f"retry: 3000\nid: {curseur}\n\n"
+            version = bus.version(user.id)
+            evenements = nouveautes(user, curseur)
+            while True:
+                for evenement, donnees in evenements:
+                    yield trame_sse(evenement, donnees, curseur)
+                # Pas de connexion à la base gardée ouverte pendant l'attente
+                # (sauf dans une transaction, qui la ferait échouer)
+                if not connection.in_atomic_block:
+                    connection.close()
+                while not bus.attendre(user.id, version, min(keepalive, max(fin - time.monotonic(), 0))):
+                    if time.monotonic() >= fin:
+                        return
+                    yield ": keepalive\n\n"
+                precedente, version = version, bus.version(user.id)
+                evenements = bus.ephemeres(user.id, precedente) + nouveautes(user, curseur)
+
+        response = StreamingHttpResponse(_FluxLimite(flux()), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par nginx
+        return response
+
+
+class EvenementsPollView(APIView):
+    """
+    Repli long-poll du flux : répond dès qu'il y a du nouveau après ?since=n-m,
+    sinon après ?timeout= secondes (EVENEMENTS_POLL_TIMEOUT_S au plus) sans
+    autre requête en base. Sans since, renvoie le curseur courant.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        curseur = Curseur.lire(request.query_params.get('since'))
+        if curseur is None:
+            if request.query_params.get('since'):
+                return Response({'error': 'Curseur invalide'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'curseur': str(Curseur.actuel(user)), 'evenements': []})
+
+        maximum = getattr(settings, 'EVENEMENTS_POLL_TIMEOUT_S', 25)
+        try:
+            timeout = min(max(float(request.query_params.get('timeout', maximum)), 0), maximum)
+        except ValueError:
+            timeout = maximum
+
+        version = bus.version(user.id)
+        evenements = nouveautes(user, curseur)
+        if not evenements:
+            if not connection.in_atomic_block:
+                connection.close()
+            if bus.attendre(user.id, version, timeout):
+                evenements = bus.ephemeres(user.id, version) + nouveautes(user, curseur)
+        return Response({
+            'curseur': str(curseur),
+            'evenements': [{'type': evenement, 'donnees': donnees} for evenement, donnees in evenements],
+        })
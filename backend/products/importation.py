@@ -0,0 +1,233 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from suppliers.models import Fournisseur
+from stock.models import Stock
+from stock.services import niveau_alerte, recalculer_alertes
+from stock import tableau_de_bord
+from .models import Produit
+
+COLONNES = (
+    'fournisseur_nom', 'fournisseur_adresse', 'fournisseur_contact',
+    'produit_nom', 'produit_reference', 'produit_categorie',
+    'produit_prix_unitaire', 'produit_seuil_alerte', 'stock_quantite',
+)
+COLONNES_REQUISES = ('fournisseur_nom', 'produit_nom', 'produit_reference')
+LONGUEURS_MAX = {
+    'fournisseur_nom': 200, 'fournisseur_contact': 200,
+    'produit_nom': 200, 'produit_reference': 100, 'produit_categorie': 100,
+}
+TAILLE_LOT = 2000
+
+
+class ImportInvalide(Exception):
+    """Fichier inexploitable dans son ensemble (encodage, en-têtes)"""
+
+
+def _entier(valeur, erreurs, champ):
+    if not valeur:
+        return 0
+    try:
+        entier = int(valeur)
+    except ValueError:
+        erreurs[champ] = 'Nombre entier attendu.'
+        return None
+    if entier < 0:
+        erreurs[champ] = 'La valeur doit être positive.'
+    return entier
+
+
+def valider_ligne(ligne):
+    """Retourne (donnees, erreurs) pour une ligne du fichier, les erreurs indexées par colonne"""
+    ligne = {colonne: (ligne.get(colonne) or '').strip() for colonne in COLONNES}
+    erreurs = {}
+    for colonne in COLONNES_REQUISES:
+        if not ligne[colonne]:
+            erreurs[colonne] = 'Ce champ est obligatoire.'
+    for colonne, longueur in LONGUEURS_MAX.items():
+        if len(ligne[colonne]) > longueur:
+            erreurs[colonne] = f'Au plus {longueur} caractères.'
+
+    prix = Decimal(0)
+    if ligne['produit_prix_unitaire']:
+        try:
+            prix = Decimal(ligne['produit_prix_unitaire'].replace(',', '.')).quantize(Decimal('0.01'))
+            if prix < 0 or prix.adjusted() >= 8:
+                erreurs['produit_prix_unitaire'] = 'Prix invalide.'
+        except InvalidOperation:
+            erreurs['produit_prix_unitaire'] = 'Nombre décimal attendu.'
+
+    donnees = dict(
+        ligne,
+        produit_prix_unitaire=prix,
+        produit_seuil_alerte=_entier(ligne['produit_seuil_alerte'], erreurs, 'produit_seuil_alerte'),
+        stock_quantite=_entier(ligne['stock_quantite'], erreurs, 'stock_quantite'),
+    )
+    return donnees, erreurs
+
+
+def _lire(fichier):
+    """Lecteur CSV en flux sur un fichier téléversé (séparateur ',' ou ';')"""
+    flux = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    entete = flux.readline()
+    delimiteur = ';' if entete.count(';') > entete.count(',') else ','
+    colonnes = [c.strip().strip('"') for c in next(csv.reader([entete], delimiter=delimiteur), [])]
+    manquantes = [c for c in COLONNES_REQUISES if c not in colonnes]
+    if manquantes:
+        raise ImportInvalide(f"Colonnes manquantes : {', '.join(manquantes)}")
+    return csv.DictReader(flux, fieldnames=colonnes, delimiter=delimiteur)
+
+
+def _upsert(modeles, unique_fields, update_fields):
+    """bulk_create avec mise à jour sur conflit ; MySQL déduit la cible des index uniques"""
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return modeles[0].__class__.objects.bulk_create(
+        modeles, batch_size=1000, update_conflicts=True,
+        unique_fields=unique_fields, update_fields=update_fields,
+    )
+
+
+class Importeur:
+    """
+    Import fournisseur/produit/stock d'un magasin, traité par lots de
+    TAILLE_LOT lignes. Les fournisseurs sont rapprochés par nom dans le
+    magasin, les produits par référence et les stocks par (produit, magasin).
+    Un produit existant garde son magasin : l'import n'en déplace aucun.
+    """
+
+    def __init__(self, magasin_id, restreint=True):
+        self.magasin_id = magasin_id
+        # Un utilisateur rattaché à un magasin ne peut pas modifier les
+        # produits d'un autre magasin qui partageraient la référence
+        self.restreint = restreint
+        # nom -> (id, adresse, contact)
+        self.fournisseurs = {
+            nom: (id_, adresse, contact) for id_, nom, adresse, contact in
+            Fournisseur.objects.filter(magasin_id=magasin_id).order_by('id').values_list('id', 'nom', 'adresse', 'contact')
+        }
+        self.rapport = {
+            'lignes': 0, 'importees': 0,
+            'fournisseurs_crees': 0, 'produits_crees': 0, 'produits_mis_a_jour': 0, 'stocks_importes': 0,
+            'erreurs': [],
+        }
+
+    def importer(self, fichier):
+        lecteur = _lire(fichier)
+        with transaction.atomic():
+            lot = []
+            try:
+                for ligne in lecteur:
+                    if not any(ligne.values()):
+                        continue
+                    # Numéro de ligne dans le fichier, en-tête compris
+                    lot.append((lecteur.line_num + 1, ligne))
+                    if len(lot) >= TAILLE_LOT:
+                        self._traiter(lot)
+                        lot = []
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise ImportInvalide(f"Fichier illisible ligne {lecteur.line_num + 1} : {e}")
+            self._traiter(lot)
+            transaction.on_commit(tableau_de_bord.invalider)
+        return self.rapport
+
+    def _erreur(self, numero, detail):
+        self.rapport['erreurs'].append({'ligne': numero, 'erreurs': detail})
+
+    def _traiter(self, lot):
+        self.rapport['lignes'] += len(lot)
+        valides = {}
+        for numero, ligne in lot:
+            donnees, erreurs = valider_ligne(ligne)
+            if erreurs:
+                self._erreur(numero, erreurs)
+                continue
+            # Une référence répétée dans le lot : la dernière ligne l'emporte
+            precedente = valides.pop(donnees['produit_reference'], None)
+            if precedente is not None:
+                self.rapport['importees'] -= 1
+            valides[donnees['produit_reference']] = (numero, donnees)
+            self.rapport['importees'] += 1
+        if not valides:
+            return
+
+        existants = {
+            reference: magasin_id for reference, magasin_id in
+            Produit.objects.filter(reference__in=valides).values_list('reference', 'magasin')
+        }
+        if self.restreint:
+            for reference, magasin_id in existants.items():
+                if magasin_id != self.magasin_id:
+                    numero, _ = valides.pop(reference)
+                    self._erreur(numero, {'produit_reference': 'Référence déjà utilisée par un autre magasin.'})
+                    self.rapport['importees'] -= 1
+            if not valides:
+                return
+
+        self._fournisseurs(valides.values())
+
+        _upsert([
+            Produit(
+                reference=reference,
+                nom=d['produit_nom'],
+                categorie=d['produit_categorie'],
+                prix_unitaire=d['produit_prix_unitaire'],
+                seuil_alerte=d['produit_seuil_alerte'],
+                fournisseur_id=self.fournisseurs[d['fournisseur_nom']][0],
+                magasin_id=self.magasin_id,
+            )
+            for reference, (_, d) in valides.items()
+        ], ['reference'], ['nom', 'categorie', 'prix_unitaire', 'seuil_alerte', 'fournisseur'])
+        self.rapport['produits_mis_a_jour'] += sum(1 for reference in valides if reference in existants)
+        self.rapport['produits_crees'] += sum(1 for reference in valides if reference not in existants)
+
+        # Les clés générées ne sont pas renvoyées par MySQL : relecture par référence
+        produits = dict(Produit.objects.filter(reference__in=valides).values_list('reference', 'id'))
+        maintenant = timezone.now()
+        stocks = [
+            Stock(
+                produit_id=produits[reference],
+                magasin_id=self.magasin_id,
+                quantite=d['stock_quantite'],
+                niveau_alerte=niveau_alerte(d['stock_quantite'], d['produit_seuil_alerte']),
+                updated_at=maintenant,
+            )
+            for reference, (_, d) in valides.items()
+        ]
+        _upsert(stocks, ['produit', 'magasin'], ['quantite', 'niveau_alerte', 'updated_at'])
+        self.rapport['stocks_importes'] += len(stocks)
+        # Seuils modifiés : lignes des autres magasins (les upserts n'émettent pas post_save)
+        mis_a_jour = [produits[reference] for reference in valides if reference in existants]
+        if mis_a_jour:
+            recalculer_alertes(Q(produit_id__in=mis_a_jour) & ~Q(magasin_id=self.magasin_id))
+
+    def _fournisseurs(self, lignes):
+        """Crée les fournisseurs inconnus et met à jour adresse/contact des existants"""
+        nouveaux, modifies = {}, {}
+        for _, d in lignes:
+            nom = d['fournisseur_nom']
+            champs = {'adresse': d['fournisseur_adresse'], 'contact': d['fournisseur_contact']}
+            if nom in self.fournisseurs:
+                id_, adresse, contact = self.fournisseurs[nom]
+                if any(champs.values()) and (champs['adresse'], champs['contact']) != (adresse, contact):
+                    modifies[nom] = Fournisseur(id=id_, nom=nom, **champs)
+            else:
+                nouveaux[nom] = Fournisseur(nom=nom, magasin_id=self.magasin_id, **champs)
+
+        if modifies:
+            Fournisseur.objects.bulk_update(modifies.values(), ['adresse', 'contact'], batch_size=1000)
+            for nom, fournisseur in modifies.items():
+                self.fournisseurs[nom] = (fournisseur.id, fournisseur.adresse, fournisseur.contact)
+        if nouveaux:
+            Fournisseur.objects.bulk_create(nouveaux.values(), batch_size=1000)
+            self.fournisseurs.update(
+                (nom, (id_, adresse, contact)) for id_, nom, adresse, contact in
+                Fournisseur.objects.filter(magasin_id=self.magasin_id, nom__in=nouveaux)
+                .order_by('id').values_list('id', 'nom', 'adresse', 'contact')
+            )
+            self.rapport['fournisseurs_crees'] += len(nouveaux)
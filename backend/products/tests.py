@@ -0,0 +1,48 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from stock.models import Stock
+from stores.models import Magasin
+from suppliers.models import Fournisseur
+from .models import Produit
+
+ENTETE = (
+    'fournisseur_nom,fournisseur_adresse,fournisseur_contact,produit_nom,produit_reference,'
+    'produit_categorie,produit_prix_unitaire,produit_seuil_alerte,stock_quantite\n'
+)
+
+
+class ProduitImportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.magasin_a = Magasin.objects.create(nom='Magasin A', adresse='1 rue', latitude=0, longitude=0)
+        cls.magasin_b = Magasin.objects.create(nom='Magasin B', adresse='2 rue', latitude=0, longitude=0)
+        fournisseur = Fournisseur.objects.create(nom='Fournisseur', adresse='3 rue', contact='f@x.fr', magasin=cls.magasin_a)
+        cls.produit = Produit.objects.create(
+            nom='Produit', reference='REF-1', categorie='test', prix_unitaire=10,
+            seuil_alerte=5, fournisseur=fournisseur, magasin=cls.magasin_a,
+        )
+        cls.admin = User.objects.create_user('admin@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='admin')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def _importer(self, magasin_id, lignes):
+        fichier = SimpleUploadedFile('import.csv', (ENTETE + lignes).encode(), content_type='text/csv')
+        return self.client.post('/api/products/import/', {'file': fichier, 'magasin': magasin_id}, format='multipart')
+
+    def test_magasin_inconnu(self):
+        reponse = self._importer(999999, 'Fournisseur,,,Produit,REF-2,test,1,0,3\n')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Produit.objects.filter(reference='REF-2').exists())
+
+    def test_produit_existant_garde_son_magasin(self):
+        reponse = self._importer(self.magasin_b.id, 'Fournisseur,,,Produit renommé,REF-1,test,12,5,3\n')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK, reponse.data)
+        self.produit.refresh_from_db()
+        self.assertEqual(self.produit.magasin_id, self.magasin_a.id)
+        self.assertEqual(self.produit.nom, 'Produit renommé')
+        self.assertEqual(Stock.objects.get(produit=self.produit, magasin=self.magasin_b).quantite, 3)
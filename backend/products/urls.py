@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.ProduitListCreateView.as_view(), name='produit_list_create'),
+    path('import/', views.ProduitImportView.as_view(), name='produit_import'),
     path('<int:pk>/', views.ProduitDetailView.as_view(), name='produit_detail'),
 ]
\ No newline at end of file
@@ -1,9 +1,13 @@
 from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from stores.models import Magasin
 from .models import Produit
 from .serializers import ProduitSerializer
+from .importation import Importeur, ImportInvalide
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,4 +53,44 @@ class ProduitDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Response(serializer.data)
         except Exception as e:
             logger.error(f"Erreur lors de la modification du produit: {str(e)}")
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProduitImportView(APIView):
+    """Import CSV fournisseurs/produits/stocks avec un rapport d'erreurs par ligne"""
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        user = request.user
+        if not user.is_superuser and getattr(user, 'role', None) not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+
+        fichier = request.FILES.get('file')
+        if fichier is None:
+            return Response({'error': 'Un fichier CSV est attendu (champ "file").'}, status=status.HTTP_400_BAD_REQUEST)
+
+        restreint = getattr(user, 'magasin_id', None) is not None and not user.is_superuser
+        magasin_id = user.magasin_id if restreint else request.data.get('magasin')
+        try:
+            magasin_id = int(magasin_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Magasin non défini pour cet import.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not restreint and not Magasin.objects.filter(id=magasin_id).exists():
+            return Response({'error': 'Magasin introuvable.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rapport = Importeur(magasin_id, restreint=restreint).importer(fichier)
+        except ImportInvalide as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(
+            f"Import CSV magasin {magasin_id} par {user.email} : {rapport['importees']}/{rapport['lignes']} lignes importées"
+        )
+
+        if not rapport['importees']:
+            code = status.HTTP_400_BAD_REQUEST
+        elif rapport['erreurs']:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_200_OK
+        return Response(rapport, status=code)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Stock, Mouvement, Commande, CommandeDetail
+from .models import Stock, Mouvement, Commande, CommandeDetail, StockSnapshot
 
 @admin.register(Stock)
 class StockAdmin(admin.ModelAdmin):
@@ -15,6 +15,13 @@ class MouvementAdmin(admin.ModelAdmin):
     search_fields = ('produit__nom', 'user__email')
     ordering = ('-date',)
 
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('produit', 'magasin', 'jour', 'quantite', 'entrees', 'sorties')
+    list_filter = ('magasin', 'jour')
+    search_fields = ('produit__nom', 'magasin__nom')
+    ordering = ('-jour',)
+
 class CommandeDetailInline(admin.TabularInline):
     model = CommandeDetail
     extra = 1
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from .historique import STATUTS_APPLIQUES
+from .models import Stock, Mouvement, VariationEnAttente
+from .services import creer_mouvements
+from .tampon import vider_variations
+
+
+def _lire_ecarts(magasin_id, produit_ids=None, verrouiller=False):
+    """
+    Écarts entre Stock et le solde des mouvements.
+
+    Sans verrou, un mouvement appliqué pendant la lecture peut faire paraître
+    un écart : le résultat ne sert qu'à désigner les lignes à relire. Avec
+    `verrouiller` (dans une transaction), les lignes Stock sont verrouillées
+    en premier, si bien qu'aucun mouvement ne peut y être appliqué pendant la
+    lecture ; sous MySQL (REPEATABLE READ), l'instantané des lectures
+    suivantes est pris après l'obtention des verrous.
+    """
+    stocks = Stock.objects.filter(magasin_id=magasin_id)
+    if verrouiller:
+        stocks = stocks.select_for_update()
+    mouvements = Mouvement.objects.filter(magasin_id=magasin_id, statut__in=STATUTS_APPLIQUES)
+    variations = VariationEnAttente.objects.filter(magasin_id=magasin_id)
+    if produit_ids is not None:
+        stocks = stocks.filter(produit_id__in=produit_ids)
+        mouvements = mouvements.filter(produit_id__in=produit_ids)
+        variations = variations.filter(produit_id__in=produit_ids)
+
+    reels = dict(stocks.order_by('produit_id').values_list('produit_id', 'quantite'))
+    soldes = {
+        produit_id: (entrees or 0) - (sorties or 0)
+        for produit_id, entrees, sorties in mouvements.order_by().values('produit_id').annotate(
+            entrees=Sum('quantite', filter=Q(type='entrée')),
+            sorties=Sum('quantite', filter=Q(type='sortie')),
+        ).values_list('produit_id', 'entrees', 'sorties')
+    }
+    # Ventes différées arrivées depuis le vidage : leur mouvement est déjà compté
+    for produit_id, delta in variations.order_by().values('produit_id').annotate(
+        delta=Sum('delta')
+    ).values_list('produit_id', 'delta'):
+        reels[produit_id] = max(reels.get(produit_id, 0) + delta, 0)
+    return [
+        (produit_id, soldes.get(produit_id, 0), reels.get(produit_id, 0))
+        for produit_id in sorted(soldes.keys() | reels.keys())
+        if soldes.get(produit_id, 0) != reels.get(produit_id, 0)
+    ]
+
+
+def ecarts_magasin(magasin_id):
+    """
+    Compare Stock.quantite au solde des mouvements appliqués (entrées -
+    sorties), pour toutes les lignes d'un magasin. Les ventes en écriture
+    différée sont d'abord répercutées, puis le magasin est comparé sans
+    verrou ; seules les lignes en écart sont relues sous verrou.
+
+    Le solde n'est pas ramené à zéro : un solde négatif signale des sorties
+    qui ont été écrêtées par le plancher du stock, donc un historique qui ne
+    se retrouve plus dans Stock.
+
+    Retourne une liste triée de (produit_id, attendu, reel).
+    """
+    vider_variations(magasin_id=magasin_id)
+    candidats = [produit_id for produit_id, _, _ in _lire_ecarts(magasin_id)]
+    if not candidats:
+        return []
+    with transaction.atomic():
+        return _lire_ecarts(magasin_id, candidats, verrouiller=True)
+
+
+@transaction.atomic
+def corriger_ecarts(magasin_id, ecarts, user):
+    """
+    Enregistre un mouvement 'correction' par écart pour que le solde des
+    mouvements retombe sur Stock.quantite. Le stock lui-même n'est pas
+    modifié : le mouvement documente la différence constatée.
+
+    Les lignes signalées sont relues sous verrou : seules celles dont l'écart
+    persiste sont corrigées, avec les valeurs relues. Retourne les mouvements.
+    """
+    ecarts = _lire_ecarts(magasin_id, [produit_id for produit_id, _, _ in ecarts], verrouiller=True)
+    return creer_mouvements([
+        Mouvement(
+            produit_id=produit_id,
+            magasin_id=magasin_id,
+            user=user,
+            type='entrée' if reel > attendu else 'sortie',
+            quantite=abs(reel - attendu),
+            motif='correction',
+            statut='valide',
+        )
+        for produit_id, attendu, reel in ecarts
+    ])
@@ -0,0 +1,264 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Min, OuterRef, Subquery, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Stock, Mouvement, StockSnapshot, VariationEnAttente
+from .tampon import annoter_en_attente
+
+# Statuts dont la quantité a été répercutée sur le stock
+STATUTS_APPLIQUES = ('valide', 'accepte')
+
+PAS_SERIE = ('jour', 'semaine', 'mois')
+MAX_POINTS_SERIE = 1000
+
+
+def rejouer(quantite, mouvements):
+    """Rejoue des (type, quantite) sur une quantité de départ, avec plancher à zéro"""
+    for type_mouvement, q in mouvements:
+        if type_mouvement == 'entrée':
+            quantite += q
+        else:
+            quantite = max(quantite - q, 0)
+    return quantite
+
+
+def debut_jour(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+def _precedent(jour_limite):
+    """Sous-requête : dernière quantité de clôture de la ligne avant jour_limite"""
+    return Subquery(
+        StockSnapshot.objects.filter(
+            produit_id=OuterRef('produit_id'), magasin_id=OuterRef('magasin_id'), jour__lt=jour_limite
+        ).order_by('-jour').values('quantite')[:1]
+    )
+
+
+def _variation():
+    """Agrégat : variation signée (entrées - sorties) des mouvements"""
+    return Sum(Case(When(type='entrée', then=F('quantite')), default=-F('quantite')))
+
+
+def _annoter_depart(lignes, jour):
+    """
+    Annote des lignes (produit_id, magasin_id) de quoi calculer leur quantité
+    au début de `jour` sans snapshot antérieur : stock actuel (`actuelle`),
+    ventes différées (`en_attente`) et variation des mouvements depuis ce jour
+    (`posterieure`). Voir _depart().
+    """
+    ligne = {'produit_id': OuterRef('produit_id'), 'magasin_id': OuterRef('magasin_id')}
+    posterieure = (
+        Mouvement.objects.filter(statut__in=STATUTS_APPLIQUES, date__gte=debut_jour(jour), **ligne)
+        .order_by().values('produit_id', 'magasin_id').annotate(total=_variation()).values('total')
+    )
+    return annoter_en_attente(lignes.annotate(
+        actuelle=Subquery(Stock.objects.filter(**ligne).values('quantite')[:1]),
+        posterieure=Subquery(posterieure, output_field=IntegerField()),
+    ))
+
+
+def _depart(actuelle, en_attente, posterieure):
+    """
+    Quantité de départ d'une ligne sans snapshot : stock actuel moins les
+    mouvements postérieurs, le stock initial (import, saisie) n'apparaissant
+    pas dans les mouvements
+    """
+    return max((actuelle or 0) + (en_attente or 0) - (posterieure or 0), 0)
+
+
+def invalider_snapshots(mouvements):
+    """
+    Supprime les snapshots à partir du jour du plus ancien des mouvements
+    donnés, qui viennent d'être appliqués (mouvements en attente acceptés) :
+    le prochain construire_snapshots reprend à ce jour. Jusque-là, serie() et
+    quantite_au() partent du stock actuel pour ces jours.
+    """
+    dates = [mouvement.date for mouvement in mouvements if mouvement.date is not None]
+    if dates:
+        StockSnapshot.objects.filter(jour__gte=timezone.localtime(min(dates)).date()).delete()
+
+
+def construire_snapshots(depuis=None, jusqu_au=None, chunk_size=5000):
+    """
+    Construit les snapshots journaliers des jours complets [depuis, jusqu_au].
+
+    Par défaut, reprend au lendemain du dernier snapshot (point de reprise)
+    et s'arrête à la veille. Les snapshots de la plage sont recalculés, la
+    quantité de départ de chaque ligne est la clôture du dernier snapshot
+    antérieur, ou à défaut le stock actuel moins les mouvements postérieurs.
+    Les mouvements acceptés par un manager sont datés de leur création : leur
+    acceptation supprime les snapshots déjà construits de ce jour
+    (invalider_snapshots). Retourne le nombre de snapshots écrits.
+    """
+    jusqu_au = jusqu_au or timezone.localdate() - timedelta(days=1)
+    if depuis is None:
+        dernier = StockSnapshot.objects.aggregate(Max('jour'))['jour__max']
+        if dernier is not None:
+            depuis = dernier + timedelta(days=1)
+        else:
+            premier = Mouvement.objects.filter(statut__in=STATUTS_APPLIQUES).aggregate(Min('date'))['date__min']
+            if premier is None:
+                return 0
+            depuis = timezone.localtime(premier).date()
+    if depuis > jusqu_au:
+        return 0
+
+    mouvements = Mouvement.objects.filter(
+        statut__in=STATUTS_APPLIQUES,
+        date__gte=debut_jour(depuis),
+        date__lt=debut_jour(jusqu_au + timedelta(days=1)),
+    ).order_by()
+    precedents = {
+        (p, m): precedent if precedent is not None else _depart(actuelle, en_attente, posterieure)
+        for p, m, precedent, actuelle, en_attente, posterieure in _annoter_depart(
+            mouvements.values('produit_id', 'magasin_id').distinct().annotate(precedent=_precedent(depuis)), depuis
+        ).values_list('produit_id', 'magasin_id', 'precedent', 'actuelle', 'en_attente', 'posterieure')
+    }
+    lignes = mouvements.order_by('produit_id', 'magasin_id', 'date', 'id').values_list(
+        'produit_id', 'magasin_id', 'date', 'type', 'quantite'
+    ).iterator(chunk_size=chunk_size)
+
+    total = 0
+    with transaction.atomic():
+        StockSnapshot.objects.filter(jour__gte=depuis, jour__lte=jusqu_au).delete()
+        snapshots, courant = [], None
+        for produit_id, magasin_id, date, type_mouvement, quantite in lignes:
+            jour = timezone.localtime(date).date()
+            if courant is None or (courant.produit_id, courant.magasin_id, courant.jour) != (produit_id, magasin_id, jour):
+                if courant is not None and (courant.produit_id, courant.magasin_id) == (produit_id, magasin_id):
+                    depart = courant.quantite
+                else:
+                    depart = precedents[(produit_id, magasin_id)]
+                if len(snapshots) >= chunk_size:
+                    StockSnapshot.objects.bulk_create(snapshots)
+                    total += len(snapshots)
+                    snapshots = []
+                courant = StockSnapshot(produit_id=produit_id, magasin_id=magasin_id, jour=jour, quantite=depart)
+                snapshots.append(courant)
+            if type_mouvement == 'entrée':
+                courant.entrees += quantite
+            else:
+                courant.sorties += quantite
+            courant.quantite = rejouer(courant.quantite, [(type_mouvement, quantite)])
+        StockSnapshot.objects.bulk_create(snapshots)
+        total += len(snapshots)
+    return total
+
+
+def _quantite_actuelle(stocks, variations):
+    """Quantité en base des lignes, ventes en écriture différée comprises"""
+    return (
+        (stocks.aggregate(total=Sum('quantite'))['total'] or 0)
+        + (variations.aggregate(total=Sum('delta'))['total'] or 0)
+    )
+
+
+def quantite_au(produit_id, magasin_id, instant):
+    """
+    Quantité d'une ligne de stock à un instant donné : snapshot puis mouvements
+    restants. Sans snapshot antérieur, la quantité actuelle moins les
+    mouvements postérieurs à l'instant (le stock initial d'un import ou d'une
+    saisie n'apparaît pas dans les mouvements).
+    """
+    base = (
+        StockSnapshot.objects.filter(produit_id=produit_id, magasin_id=magasin_id, jour__lt=timezone.localtime(instant).date())
+        .order_by('-jour').values_list('jour', 'quantite').first()
+    )
+    mouvements = Mouvement.objects.filter(produit_id=produit_id, magasin_id=magasin_id, statut__in=STATUTS_APPLIQUES)
+    if base is None:
+        actuelle = _quantite_actuelle(
+            Stock.objects.filter(produit_id=produit_id, magasin_id=magasin_id),
+            VariationEnAttente.objects.filter(produit_id=produit_id, magasin_id=magasin_id),
+        )
+        posterieurs = mouvements.filter(date__gt=instant).order_by().aggregate(variation=_variation())
+        return max(actuelle - (posterieurs['variation'] or 0), 0)
+    mouvements = mouvements.filter(date__gte=debut_jour(base[0] + timedelta(days=1)), date__lte=instant)
+    return rejouer(base[1], mouvements.order_by('date', 'id').values_list('type', 'quantite').iterator())
+
+
+def _cle_pas(jour, pas):
+    if pas == 'semaine':
+        return jour - timedelta(days=jour.weekday())
+    if pas == 'mois':
+        return jour.replace(day=1)
+    return jour
+
+
+def serie(debut, fin, produit_id=None, magasin_id=None, pas='jour'):
+    """
+    Série de quantités totales (somme des lignes filtrées) du jour `debut`
+    au jour `fin`, un point par pas avec la valeur de clôture du pas.
+
+    Jusqu'au dernier snapshot, les clôtures viennent des snapshots. Au-delà
+    (jours pas encore consolidés, ou aucun snapshot), elles sont calculées
+    depuis la quantité actuelle moins les mouvements des jours suivants.
+    """
+    stocks = Stock.objects.order_by()
+    snapshots = StockSnapshot.objects.order_by()
+    mouvements = Mouvement.objects.filter(statut__in=STATUTS_APPLIQUES).order_by()
+    variations_en_attente = VariationEnAttente.objects.order_by()
+    if produit_id is not None:
+        stocks = stocks.filter(produit_id=produit_id)
+        snapshots = snapshots.filter(produit_id=produit_id)
+        mouvements = mouvements.filter(produit_id=produit_id)
+        variations_en_attente = variations_en_attente.filter(produit_id=produit_id)
+    if magasin_id is not None:
+        stocks = stocks.filter(magasin_id=magasin_id)
+        snapshots = snapshots.filter(magasin_id=magasin_id)
+        mouvements = mouvements.filter(magasin_id=magasin_id)
+        variations_en_attente = variations_en_attente.filter(magasin_id=magasin_id)
+
+    # Les snapshots sont construits pour toutes les lignes jusqu'au même jour
+    dernier = StockSnapshot.objects.aggregate(Max('jour'))['jour__max']
+    clotures = {}
+    jour = debut
+    if dernier is not None and debut <= dernier:
+        courantes = {
+            (p, m): precedent if precedent is not None else _depart(actuelle, en_attente, posterieure)
+            for p, m, precedent, actuelle, en_attente, posterieure in _annoter_depart(
+                stocks.values('produit_id', 'magasin_id').annotate(precedent=_precedent(debut)), debut
+            ).values_list('produit_id', 'magasin_id', 'precedent', 'actuelle', 'en_attente', 'posterieure')
+        }
+        total = sum(courantes.values())
+
+        variations = {}
+        for produit, magasin, jour_snapshot, quantite in snapshots.filter(
+            jour__gte=debut, jour__lte=min(fin, dernier)
+        ).order_by('jour').values_list('produit_id', 'magasin_id', 'jour', 'quantite').iterator(chunk_size=5000):
+            cle = (produit, magasin)
+            variations[jour_snapshot] = variations.get(jour_snapshot, 0) + quantite - courantes.get(cle, 0)
+            courantes[cle] = quantite
+
+        while jour <= fin and jour <= dernier:
+            total += variations.get(jour, 0)
+            clotures[jour] = total
+            jour += timedelta(days=1)
+
+    if jour <= fin:
+        # Clôture d'un jour : quantité actuelle moins les mouvements des jours suivants
+        posterieurs = {
+            jour_mouvement: variation for jour_mouvement, variation in
+            mouvements.filter(date__gte=debut_jour(jour + timedelta(days=1)))
+            .annotate(jour=TruncDate('date')).values('jour')
+            .annotate(variation=_variation()).values_list('jour', 'variation')
+        }
+        restant = sum(posterieurs.values())
+        actuelle = _quantite_actuelle(stocks, variations_en_attente)
+        while jour <= fin:
+            restant -= posterieurs.get(jour, 0)
+            clotures[jour] = actuelle - restant
+            jour += timedelta(days=1)
+
+    points = {}
+    for jour, total in clotures.items():
+        points[_cle_pas(jour, pas)] = total
+    return [{'date': cle.isoformat(), 'quantite': quantite} for cle, quantite in points.items()]
+
+
+def nombre_points(debut, fin, pas):
+    jours = (fin - debut).days + 1
+    return {'jour': jours, 'semaine': jours // 7 + 1, 'mois': jours // 28 + 1}[pas]
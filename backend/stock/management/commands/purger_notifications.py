@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from stock.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les notifications lues plus anciennes que --jours jours "
+        "(STOCK_NOTIFICATIONS_RETENTION_JOURS par défaut), par lots pour "
+        "ne pas verrouiller la table longtemps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=getattr(settings, 'STOCK_NOTIFICATIONS_RETENTION_JOURS', 30))
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['jours'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--jours doit être positif et --batch-size strictement positif")
+        limite = timezone.now() - timedelta(days=options['jours'])
+        anciennes = Notification.objects.filter(lu=True, date__lt=limite).order_by('id')
+
+        total = 0
+        while True:
+            ids = list(anciennes.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += Notification.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{total} notification(s) supprimée(s)"))
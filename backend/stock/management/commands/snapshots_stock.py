@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from stock.historique import construire_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Construit les snapshots journaliers de stock à partir des mouvements, "
+        "depuis le dernier snapshot (ou --depuis) jusqu'à la veille (ou --jusqu-au)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depuis', help="Premier jour à (re)calculer, AAAA-MM-JJ")
+        parser.add_argument('--jusqu-au', dest='jusqu_au', help="Dernier jour à calculer, AAAA-MM-JJ")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        dates = {}
+        for option in ('depuis', 'jusqu_au'):
+            if options[option]:
+                try:
+                    dates[option] = parse_date(options[option])
+                except ValueError:
+                    dates[option] = None
+                if dates[option] is None:
+                    raise CommandError(f"Date invalide : {options[option]}")
+        total = construire_snapshots(chunk_size=options['chunk_size'], **dates)
+        self.stdout.write(self.style.SUCCESS(f"{total} snapshot(s) écrit(s)"))
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from stores.models import Magasin
+from stock.coherence import ecarts_magasin, corriger_ecarts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule la quantité attendue de chaque ligne de stock à partir des "
+        "mouvements, magasin par magasin en parallèle, et signale les écarts. "
+        "Avec --corriger, enregistre un mouvement 'correction' par écart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--magasin', type=int, action='append', dest='magasins', help="Limiter à ce magasin (répétable)")
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--corriger', action='store_true')
+        parser.add_argument('--user', help="Email de l'utilisateur auteur des corrections")
+
+    def handle(self, *args, **options):
+        auteur = None
+        if options['corriger']:
+            if not options['user']:
+                raise CommandError("--user est requis avec --corriger")
+            auteur = get_user_model().objects.filter(email=options['user']).first()
+            if auteur is None:
+                raise CommandError(f"Utilisateur introuvable : {options['user']}")
+
+        magasins = Magasin.objects.order_by('id')
+        if options['magasins']:
+            magasins = magasins.filter(id__in=options['magasins'])
+        magasins = list(magasins.values_list('id', 'nom'))
+
+        def traiter(magasin_id):
+            try:
+                ecarts = ecarts_magasin(magasin_id)
+                corrections = []
+                if ecarts and auteur is not None:
+                    # Relus sous verrou : les écarts résorbés entre-temps ne sont pas corrigés
+                    corrections = corriger_ecarts(magasin_id, ecarts, auteur)
+                return ecarts, len(corrections)
+            finally:
+                connection.close()
+
+        total = 0
+        corriges = 0
+        noms = dict(magasins)
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(traiter, magasin_id): magasin_id for magasin_id, _ in magasins}
+            for future in as_completed(futures):
+                magasin_id = futures[future]
+                ecarts, nb_corrections = future.result()
+                total += len(ecarts)
+                corriges += nb_corrections
+                ligne = f"{noms[magasin_id]} (#{magasin_id}) : {len(ecarts)} écart(s)"
+                if auteur is not None:
+                    ligne += f", {nb_corrections} corrigé(s)"
+                self.stdout.write(ligne)
+                if options['verbosity'] >= 2:
+                    for produit_id, attendu, reel in ecarts:
+                        self.stdout.write(f"  produit #{produit_id} : attendu {attendu}, en stock {reel}, écart {reel - attendu:+d}")
+
+        message = f"{total} écart(s) sur {len(magasins)} magasin(s)"
+        if auteur is not None and total:
+            message += f", {corriges} correction(s) enregistrée(s)"
+        self.stdout.write(self.style.SUCCESS(message) if not total or auteur else self.style.WARNING(message))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0002_mouvement_justificatif_mouvement_statut_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mouvement',
+            name='lot',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
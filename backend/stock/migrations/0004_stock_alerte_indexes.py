@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0003_mouvement_lot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['magasin', 'quantite'], name='stock_magasin_quantite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['quantite'], name='stock_quantite_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def initialiser_niveaux(apps, schema_editor):
+    # Les lignes déjà sous le seuil ne doivent pas déclencher d'alerte au
+    # premier mouvement suivant la migration
+    Stock = apps.get_model('stock', 'Stock')
+    Stock.objects.filter(quantite__lte=0).update(niveau_alerte='rupture')
+    Stock.objects.filter(quantite__gt=0, quantite__lte=models.F('produit__seuil_alerte')).update(niveau_alerte='stock_bas')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0004_stock_alerte_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='stock',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='stock.stock'),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='niveau_alerte',
+            field=models.CharField(blank=True, choices=[('stock_bas', "Sous le seuil d'alerte"), ('rupture', 'Rupture')], max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='mouvement',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='stock.mouvement'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('mouvement_attente', 'Mouvement en attente de validation'), ('mouvement_valide', 'Mouvement validé'), ('mouvement_rejete', 'Mouvement rejeté'), ('stock_bas', "Stock sous le seuil d'alerte"), ('rupture', 'Rupture de stock')], max_length=30),
+        ),
+        migrations.RunPython(initialiser_niveaux, migrations.RunPython.noop),
+    ]
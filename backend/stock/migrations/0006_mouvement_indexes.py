@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0005_stock_niveau_alerte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mouvement',
+            index=models.Index(fields=['magasin', 'date'], name='mouvement_magasin_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mouvement',
+            index=models.Index(fields=['produit', 'date'], name='mouvement_produit_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mouvement',
+            index=models.Index(fields=['statut', 'date'], name='mouvement_statut_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mouvement',
+            index=models.Index(fields=['user', 'date'], name='mouvement_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mouvement',
+            index=models.Index(fields=['date', 'id'], name='mouvement_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0001_initial'),
+        ('products', '0003_produit_seuil_mouvement'),
+        ('stock', '0006_mouvement_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('quantite', models.IntegerField()),
+                ('entrees', models.IntegerField(default=0)),
+                ('sorties', models.IntegerField(default=0)),
+                ('magasin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stores.magasin')),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.produit')),
+            ],
+            options={
+                'verbose_name': 'Historique de stock',
+                'verbose_name_plural': 'Historiques de stock',
+                'ordering': ['-jour'],
+                'indexes': [models.Index(fields=['magasin', 'jour'], name='snapshot_magasin_jour_idx'), models.Index(fields=['jour'], name='snapshot_jour_idx')],
+                'unique_together': {('produit', 'magasin', 'jour')},
+            },
+        ),
+    ]
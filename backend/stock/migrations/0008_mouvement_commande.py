@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0007_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mouvement',
+            name='commande',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mouvements', to='stock.commande'),
+        ),
+    ]
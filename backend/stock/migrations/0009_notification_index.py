@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0008_mouvement_commande'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['destinataire', 'lu', 'date'], name='notification_dest_lu_date_idx'),
+        ),
+    ]
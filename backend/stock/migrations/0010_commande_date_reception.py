@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:35
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def dater_receptions(apps, schema_editor):
+    # Commandes déjà réceptionnées : celles qui ont des entrées 'livraison'
+    Commande = apps.get_model('stock', 'Commande')
+    Mouvement = apps.get_model('stock', 'Mouvement')
+    for commande_id, date in (
+        Mouvement.objects.filter(commande__isnull=False, motif='livraison')
+        .values('commande_id').annotate(date=Min('date')).values_list('commande_id', 'date')
+    ):
+        Commande.objects.filter(pk=commande_id).update(date_reception=date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0009_notification_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='date_reception',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(dater_receptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_produit_seuil_mouvement'),
+        ('stores', '0001_initial'),
+        ('stock', '0010_commande_date_reception'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariationEnAttente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('magasin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stores.magasin')),
+                ('mouvement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='variation_en_attente', to='stock.mouvement')),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.produit')),
+            ],
+            options={
+                'verbose_name': 'Variation en attente',
+                'verbose_name_plural': 'Variations en attente',
+                'indexes': [models.Index(fields=['produit', 'magasin'], name='variation_produit_magasin_idx')],
+            },
+        ),
+    ]
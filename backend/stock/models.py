@@ -1,12 +1,21 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from products.models import Produit
 from stores.models import Magasin
 
 class Stock(models.Model):
+    NIVEAU_ALERTE_CHOICES = [
+        ('stock_bas', "Sous le seuil d'alerte"),
+        ('rupture', 'Rupture'),
+    ]
+
     produit = models.ForeignKey(Produit, on_delete=models.CASCADE)
     magasin = models.ForeignKey(Magasin, on_delete=models.CASCADE)
     quantite = models.IntegerField(default=0)
+    # Dernier niveau d'alerte notifié, remis à zéro quand le stock remonte
+    niveau_alerte = models.CharField(max_length=20, choices=NIVEAU_ALERTE_CHOICES, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
@@ -22,6 +31,11 @@ class Stock(models.Model):
     
     class Meta:
         unique_together = ['produit', 'magasin']
+        indexes = [
+            # Alertes et ruptures par magasin (quantite <= seuil, quantite = 0)
+            models.Index(fields=['magasin', 'quantite'], name='stock_magasin_quantite_idx'),
+            models.Index(fields=['quantite'], name='stock_quantite_idx'),
+        ]
         verbose_name = 'Stock'
         verbose_name_plural = 'Stocks'
 
@@ -58,6 +72,8 @@ class Mouvement(models.Model):
     motif = models.CharField(max_length=50, choices=MOTIF_CHOICES)
     justificatif = models.FileField(upload_to='justificatifs/', null=True, blank=True)
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='attente')
+    lot = models.UUIDField(null=True, blank=True, editable=False, db_index=True)  # identifiant d'envoi groupé
+    commande = models.ForeignKey('Commande', on_delete=models.SET_NULL, null=True, blank=True, related_name='mouvements')  # réception fournisseur
     
     def __str__(self):
         return f"{self.type} - {self.produit.nom} ({self.quantite})"
@@ -78,6 +94,57 @@ class Mouvement(models.Model):
         verbose_name = 'Mouvement'
         verbose_name_plural = 'Mouvements'
         ordering = ['-date']
+        indexes = [
+            # Historique filtré, parcouru par curseur (date, id)
+            models.Index(fields=['magasin', 'date'], name='mouvement_magasin_date_idx'),
+            models.Index(fields=['produit', 'date'], name='mouvement_produit_date_idx'),
+            models.Index(fields=['statut', 'date'], name='mouvement_statut_date_idx'),
+            models.Index(fields=['user', 'date'], name='mouvement_user_date_idx'),
+            models.Index(fields=['date', 'id'], name='mouvement_date_id_idx'),
+        ]
+
+class VariationEnAttente(models.Model):
+    """
+    Variation d'une vente en écriture différée (voir tampon.py), pas encore
+    répercutée sur Stock. Écrite dans la transaction du mouvement, supprimée
+    par appliquer_deltas quand elle est appliquée.
+    """
+    produit = models.ForeignKey(Produit, on_delete=models.CASCADE)
+    magasin = models.ForeignKey(Magasin, on_delete=models.CASCADE)
+    mouvement = models.OneToOneField(Mouvement, on_delete=models.CASCADE, related_name='variation_en_attente')
+    delta = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.produit_id}/{self.magasin_id}: {self.delta}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['produit', 'magasin'], name='variation_produit_magasin_idx'),
+        ]
+        verbose_name = 'Variation en attente'
+        verbose_name_plural = 'Variations en attente'
+
+class StockSnapshot(models.Model):
+    """Quantité de clôture d'une ligne de stock pour chaque jour où elle a bougé"""
+    produit = models.ForeignKey(Produit, on_delete=models.CASCADE)
+    magasin = models.ForeignKey(Magasin, on_delete=models.CASCADE)
+    jour = models.DateField()
+    quantite = models.IntegerField()
+    entrees = models.IntegerField(default=0)
+    sorties = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.produit_id}/{self.magasin_id} {self.jour}: {self.quantite}"
+
+    class Meta:
+        unique_together = ['produit', 'magasin', 'jour']
+        indexes = [
+            models.Index(fields=['magasin', 'jour'], name='snapshot_magasin_jour_idx'),
+            models.Index(fields=['jour'], name='snapshot_jour_idx'),
+        ]
+        verbose_name = 'Historique de stock'
+        verbose_name_plural = 'Historiques de stock'
+        ordering = ['-jour']
 
 class Commande(models.Model):
     STATUT_CHOICES = [
@@ -90,6 +157,8 @@ class Commande(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
     total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Renseignée par la réception (receptionner_commande), seule à créer les entrées en stock
+    date_reception = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"Commande {self.id} - {self.fournisseur.nom}"
@@ -108,9 +177,12 @@ class Notification(models.Model):
         ('mouvement_attente', 'Mouvement en attente de validation'),
         ('mouvement_valide', 'Mouvement validé'),
         ('mouvement_rejete', 'Mouvement rejeté'),
+        ('stock_bas', "Stock sous le seuil d'alerte"),
+        ('rupture', 'Rupture de stock'),
     ]
     destinataire = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications_recues')
-    mouvement = models.ForeignKey(Mouvement, on_delete=models.CASCADE, related_name='notifications')
+    mouvement = models.ForeignKey(Mouvement, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True)
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True)
     type = models.CharField(max_length=30, choices=NOTIF_TYPE_CHOICES)
     message = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
@@ -123,6 +195,10 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-date']
+        indexes = [
+            # Flux et compteur de non-lues par destinataire
+            models.Index(fields=['destinataire', 'lu', 'date'], name='notification_dest_lu_date_idx'),
+        ]
 
 
 class CommandeDetail(models.Model):
@@ -144,4 +220,41 @@ class CommandeDetail(models.Model):
     
     class Meta:
         verbose_name = 'Détail de commande'
-        verbose_name_plural = 'Détails de commandes'
\ No newline at end of file
+        verbose_name_plural = 'Détails de commandes'
+
+
+@receiver([post_save, post_delete], sender=Stock)
+@receiver([post_save, post_delete], sender=Produit)
+def invalider_tableau_de_bord(sender, **kwargs):
+    """Les indicateurs en cache dépendent des quantités et des prix/seuils produits"""
+    from .tableau_de_bord import invalider
+    invalider()
+
+
+
+@receiver(post_save, sender=Produit)
+def recalculer_alertes_produit(sender, instance, created, update_fields=None, **kwargs):
+    """Le niveau d'alerte des lignes de stock du produit dépend de son seuil"""
+    if created or (update_fields is not None and 'seuil_alerte' not in update_fields):
+        return
+    from .services import recalculer_alertes
+    recalculer_alertes(models.Q(produit_id=instance.pk))
+
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalider_destinataires(sender, update_fields=None, **kwargs):
+    """Les listes de managers par magasin dépendent du rôle, du magasin et de l'activation"""
+    if update_fields is not None and set(update_fields) <= {'last_login', 'password'}:
+        return
+    from .notifications import invalider
+    invalider()
+
+
+
+@receiver(post_save, sender=Notification)
+def signaler_notification(sender, instance, created, **kwargs):
+    """Réveille le flux d'événements du destinataire (les bulk_create signalent eux-mêmes)"""
+    if created:
+        from messaging.evenements import signaler
+        signaler([instance.destinataire_id])
@@ -0,0 +1,119 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+CLE_VERSION = 'destinataires:version'
+
+
+def invalider():
+    """Invalide les listes de destinataires en cache (appelé après toute écriture User)"""
+    cache.set(CLE_VERSION, uuid.uuid4().hex, None)
+
+
+def managers_par_magasin(magasin_ids):
+    """{magasin_id: [id des managers actifs]}, mis en cache par magasin"""
+    version = cache.get_or_set(CLE_VERSION, uuid.uuid4().hex, None)
+    cles = {magasin_id: f'destinataires:{version}:{magasin_id}' for magasin_id in magasin_ids}
+    en_cache = cache.get_many(cles.values())
+    resultat = {magasin_id: en_cache[cle] for magasin_id, cle in cles.items() if cle in en_cache}
+
+    manquants = set(cles) - set(resultat)
+    if manquants:
+        for magasin_id in manquants:
+            resultat[magasin_id] = []
+        for user_id, magasin_id in get_user_model().objects.filter(
+            role='manager', is_active=True, magasin_id__in=manquants
+        ).order_by('id').values_list('id', 'magasin_id'):
+            resultat[magasin_id].append(user_id)
+        cache.set_many(
+            {cles[magasin_id]: resultat[magasin_id] for magasin_id in manquants},
+            getattr(settings, 'STOCK_DESTINATAIRES_TTL', 300),
+        )
+    return resultat
+
+
+def administrateurs():
+    """id des administrateurs actifs (is_staff), mis en cache"""
+    version = cache.get_or_set(CLE_VERSION, uuid.uuid4().hex, None)
+    cle = f'destinataires:{version}:administrateurs'
+    resultat = cache.get(cle)
+    if resultat is None:
+        resultat = list(
+            get_user_model().objects.filter(is_staff=True, is_active=True).order_by('id').values_list('id', flat=True)
+        )
+        cache.set(cle, resultat, getattr(settings, 'STOCK_DESTINATAIRES_TTL', 300))
+    return resultat
+
+
+def notifier_managers(envois, avec_administrateurs=False):
+    """
+    Notifie les managers du magasin de chaque envoi, et tous les
+    administrateurs si `avec_administrateurs`, en un seul INSERT.
+
+    Chaque envoi est un dict magasin_id, type, message et, au choix,
+    mouvement_id / stock_id. Si STOCK_NOTIFICATIONS_ASYNC est actif, la
+    diffusion a lieu après le commit, hors du thread de la requête.
+    """
+    if not envois:
+        return
+    if getattr(settings, 'STOCK_NOTIFICATIONS_ASYNC', False):
+        transaction.on_commit(lambda: _executeur().submit(_en_arriere_plan, envois, avec_administrateurs))
+    else:
+        _creer(envois, avec_administrateurs)
+
+
+def _creer(envois, avec_administrateurs):
+    from messaging.evenements import signaler
+
+    managers = managers_par_magasin({envoi['magasin_id'] for envoi in envois})
+    admins = administrateurs() if avec_administrateurs else []
+    destinataires = {
+        magasin_id: ids + [admin_id for admin_id in admins if admin_id not in ids]
+        for magasin_id, ids in managers.items()
+    }
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            destinataire_id=destinataire_id,
+            type=envoi['type'],
+            message=envoi['message'],
+            mouvement_id=envoi.get('mouvement_id'),
+            stock_id=envoi.get('stock_id'),
+        )
+        for envoi in envois for destinataire_id in destinataires[envoi['magasin_id']]
+    ], batch_size=1000)
+    # bulk_create n'émet pas post_save
+    signaler({notification.destinataire_id for notification in notifications})
+
+
+def _en_arriere_plan(envois, avec_administrateurs):
+    close_old_connections()
+    try:
+        _creer(envois, avec_administrateurs)
+    except Exception:
+        logger.exception("Échec de la diffusion de %d notification(s)", len(envois))
+    finally:
+        close_old_connections()
+
+
+_executeur_instance = None
+_executeur_verrou = threading.Lock()
+
+
+def _executeur():
+    # Un seul thread : les notifications restent dans l'ordre des commits
+    global _executeur_instance
+    if _executeur_instance is None:
+        with _executeur_verrou:
+            if _executeur_instance is None:
+                _executeur_instance = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifications')
+    return _executeur_instance
@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MouvementCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur (date, id) : pas d'OFFSET ni de COUNT(*),
+    le coût d'une page reste constant quelle que soit sa profondeur.
+    """
+    ordering = ('-date', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class MouvementAttentePagination(MouvementCursorPagination):
+    """File de validation : les mouvements les plus anciens d'abord"""
+    ordering = ('date', 'id')
+
+
+class NotificationCursorPagination(CursorPagination):
+    """Flux de notifications, du plus récent au plus ancien"""
+    ordering = ('-date', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,5 +1,10 @@
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
 from rest_framework import serializers
+from products.models import Produit
 from .models import Stock, Mouvement, Commande, CommandeDetail, Notification
+from .services import recalculer_alertes, recalculer_total
+from .tampon import vider_variations
 
 class StockSerializer(serializers.ModelSerializer):
     produit_id = serializers.SerializerMethodField()
@@ -16,6 +21,47 @@ class StockSerializer(serializers.ModelSerializer):
     def get_magasin_id(self, obj):
         return str(obj.magasin.id) if obj.magasin else None
 
+    @transaction.atomic
+    def create(self, validated_data):
+        stock = super().create(validated_data)
+        recalculer_alertes(Q(pk=stock.pk))
+        return stock
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        # Les ventes différées déjà acceptées précèdent la saisie manuelle
+        if vider_variations(produit_id=instance.produit_id, magasin_id=instance.magasin_id):
+            instance.refresh_from_db()
+        stock = super().update(instance, validated_data)
+        recalculer_alertes(Q(pk=stock.pk))
+        return stock
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Ventes en écriture différée pas encore répercutées (annoter_en_attente)
+        en_attente = getattr(instance, 'en_attente', None)
+        if en_attente:
+            data['quantite'] = max(instance.quantite + en_attente, 0)
+        return data
+
+class StockAlerteSerializer(serializers.ModelSerializer):
+    produit_id = serializers.CharField(source='produit.id', read_only=True)
+    produit_nom = serializers.CharField(source='produit.nom', read_only=True)
+    produit_reference = serializers.CharField(source='produit.reference', read_only=True)
+    seuil_alerte = serializers.IntegerField(source='produit.seuil_alerte', read_only=True)
+    magasin_id = serializers.CharField(source='magasin.id', read_only=True)
+    magasin_nom = serializers.CharField(source='magasin.nom', read_only=True)
+    rupture = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Stock
+        fields = ['id', 'produit', 'produit_id', 'produit_nom', 'produit_reference', 'seuil_alerte',
+                  'magasin', 'magasin_id', 'magasin_nom', 'quantite', 'rupture', 'updated_at']
+        read_only_fields = fields
+
+    def get_rupture(self, obj):
+        return obj.quantite <= 0
+
 class MouvementSerializer(serializers.ModelSerializer):
     produit_id = serializers.SerializerMethodField()
     magasin_id = serializers.SerializerMethodField()
@@ -29,13 +75,13 @@ class MouvementSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date', 'user', 'justificatif_url', 'statut']
 
     def get_produit_id(self, obj):
-        return str(obj.produit.id) if obj.produit else None
+        return str(obj.produit_id) if obj.produit_id else None
 
     def get_magasin_id(self, obj):
-        return str(obj.magasin.id) if obj.magasin else None
+        return str(obj.magasin_id) if obj.magasin_id else None
 
     def get_user_id(self, obj):
-        return str(obj.user.id) if obj.user else None
+        return str(obj.user_id) if obj.user_id else None
 
     def get_justificatif_url(self, obj):
         request = self.context.get('request')
@@ -50,20 +96,125 @@ class MouvementSerializer(serializers.ModelSerializer):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+class MouvementLotSerializer(serializers.ListSerializer):
+    """Validation ligne à ligne d'un envoi groupé de mouvements"""
+
+    def valider_lignes(self):
+        """
+        Valide chaque ligne indépendamment, puis résout produits et magasins
+        en une requête chacun. Retourne (lignes_valides, erreurs) où
+        lignes_valides est une liste de (index, donnees) et erreurs un
+        dictionnaire index -> erreurs.
+        """
+        from stores.models import Magasin
+
+        lignes, erreurs = [], {}
+        for index, item in enumerate(self.initial_data):
+            try:
+                lignes.append((index, self.child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                erreurs[index] = exc.detail
+
+        produits = Produit.objects.in_bulk({d['produit'] for _, d in lignes})
+        magasins = Magasin.objects.in_bulk({d['magasin'] for _, d in lignes})
+
+        valides = []
+        for index, donnees in lignes:
+            ligne_erreurs = {}
+            if donnees['produit'] not in produits:
+                ligne_erreurs['produit'] = [f"Produit {donnees['produit']} introuvable."]
+            if donnees['magasin'] not in magasins:
+                ligne_erreurs['magasin'] = [f"Magasin {donnees['magasin']} introuvable."]
+            if ligne_erreurs:
+                erreurs[index] = ligne_erreurs
+                continue
+            donnees['produit'] = produits[donnees['produit']]
+            donnees['magasin'] = magasins[donnees['magasin']]
+            valides.append((index, donnees))
+        return valides, erreurs
+
+
+class MouvementLotItemSerializer(serializers.Serializer):
+    produit = serializers.IntegerField()
+    magasin = serializers.IntegerField()
+    type = serializers.ChoiceField(choices=Mouvement.TYPE_CHOICES)
+    quantite = serializers.IntegerField(min_value=1)
+    motif = serializers.ChoiceField(choices=Mouvement.MOTIF_CHOICES)
+
+    class Meta:
+        list_serializer_class = MouvementLotSerializer
+
 class CommandeDetailSerializer(serializers.ModelSerializer):
     commande_id = serializers.SerializerMethodField()
+    # Id simple plutôt que PrimaryKeyRelatedField : en ligne d'une commande,
+    # CommandeSerializer vérifie tous les produits en une requête
+    produit = serializers.IntegerField(source='produit_id')
     produit_id = serializers.SerializerMethodField()
+    produit_nom = serializers.CharField(source='produit.nom', read_only=True)
+    quantite = serializers.IntegerField(min_value=1)
     
     class Meta:
         model = CommandeDetail
-        fields = ['id', 'commande', 'commande_id', 'produit', 'produit_id', 'quantite', 'prix_unitaire']
-        read_only_fields = ['id']
+        fields = ['id', 'commande', 'commande_id', 'produit', 'produit_id', 'produit_nom', 'quantite', 'prix_unitaire']
+        # La commande est fixée par l'URL ou par la commande parente
+        read_only_fields = ['id', 'commande']
     
     def get_commande_id(self, obj):
-        return str(obj.commande.id) if obj.commande else None
+        return str(obj.commande_id) if obj.commande_id else None
     
     def get_produit_id(self, obj):
-        return str(obj.produit.id) if obj.produit else None
+        return str(obj.produit_id) if obj.produit_id else None
+
+    def validate_produit(self, value):
+        if self.parent is None and not Produit.objects.filter(pk=value).exists():
+            raise serializers.ValidationError(f"Produit {value} introuvable.")
+        return value
+
+class NotificationFluxSerializer(serializers.ModelSerializer):
+    """Notification compacte pour le flux interrogé périodiquement"""
+    mouvement_statut = serializers.CharField(source='mouvement.statut', read_only=True, default=None)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'type', 'message', 'date', 'lu', 'mouvement_id', 'mouvement_statut', 'stock_id']
+        read_only_fields = fields
+
+
+class ReceptionLigneSerializer(serializers.Serializer):
+    detail = serializers.IntegerField()
+    quantite = serializers.IntegerField(min_value=0)
+
+
+class ValidationLotSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+    action = serializers.ChoiceField(choices=['accepte', 'rejete'])
+
+
+class TransfertLigneSerializer(serializers.Serializer):
+    produit = serializers.IntegerField()
+    quantite = serializers.IntegerField(min_value=1)
+
+
+class TransfertSerializer(serializers.Serializer):
+    source = serializers.IntegerField()
+    destination = serializers.IntegerField()
+    lignes = TransfertLigneSerializer(many=True, allow_empty=False, max_length=10000)
+
+    def validate(self, data):
+        from stores.models import Magasin
+
+        if data['source'] == data['destination']:
+            raise serializers.ValidationError({'destination': ['La destination doit différer de la source.']})
+        magasins = set(Magasin.objects.filter(id__in=[data['source'], data['destination']]).values_list('id', flat=True))
+        for champ in ('source', 'destination'):
+            if data[champ] not in magasins:
+                raise serializers.ValidationError({champ: [f"Magasin {data[champ]} introuvable."]})
+        demandes = {ligne['produit'] for ligne in data['lignes']}
+        manquants = demandes - set(Produit.objects.filter(id__in=demandes).values_list('id', flat=True))
+        if manquants:
+            raise serializers.ValidationError({'lignes': [f"Produits introuvables : {sorted(manquants)}"]})
+        return data
+
 
 class NotificationSerializer(serializers.ModelSerializer):
     mouvement = MouvementSerializer(read_only=True)
@@ -76,12 +227,60 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 class CommandeSerializer(serializers.ModelSerializer):
     fournisseur_id = serializers.SerializerMethodField()
-    details = CommandeDetailSerializer(many=True, read_only=True)
+    fournisseur_nom = serializers.CharField(source='fournisseur.nom', read_only=True)
+    details = CommandeDetailSerializer(many=True, required=False)
     
     class Meta:
         model = Commande
-        fields = ['id', 'fournisseur', 'fournisseur_id', 'date', 'statut', 'total', 'details']
-        read_only_fields = ['id', 'date']
+        fields = ['id', 'fournisseur', 'fournisseur_id', 'fournisseur_nom', 'date', 'statut', 'total',
+                  'date_reception', 'details']
+        read_only_fields = ['id', 'date', 'total', 'date_reception']
     
     def get_fournisseur_id(self, obj):
-        return str(obj.fournisseur.id) if obj.fournisseur else None
\ No newline at end of file
+        return str(obj.fournisseur_id) if obj.fournisseur_id else None
+
+    def validate_details(self, details):
+        demandes = {detail['produit_id'] for detail in details}
+        manquants = demandes - set(Produit.objects.filter(id__in=demandes).values_list('id', flat=True))
+        if manquants:
+            raise serializers.ValidationError(f"Produits introuvables : {sorted(manquants)}")
+        return details
+
+    def validate_statut(self, value):
+        # 'livree' n'est posé que par la réception, qui crée les entrées en stock
+        if value == 'livree' and (self.instance is None or self.instance.statut != 'livree'):
+            raise serializers.ValidationError(
+                "Une commande passe au statut 'livree' uniquement par sa réception (commandes/<id>/receive/)."
+            )
+        return value
+
+    def _enregistrer_details(self, commande, details):
+        CommandeDetail.objects.bulk_create(
+            [CommandeDetail(commande=commande, **detail) for detail in details], batch_size=1000
+        )
+        commande.total = recalculer_total(commande.pk)
+        # Les lignes viennent d'être remplacées : recharger le prefetch pour la réponse
+        getattr(commande, '_prefetched_objects_cache', {}).pop('details', None)
+        prefetch_related_objects([commande], 'details__produit')
+
+    @transaction.atomic
+    def create(self, validated_data):
+        details = validated_data.pop('details', [])
+        commande = Commande.objects.create(**validated_data)
+        self._enregistrer_details(commande, details)
+        return commande
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        details = validated_data.pop('details', None)
+        # Verrou : une réception concurrente a déjà créé les entrées des lignes actuelles
+        if details is not None and Commande.objects.select_for_update().filter(
+            pk=instance.pk, date_reception__isnull=False
+        ).exists():
+            raise serializers.ValidationError({'details': ["Commande déjà réceptionnée : ses lignes ne peuvent plus changer."]})
+        commande = super().update(instance, validated_data)
+        # Des lignes fournies remplacent intégralement les lignes existantes
+        if details is not None:
+            commande.details.all().delete()
+            self._enregistrer_details(commande, details)
+        return commande
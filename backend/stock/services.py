@@ -0,0 +1,400 @@
+from functools import reduce
+import operator
+import uuid
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Produit
+from stores.models import Magasin
+from .models import Stock, Mouvement, Notification, Commande, CommandeDetail, VariationEnAttente
+from . import tableau_de_bord
+from .historique import invalider_snapshots
+from .notifications import notifier_managers
+from messaging.evenements import signaler
+
+
+def delta_mouvement(mouvement):
+    """Variation signée de stock induite par un mouvement"""
+    if mouvement.type == 'entrée':
+        return mouvement.quantite
+    return -mouvement.quantite
+
+
+def statut_initial(produit, quantite):
+    """'attente' si la quantité dépasse le seuil de mouvement du produit, sinon 'valide'"""
+    seuil_mouvement = getattr(produit, 'seuil_mouvement', None)
+    if seuil_mouvement is not None and seuil_mouvement > 0 and quantite > seuil_mouvement:
+        return 'attente'
+    return 'valide'
+
+
+GRAVITE_ALERTE = {None: 0, 'stock_bas': 1, 'rupture': 2}
+
+
+class StockInsuffisant(Exception):
+    """Levée par appliquer_deltas(strict=True) ; `lignes` liste les (produit_id, magasin_id, disponible, demande)"""
+
+    def __init__(self, lignes):
+        super().__init__(f"Stock insuffisant pour {len(lignes)} ligne(s)")
+        self.lignes = lignes
+
+
+def niveau_alerte(quantite, seuil_alerte):
+    """Niveau d'alerte d'une ligne de stock : 'rupture', 'stock_bas' ou None"""
+    if quantite <= 0:
+        return 'rupture'
+    if quantite <= seuil_alerte:
+        return 'stock_bas'
+    return None
+
+
+def _evaluer_alerte(stock, produit, alertes):
+    """
+    Pose stock.niveau_alerte. Une alerte (ajoutée à `alertes`) n'est émise que
+    lorsque le niveau s'aggrave ; elle est réarmée quand le stock repasse
+    au-dessus du seuil.
+    """
+    niveau = niveau_alerte(stock.quantite, produit['seuil_alerte'])
+    if GRAVITE_ALERTE[niveau] > GRAVITE_ALERTE[stock.niveau_alerte]:
+        alertes.append((stock, niveau, produit))
+    stock.niveau_alerte = niveau
+
+
+@transaction.atomic
+def recalculer_alertes(filtre):
+    """
+    Recalcule niveau_alerte des lignes de stock filtrées (Q) écrites hors
+    appliquer_deltas : saisie manuelle d'une quantité, changement du seuil
+    d'alerte d'un produit. Les ventes en écriture différée de ces lignes sont
+    d'abord répercutées. Retourne le nombre de lignes dont le niveau change.
+    """
+    stocks = list(Stock.objects.select_for_update().filter(filtre).order_by('produit_id', 'magasin_id'))
+    if not stocks:
+        return 0
+    variations, en_attente = _verrouiller_variations(_filtre_lignes([(s.produit_id, s.magasin_id) for s in stocks]))
+    produits = {
+        p['id']: p for p in
+        Produit.objects.filter(id__in={s.produit_id for s in stocks}).values('id', 'nom', 'seuil_alerte')
+    }
+    alertes = []
+    modifies = []
+    niveaux_changes = 0
+    maintenant = timezone.now()
+    for stock in stocks:
+        avant = stock.niveau_alerte
+        deltas = en_attente.get((stock.produit_id, stock.magasin_id), ())
+        for delta in deltas:
+            stock.quantite = max(stock.quantite + delta, 0)
+        if deltas:
+            stock.updated_at = maintenant
+        _evaluer_alerte(stock, produits[stock.produit_id], alertes)
+        niveaux_changes += stock.niveau_alerte != avant
+        if stock.niveau_alerte != avant or deltas:
+            modifies.append(stock)
+    if modifies:
+        Stock.objects.bulk_update(modifies, ['quantite', 'niveau_alerte', 'updated_at'])
+    if variations:
+        VariationEnAttente.objects.filter(id__in=variations).delete()
+    if alertes:
+        _notifier_alertes(alertes)
+    return niveaux_changes
+
+
+def _notifier_alertes(alertes):
+    """Notifie les managers de chaque magasin concerné, en un seul INSERT"""
+    magasins = dict(Magasin.objects.filter(id__in={stock.magasin_id for stock, _, _ in alertes}).values_list('id', 'nom'))
+    envois = []
+    for stock, niveau, produit in alertes:
+        if niveau == 'rupture':
+            message = f"Alerte rupture : {produit['nom']} n'est plus en stock ({magasins.get(stock.magasin_id)})."
+        else:
+            message = (
+                f"Alerte stock bas : {produit['nom']}, {stock.quantite} restant(s) pour un seuil de "
+                f"{produit['seuil_alerte']} ({magasins.get(stock.magasin_id)})."
+            )
+        envois.append({'magasin_id': stock.magasin_id, 'stock_id': stock.pk, 'type': niveau, 'message': message})
+    notifier_managers(envois)
+
+
+def notifier_mouvements_attente(mouvements, user):
+    """
+    Notifie les managers du magasin de chaque mouvement en attente, ainsi que
+    les administrateurs (is_staff), en un seul INSERT
+    """
+    nom = f"{user.prenom} {user.nom}".strip()
+    employe = f"{nom} ({user.email})" if nom else user.email
+    notifier_managers([
+        {
+            'magasin_id': mouvement.magasin_id,
+            'mouvement_id': mouvement.pk,
+            'type': 'mouvement_attente',
+            'message': (
+                f"Nouveau mouvement à valider : {mouvement.produit.nom}, quantité : {mouvement.quantite}, "
+                f"motif : {mouvement.motif}, employé : {employe}"
+            ),
+        }
+        for mouvement in mouvements
+    ], avec_administrateurs=True)
+
+
+def _filtre_lignes(cles):
+    """Filtre ciblant exactement les couples (produit_id, magasin_id) donnés"""
+    par_magasin = {}
+    for produit_id, magasin_id in cles:
+        par_magasin.setdefault(magasin_id, []).append(produit_id)
+    return reduce(operator.or_, (
+        Q(magasin_id=magasin_id, produit_id__in=produit_ids)
+        for magasin_id, produit_ids in par_magasin.items()
+    ))
+
+
+def _verrouiller_variations(filtre):
+    """
+    Verrouille les ventes en écriture différée des lignes filtrées, après les
+    lignes Stock comme dans tout vidage : deux écrivains ne peuvent pas
+    appliquer la même variation. Retourne (ids, {(produit_id, magasin_id):
+    [delta, ...]}) dans l'ordre d'arrivée.
+    """
+    ids, en_attente = [], {}
+    for id_variation, produit_id, magasin_id, delta in (
+        VariationEnAttente.objects.select_for_update().filter(filtre).order_by('id')
+        .values_list('id', 'produit_id', 'magasin_id', 'delta')
+    ):
+        ids.append(id_variation)
+        en_attente.setdefault((produit_id, magasin_id), []).append(delta)
+    return ids, en_attente
+
+
+@transaction.atomic
+def appliquer_deltas(deltas, strict=False):
+    """
+    Applique une suite de variations (produit_id, magasin_id, delta) au stock.
+
+    Les lignes Stock manquantes sont créées à 0, puis toutes les lignes
+    concernées sont verrouillées (SELECT ... FOR UPDATE) dans l'ordre
+    (produit_id, magasin_id) pour éviter les interblocages entre opérations
+    multi-lignes. Les variations d'une même ligne sont appliquées dans
+    l'ordre reçu avec plancher à zéro, comme un enchaînement de mouvements.
+    Les ventes en écriture différée encore en attente sur ces lignes (voir
+    tampon.py) sont appliquées d'abord, dans leur ordre d'arrivée, puis
+    supprimées. En mode strict, une ligne qui passerait sous zéro annule toute
+    l'opération (StockInsuffisant) au lieu d'être ramenée à zéro.
+
+    Retourne {(produit_id, magasin_id): (quantite_avant, quantite_apres)}.
+    """
+    par_ligne = {}
+    for produit_id, magasin_id, delta in deltas:
+        par_ligne.setdefault((int(produit_id), int(magasin_id)), []).append(delta)
+    if not par_ligne:
+        return {}
+
+    cles = sorted(par_ligne)
+    filtre = _filtre_lignes(cles)
+
+    # Création des lignes absentes ; ignore_conflicts absorbe la course avec
+    # un autre écrivain qui crée la même ligne au même moment.
+    existantes = set(Stock.objects.filter(filtre).values_list('produit_id', 'magasin_id'))
+    manquantes = [Stock(produit_id=p, magasin_id=m, quantite=0) for p, m in cles if (p, m) not in existantes]
+    if manquantes:
+        Stock.objects.bulk_create(manquantes, ignore_conflicts=True)
+
+    stocks = {
+        (s.produit_id, s.magasin_id): s
+        for s in Stock.objects.select_for_update().filter(filtre).order_by('produit_id', 'magasin_id')
+    }
+
+    variations, en_attente = _verrouiller_variations(filtre)
+
+    produits = {
+        p['id']: p for p in Produit.objects.filter(id__in={p for p, _ in cles}).values('id', 'nom', 'seuil_alerte')
+    }
+
+    maintenant = timezone.now()
+    resultats = {}
+    alertes = []
+    insuffisantes = []
+    for cle in cles:
+        stock = stocks[cle]
+        # Ventes déjà acceptées : plancher à zéro, jamais StockInsuffisant
+        for delta in en_attente.get(cle, ()):
+            stock.quantite = max(stock.quantite + delta, 0)
+        avant = stock.quantite
+        for delta in par_ligne[cle]:
+            if strict and stock.quantite + delta < 0:
+                insuffisantes.append((cle[0], cle[1], stock.quantite, -delta))
+            stock.quantite = max(stock.quantite + delta, 0)
+        stock.updated_at = maintenant
+        resultats[cle] = (avant, stock.quantite)
+
+        _evaluer_alerte(stock, produits[cle[0]], alertes)
+
+    if insuffisantes:
+        raise StockInsuffisant(insuffisantes)
+    Stock.objects.bulk_update([stocks[cle] for cle in cles], ['quantite', 'niveau_alerte', 'updated_at'])
+    if variations:
+        VariationEnAttente.objects.filter(id__in=variations).delete()
+    if alertes:
+        _notifier_alertes(alertes)
+    # bulk_update n'émet pas de signaux : invalidation explicite des indicateurs
+    transaction.on_commit(tableau_de_bord.invalider)
+    return resultats
+
+
+def appliquer_mouvement(mouvement):
+    """Répercute un mouvement validé sur la ligne Stock correspondante"""
+    cle = (mouvement.produit_id, mouvement.magasin_id)
+    return appliquer_deltas([(cle[0], cle[1], delta_mouvement(mouvement))])[cle]
+
+
+def creer_mouvements(mouvements, lot=None):
+    """
+    Insère des mouvements en bulk_create et garantit que leurs id sont renseignés.
+
+    MySQL ne renvoie pas les clés générées par un INSERT multi-lignes : les
+    mouvements sont alors relus via leur identifiant de lot, dans l'ordre
+    d'insertion.
+    """
+    lot = lot or uuid.uuid4()
+    for mouvement in mouvements:
+        mouvement.lot = lot
+    crees = Mouvement.objects.bulk_create(mouvements, batch_size=1000)
+    if crees and crees[0].pk is None:
+        ids = Mouvement.objects.filter(lot=lot).order_by('id').values_list('id', flat=True)
+        for mouvement, pk in zip(crees, ids):
+            mouvement.pk = pk
+    return crees
+
+
+@transaction.atomic
+def transferer(source_id, destination_id, lignes, user):
+    """
+    Transfert entre magasins : pour chaque (produit_id, quantite), une sortie
+    'transfert_sortant' du magasin source et une entrée 'transfert_entrant'
+    dans le magasin destination, partageant le même identifiant de lot.
+    Les deux côtés sont appliqués dans une seule transaction ; un stock source
+    insuffisant annule tout le transfert (StockInsuffisant).
+    Retourne (lot, mouvements).
+    """
+    lot = uuid.uuid4()
+    mouvements = []
+    for produit_id, quantite in lignes:
+        mouvements.append(Mouvement(
+            produit_id=produit_id, magasin_id=source_id, user=user, type='sortie',
+            motif='transfert_sortant', quantite=quantite, statut='valide',
+        ))
+        mouvements.append(Mouvement(
+            produit_id=produit_id, magasin_id=destination_id, user=user, type='entrée',
+            motif='transfert_entrant', quantite=quantite, statut='valide',
+        ))
+    # Vérifier et verrouiller avant d'écrire les mouvements
+    appliquer_deltas([(m.produit_id, m.magasin_id, delta_mouvement(m)) for m in mouvements], strict=True)
+    return lot, creer_mouvements(mouvements, lot=lot)
+
+
+MESSAGES_VALIDATION = {
+    'accepte': ('mouvement_valide', "Votre mouvement pour {produit} a été validé."),
+    'rejete': ('mouvement_rejete', "Votre mouvement pour {produit} a été rejeté."),
+}
+
+
+@transaction.atomic
+def traiter_mouvements(ids, action, magasin_id=None):
+    """
+    Accepte ou rejette en une fois les mouvements en attente parmi `ids`
+    (limités à `magasin_id` s'il est donné). Les mouvements sont verrouillés
+    dans l'ordre des id, les deltas acceptés appliqués en un seul passage
+    groupé par ligne de stock, les snapshots des jours concernés invalidés,
+    et chaque employé notifié en un seul INSERT.
+    Les id absents, déjà traités ou hors magasin sont ignorés.
+    Retourne la liste des mouvements traités.
+    """
+    mouvements = Mouvement.objects.select_for_update().filter(id__in=ids, statut='attente')
+    if magasin_id is not None:
+        mouvements = mouvements.filter(magasin_id=magasin_id)
+    mouvements = list(mouvements.order_by('id'))
+    if not mouvements:
+        return []
+
+    for mouvement in mouvements:
+        mouvement.statut = action
+    Mouvement.objects.bulk_update(mouvements, ['statut'], batch_size=1000)
+    if action == 'accepte':
+        appliquer_deltas([(m.produit_id, m.magasin_id, delta_mouvement(m)) for m in mouvements])
+        invalider_snapshots(mouvements)
+
+    noms = dict(Produit.objects.filter(id__in={m.produit_id for m in mouvements}).values_list('id', 'nom'))
+    type_notification, message = MESSAGES_VALIDATION[action]
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            destinataire_id=m.user_id, mouvement=m, type=type_notification,
+            message=message.format(produit=noms[m.produit_id]),
+        )
+        for m in mouvements
+    ], batch_size=1000)
+    signaler({notification.destinataire_id for notification in notifications})
+    return mouvements
+
+
+MONTANT_LIGNE = ExpressionWrapper(F('quantite') * F('prix_unitaire'), output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+def recalculer_total(commande_id):
+    """Recalcule en base le total d'une commande à partir de ses lignes"""
+    somme = (
+        CommandeDetail.objects.filter(commande_id=OuterRef('pk')).order_by()
+        .values('commande_id').annotate(somme=Sum(MONTANT_LIGNE)).values('somme')
+    )
+    Commande.objects.filter(pk=commande_id).update(
+        total=Coalesce(Subquery(somme), 0, output_field=Commande._meta.get_field('total'))
+    )
+    return Commande.objects.filter(pk=commande_id).values_list('total', flat=True).first()
+
+
+@transaction.atomic
+def receptionner_commande(commande_id, user, magasin_id, quantites=None):
+    """
+    Réceptionne une commande : une entrée 'livraison' par ligne reçue, appliquées
+    au stock en un seul passage verrouillé, puis passage au statut 'livree' et
+    horodatage de date_reception.
+
+    `quantites` associe un id de CommandeDetail à la quantité reçue ; les lignes
+    absentes sont reçues pour la quantité commandée. La commande est verrouillée
+    le temps de la réception : une seconde réception, concurrente ou non, ne
+    crée aucun mouvement. Une commande marquée 'livree' sans réception reste
+    réceptionnable. Retourne (commande, mouvements, deja_recue).
+    """
+    commande = Commande.objects.select_for_update().get(pk=commande_id)
+    # Le statut seul ne prouve pas la réception : seule date_reception en fait foi
+    if commande.date_reception is not None:
+        return commande, list(commande.mouvements.order_by('id')), True
+    if commande.statut == 'annulee':
+        raise ValueError('Commande annulée')
+
+    details = list(commande.details.order_by('id').values('id', 'produit_id', 'quantite'))
+    quantites = quantites or {}
+    inconnues = set(quantites) - {detail['id'] for detail in details}
+    if inconnues:
+        raise ValueError(f"Lignes inconnues pour cette commande : {sorted(inconnues)}")
+
+    mouvements = creer_mouvements([
+        Mouvement(
+            produit_id=detail['produit_id'],
+            magasin_id=magasin_id,
+            user=user,
+            type='entrée',
+            motif='livraison',
+            quantite=quantites.get(detail['id'], detail['quantite']),
+            statut='valide',
+            commande=commande,
+        )
+        for detail in details if quantites.get(detail['id'], detail['quantite']) > 0
+    ])
+    appliquer_deltas([(m.produit_id, m.magasin_id, m.quantite) for m in mouvements])
+
+    commande.statut = 'livree'
+    commande.date_reception = timezone.now()
+    commande.save(update_fields=['statut', 'date_reception'])
+    return commande, mouvements, False
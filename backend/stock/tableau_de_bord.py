@@ -0,0 +1,102 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from products.models import Produit
+from stores.models import Magasin
+from .models import Stock
+from .tampon import annoter_quantite_lue
+
+CLE_VERSION = 'tableau_de_bord:version'
+
+VALEUR = ExpressionWrapper(F('quantite_lue') * F('produit__prix_unitaire'), output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+def invalider():
+    """Invalide tous les indicateurs en cache (appelé après toute écriture Stock/Produit)"""
+    cache.set(CLE_VERSION, uuid.uuid4().hex, None)
+
+
+def indicateurs(magasin_id=None):
+    """
+    Indicateurs du tableau de bord, pour un magasin ou pour l'ensemble des
+    magasins si magasin_id est None. Le résultat est mis en cache pour
+    STOCK_TABLEAU_BORD_TTL secondes.
+    """
+    version = cache.get_or_set(CLE_VERSION, uuid.uuid4().hex, None)
+    cle = f"tableau_de_bord:{version}:{magasin_id or 'tous'}"
+    resultat = cache.get(cle)
+    if resultat is None:
+        resultat = _calculer(magasin_id)
+        cache.set(cle, resultat, getattr(settings, 'STOCK_TABLEAU_BORD_TTL', 30))
+    return resultat
+
+
+def _agregats():
+    return {
+        'quantite_totale': Coalesce(Sum('quantite_lue'), 0),
+        'valeur_totale': Coalesce(Sum(VALEUR), 0, output_field=VALEUR.output_field),
+        'ruptures': Count('id', filter=Q(quantite_lue=0)),
+        'alertes': Count('id', filter=Q(quantite_lue__lte=F('produit__seuil_alerte'))),
+    }
+
+
+def _calculer(magasin_id):
+    User = get_user_model()
+    # Ventes en écriture différée comprises
+    stocks = annoter_quantite_lue(Stock.objects.all())
+    produits = Produit.objects.all()
+    utilisateurs = User.objects.all()
+    if magasin_id is not None:
+        stocks = stocks.filter(magasin_id=magasin_id)
+        produits = produits.filter(magasin_id=magasin_id)
+        utilisateurs = utilisateurs.filter(magasin_id=magasin_id)
+
+    totaux = stocks.aggregate(total_stocks=Count('id'), **_agregats())
+    par_magasin = (
+        stocks.values('magasin_id', 'magasin__nom')
+        .annotate(**_agregats())
+        .order_by('-quantite_totale')
+    )
+    par_categorie = (
+        stocks.values('produit__categorie')
+        .annotate(quantite_totale=Coalesce(Sum('quantite_lue'), 0))
+        .order_by('-quantite_totale')
+    )
+    comptes_utilisateurs = utilisateurs.aggregate(
+        total=Count('id'),
+        employes=Count('id', filter=Q(role='employe')),
+    )
+
+    return {
+        'magasin_id': magasin_id,
+        'magasin_nom': Magasin.objects.filter(id=magasin_id).values_list('nom', flat=True).first() if magasin_id else None,
+        'total_produits': produits.count(),
+        'total_magasins': Magasin.objects.count() if magasin_id is None else 1,
+        'total_utilisateurs': comptes_utilisateurs['total'],
+        'total_employes': comptes_utilisateurs['employes'],
+        'total_stocks': totaux['total_stocks'],
+        'quantite_totale': totaux['quantite_totale'],
+        'valeur_totale': totaux['valeur_totale'],
+        'ruptures': totaux['ruptures'],
+        'alertes': totaux['alertes'],
+        'par_magasin': [
+            {
+                'magasin_id': ligne['magasin_id'],
+                'magasin_nom': ligne['magasin__nom'],
+                'quantite': ligne['quantite_totale'],
+                'valeur': ligne['valeur_totale'],
+                'ruptures': ligne['ruptures'],
+                'alertes': ligne['alertes'],
+            }
+            for ligne in par_magasin
+        ],
+        'par_categorie': [
+            {'categorie': ligne['produit__categorie'] or 'Autre', 'quantite': ligne['quantite_totale']}
+            for ligne in par_categorie
+        ],
+    }
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import VariationEnAttente
+
+logger = logging.getLogger(__name__)
+
+
+class TamponStock:
+    """
+    Écriture différée des sorties 'vente' validées automatiquement.
+
+    La variation est enregistrée (VariationEnAttente) dans la transaction qui
+    crée le mouvement, sans verrouiller la ligne Stock. Elle est répercutée
+    par appliquer_deltas : au prochain mouvement direct sur la même ligne, ou
+    par le thread de vidage, toutes les `intervalle_ms` millisecondes ou dès
+    que `max_evenements` ventes ont été reçues par le processus.
+
+    Les variations étant en base, rien n'est perdu si le processus s'arrête,
+    et plusieurs processus peuvent cohabiter : chacun vide toutes les lignes
+    en attente, sous le verrou des lignes Stock, dans l'ordre d'arrivée.
+    """
+
+    def __init__(self, intervalle_ms, max_evenements):
+        self.intervalle = intervalle_ms / 1000
+        self.max_evenements = max_evenements
+        self._nb_evenements = 0
+        self._verrou = threading.Lock()
+        self._reveil = threading.Event()
+        self._thread = None
+
+    def ajouter(self, mouvement, delta):
+        """À appeler dans la transaction qui crée `mouvement`"""
+        VariationEnAttente.objects.create(
+            produit_id=mouvement.produit_id, magasin_id=mouvement.magasin_id, mouvement=mouvement, delta=delta
+        )
+        transaction.on_commit(self._signaler)
+
+    def _signaler(self):
+        with self._verrou:
+            self._nb_evenements += 1
+            plein = self._nb_evenements >= self.max_evenements
+            if self._thread is None:
+                self._demarrer()
+        if plein:
+            self._reveil.set()
+
+    def vider(self):
+        with self._verrou:
+            self._nb_evenements = 0
+        try:
+            vider_variations()
+        except Exception:
+            # Les variations restent en base : elles seront reprises au vidage suivant
+            logger.exception("Échec du vidage du tampon de stock")
+
+    def _demarrer(self):
+        self._thread = threading.Thread(target=self._boucle, name='tampon-stock', daemon=True)
+        self._thread.start()
+        atexit.register(self.vider)
+
+    def _boucle(self):
+        while True:
+            self._reveil.wait(self.intervalle)
+            self._reveil.clear()
+            close_old_connections()
+            self.vider()
+
+
+def vider_variations(**filtres):
+    """
+    Répercute sur Stock les variations en attente (filtrables, par exemple
+    magasin_id=...). Retourne le nombre de lignes de stock traitées.
+    """
+    from .services import appliquer_deltas
+
+    lignes = list(VariationEnAttente.objects.filter(**filtres).values_list('produit_id', 'magasin_id').distinct())
+    if lignes:
+        with transaction.atomic():
+            # Un delta nul : appliquer_deltas verrouille les lignes et y
+            # replie les variations en attente
+            appliquer_deltas([(p, m, 0) for p, m in lignes])
+    return len(lignes)
+
+
+def annoter_en_attente(queryset):
+    """
+    Ajoute `en_attente` (somme des variations non répercutées) aux lignes de
+    stock. Lu dans la même requête que la quantité : un vidage concurrent ne
+    peut pas faire compter une variation deux fois ni l'omettre.
+    """
+    somme = (
+        VariationEnAttente.objects
+        .filter(produit_id=OuterRef('produit_id'), magasin_id=OuterRef('magasin_id'))
+        .values('produit_id', 'magasin_id')
+        .annotate(total=Sum('delta'))
+        .values('total')
+    )
+    return queryset.annotate(en_attente=Coalesce(Subquery(somme, output_field=IntegerField()), 0))
+
+
+def annoter_quantite_lue(queryset):
+    """
+    Ajoute `quantite_lue` aux lignes de stock, pour les agrégats et exports :
+    la quantité en base plus, en écriture différée, les ventes pas encore
+    répercutées (plancher à zéro, comme StockSerializer)
+    """
+    if get_tampon() is None:
+        return queryset.annotate(quantite_lue=F('quantite'))
+    return annoter_en_attente(queryset).annotate(quantite_lue=Greatest(F('quantite') + F('en_attente'), 0))
+
+
+_tampon = None
+_tampon_verrou = threading.Lock()
+
+
+def get_tampon():
+    """Tampon du processus, ou None si l'écriture différée est désactivée"""
+    global _tampon
+    if not getattr(settings, 'STOCK_TAMPON_VENTES', False):
+        return None
+    if _tampon is None:
+        with _tampon_verrou:
+            if _tampon is None:
+                _tampon = TamponStock(
+                    getattr(settings, 'STOCK_TAMPON_INTERVALLE_MS', 200),
+                    getattr(settings, 'STOCK_TAMPON_MAX_EVENEMENTS', 100),
+                )
+    return _tampon
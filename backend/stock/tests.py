@@ -0,0 +1,617 @@
+import csv
+import io
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from products.models import Produit
+from stores.models import Magasin
+from suppliers.models import Fournisseur
+from . import coherence
+from .coherence import corriger_ecarts, ecarts_magasin
+from .models import Commande, CommandeDetail, Mouvement, Notification, Stock, StockSnapshot, VariationEnAttente
+from .services import appliquer_mouvement, recalculer_alertes, traiter_mouvements
+from . import historique
+from .tampon import TamponStock, vider_variations
+
+
+class DonneesStockMixin:
+    """Magasin, fournisseur, produits et manager communs aux tests du stock"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.magasin = Magasin.objects.create(nom='Magasin 1', adresse='1 rue', latitude=0, longitude=0)
+        cls.fournisseur = Fournisseur.objects.create(nom='Fournisseur 1', adresse='2 rue', contact='f@x.fr', magasin=cls.magasin)
+        cls.produits = [
+            Produit.objects.create(
+                nom=f'Produit {i}', reference=f'REF-{i}', categorie='test', prix_unitaire=10,
+                seuil_alerte=5, fournisseur=cls.fournisseur, magasin=cls.magasin,
+            )
+            for i in range(50)
+        ]
+        cls.manager = User.objects.create_user(
+            'manager@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='manager', magasin=cls.magasin
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.manager)
+
+
+class CommandeReceptionTests(DonneesStockMixin, APITestCase):
+
+    def _commande(self):
+        commande = Commande.objects.create(fournisseur=self.fournisseur)
+        CommandeDetail.objects.create(commande=commande, produit=self.produits[0], quantite=7, prix_unitaire=2)
+        return commande
+
+    def test_patch_livree_refuse(self):
+        commande = self._commande()
+        reponse = self.client.patch(f'/api/stock/commandes/{commande.pk}/', {'statut': 'livree'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        commande.refresh_from_db()
+        self.assertEqual(commande.statut, 'en_attente')
+
+    def test_lignes_figees_apres_reception(self):
+        commande = self._commande()
+        self.client.post(f'/api/stock/commandes/{commande.pk}/receive/', {}, format='json')
+        reponse = self.client.patch(f'/api/stock/commandes/{commande.pk}/', {
+            'details': [{'produit': self.produits[1].id, 'quantite': 3, 'prix_unitaire': 2}],
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(commande.details.values_list('produit_id', 'quantite')), [(self.produits[0].id, 7)])
+
+    def test_reception_apres_patch_livree(self):
+        commande = self._commande()
+        self.client.patch(f'/api/stock/commandes/{commande.pk}/', {'statut': 'livree'}, format='json')
+        # Statut posé hors API (données antérieures) : la commande reste à réceptionner
+        Commande.objects.filter(pk=commande.pk).update(statut='livree')
+
+        reponse = self.client.post(f'/api/stock/commandes/{commande.pk}/receive/', {}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(reponse.data['deja_recue'])
+        self.assertEqual(len(reponse.data['mouvements']), 1)
+        self.assertEqual(Stock.objects.get(produit=self.produits[0], magasin=self.magasin).quantite, 7)
+
+        reponse = self.client.post(f'/api/stock/commandes/{commande.pk}/receive/', {}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK)
+        self.assertTrue(reponse.data['deja_recue'])
+        self.assertEqual(Mouvement.objects.filter(commande=commande).count(), 1)
+        self.assertEqual(Stock.objects.get(produit=self.produits[0], magasin=self.magasin).quantite, 7)
+
+
+class CommandeCreationTests(DonneesStockMixin, APITestCase):
+
+    def _creer(self, nombre_lignes):
+        return self.client.post('/api/stock/commandes/', {
+            'fournisseur': self.fournisseur.id,
+            'details': [
+                {'produit': produit.id, 'quantite': 2, 'prix_unitaire': '3.50'}
+                for produit in self.produits[:nombre_lignes]
+            ],
+        }, format='json')
+
+    def test_requetes_constantes(self):
+        with CaptureQueriesContext(connection) as contexte:
+            reponse = self._creer(1)
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+
+        for nombre_lignes in (5, 50):
+            with self.assertNumQueries(len(contexte.captured_queries)):
+                reponse = self._creer(nombre_lignes)
+            self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+            self.assertEqual(len(reponse.data['details']), nombre_lignes)
+            self.assertEqual(reponse.data['total'], f'{7 * nombre_lignes:.2f}')
+
+    def test_produit_inconnu(self):
+        reponse = self.client.post('/api/stock/commandes/', {
+            'fournisseur': self.fournisseur.id,
+            'details': [{'produit': 999999, 'quantite': 1, 'prix_unitaire': '1.00'}],
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('details', reponse.data)
+
+    def test_ajout_ligne_seule(self):
+        commande = Commande.objects.create(fournisseur=self.fournisseur)
+        url = f'/api/stock/commandes/{commande.pk}/details/'
+        reponse = self.client.post(url, {'produit': self.produits[0].id, 'quantite': 1, 'prix_unitaire': '1.00'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+        self.assertEqual(reponse.data['produit'], self.produits[0].id)
+        reponse = self.client.post(url, {'produit': 999999, 'quantite': 1, 'prix_unitaire': '1.00'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(STOCK_TAMPON_VENTES=True)
+class TamponVentesTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produit = self.produits[0]
+        self.stock = Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=10)
+
+    def _mouvement(self, type_mouvement, quantite, motif='vente'):
+        reponse = self.client.post('/api/stock/mouvements/', {
+            'produit': self.produit.id, 'magasin': self.magasin.id, 'type': type_mouvement,
+            'quantite': quantite, 'motif': motif,
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+
+    def _quantite_lue(self):
+        return self.client.get(f'/api/stock/stocks/{self.stock.pk}/').data['quantite']
+
+    def test_vente_differee_durable_et_visible(self):
+        with patch.object(TamponStock, '_signaler'):
+            self._mouvement('sortie', 3)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantite, 10)
+        self.assertEqual(VariationEnAttente.objects.get().delta, -3)
+        self.assertEqual(self._quantite_lue(), 7)
+
+        self.assertEqual(vider_variations(), 1)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantite, 7)
+        self.assertFalse(VariationEnAttente.objects.exists())
+        self.assertEqual(self._quantite_lue(), 7)
+
+    def test_ordre_avec_mouvement_direct(self):
+        # La vente acceptée avant l'entrée est ramenée à zéro avant celle-ci
+        with patch.object(TamponStock, '_signaler'):
+            self._mouvement('sortie', 15)
+            self._mouvement('entrée', 4, motif='livraison')
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantite, 4)
+        self.assertFalse(VariationEnAttente.objects.exists())
+
+    def test_tableau_de_bord_et_export(self):
+        with patch.object(TamponStock, '_signaler'):
+            self._mouvement('sortie', 10)
+        cache.clear()
+        indicateurs = self.client.get('/api/stock/dashboard/').data
+        self.assertEqual((indicateurs['quantite_totale'], indicateurs['ruptures']), (0, 1))
+        export = b''.join(self.client.get('/api/stock/stocks/export.csv').streaming_content).decode()
+        self.assertEqual(next(csv.DictReader(io.StringIO(export)))['quantite'], '0')
+
+    def test_recalcul_des_alertes(self):
+        with patch.object(TamponStock, '_signaler'):
+            self._mouvement('sortie', 8)
+        Produit.objects.filter(pk=self.produit.pk).update(seuil_alerte=3)
+        recalculer_alertes(Q(pk=self.stock.pk))
+        self.stock.refresh_from_db()
+        self.assertEqual((self.stock.quantite, self.stock.niveau_alerte), (2, 'stock_bas'))
+        self.assertFalse(VariationEnAttente.objects.exists())
+
+
+class NiveauAlerteTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produit = self.produits[0]
+        self.stock = Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=10)
+
+    def _niveau(self):
+        self.stock.refresh_from_db()
+        return self.stock.niveau_alerte
+
+    def test_saisie_manuelle(self):
+        url = f'/api/stock/stocks/{self.stock.pk}/'
+        reponse = self.client.patch(url, {'quantite': 3}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK, reponse.data)
+        self.assertEqual(self._niveau(), 'stock_bas')
+        self.assertEqual(Notification.objects.filter(stock=self.stock, type='stock_bas').count(), 1)
+
+        self.client.put(url, {'produit': self.produit.id, 'magasin': self.magasin.id, 'quantite': 0}, format='json')
+        self.assertEqual(self._niveau(), 'rupture')
+
+        self.client.patch(url, {'quantite': 20}, format='json')
+        self.assertIsNone(self._niveau())
+
+    def test_creation_manuelle(self):
+        reponse = self.client.post('/api/stock/stocks/', {
+            'produit': self.produits[1].id, 'magasin': self.magasin.id, 'quantite': 0,
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+        self.assertEqual(Stock.objects.get(pk=reponse.data['id']).niveau_alerte, 'rupture')
+
+    def test_changement_seuil(self):
+        self.produit.seuil_alerte = 12
+        self.produit.save()
+        self.assertEqual(self._niveau(), 'stock_bas')
+
+        self.client.patch(f'/api/products/{self.produit.pk}/', {'seuil_alerte': 2}, format='json')
+        self.assertIsNone(self._niveau())
+
+
+class CoherenceTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produit = self.produits[0]
+        Mouvement.objects.create(produit=self.produit, magasin=self.magasin, user=self.manager,
+                                 type='entrée', quantite=10, motif='livraison', statut='valide')
+        self.stock = Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=10)
+
+    def test_vente_differee_sans_ecart(self):
+        mouvement = Mouvement.objects.create(produit=self.produit, magasin=self.magasin, user=self.manager,
+                                             type='sortie', quantite=4, motif='vente', statut='valide')
+        VariationEnAttente.objects.create(produit=self.produit, magasin=self.magasin, mouvement=mouvement, delta=-4)
+        self.assertEqual(ecarts_magasin(self.magasin.id), [])
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantite, 6)
+
+    def test_correction_seulement_si_ecart_persiste(self):
+        Stock.objects.filter(pk=self.stock.pk).update(quantite=13)
+        Stock.objects.create(produit=self.produits[1], magasin=self.magasin, quantite=2)
+        ecarts = ecarts_magasin(self.magasin.id)
+        self.assertEqual(ecarts, [(self.produit.id, 10, 13), (self.produits[1].id, 0, 2)])
+
+        # Écart du premier produit résorbé avant la correction
+        Stock.objects.filter(pk=self.stock.pk).update(quantite=10)
+        corrections = corriger_ecarts(self.magasin.id, ecarts, self.manager)
+        self.assertEqual([(m.produit_id, m.type, m.quantite) for m in corrections], [(self.produits[1].id, 'entrée', 2)])
+        self.assertEqual(ecarts_magasin(self.magasin.id), [])
+
+    def test_relecture_des_seules_lignes_en_ecart(self):
+        Stock.objects.create(produit=self.produits[1], magasin=self.magasin, quantite=2)
+        lire_ecarts, appels = coherence._lire_ecarts, []
+
+        def lecture(magasin_id, produit_ids=None, verrouiller=False):
+            appels.append((produit_ids, verrouiller))
+            ecarts = lire_ecarts(magasin_id, produit_ids, verrouiller)
+            if not verrouiller:
+                # Mouvement appliqué entre la lecture sans verrou et la relecture
+                Mouvement.objects.create(produit=self.produits[1], magasin=self.magasin, user=self.manager,
+                                         type='entrée', quantite=2, motif='livraison', statut='valide')
+            return ecarts
+
+        with patch.object(coherence, '_lire_ecarts', side_effect=lecture):
+            self.assertEqual(ecarts_magasin(self.magasin.id), [])
+        self.assertEqual(appels, [(None, False), ([self.produits[1].id], True)])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class RegistreConcurrenceTests(TransactionTestCase):
+    """Écrivains concurrents sur une même ligne ; nécessite des verrous de ligne (pas SQLite)"""
+
+    ECRIVAINS = 20
+    ITERATIONS = 10
+
+    def setUp(self):
+        self.magasin = Magasin.objects.create(nom='Magasin 1', adresse='1 rue', latitude=0, longitude=0)
+        fournisseur = Fournisseur.objects.create(nom='Fournisseur 1', adresse='2 rue', contact='f@x.fr', magasin=self.magasin)
+        self.produit = Produit.objects.create(
+            nom='Produit', reference='REF-1', categorie='test', prix_unitaire=10,
+            seuil_alerte=5, fournisseur=fournisseur, magasin=self.magasin,
+        )
+        self.user = User.objects.create_user(
+            'manager@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='manager', magasin=self.magasin
+        )
+
+    def _enregistrer(self, type_mouvement, quantite):
+        """Mouvement validé puis répercuté dans sa transaction, comme MouvementListCreateView"""
+        with transaction.atomic():
+            mouvement = Mouvement.objects.create(
+                produit=self.produit, magasin=self.magasin, user=self.user, type=type_mouvement,
+                quantite=quantite, motif='livraison' if type_mouvement == 'entrée' else 'vente', statut='valide',
+            )
+            return appliquer_mouvement(mouvement)[1]
+
+    def _concurrents(self, types):
+        """Un thread par type de mouvement, ITERATIONS mouvements de 1 chacun ; retourne les quantités vues"""
+        depart = threading.Barrier(len(types))
+        quantites = []
+        erreurs = []
+
+        def ecrivain(type_mouvement):
+            try:
+                depart.wait()
+                for _ in range(self.ITERATIONS):
+                    quantites.append(self._enregistrer(type_mouvement, 1))
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=ecrivain, args=(type_mouvement,)) for type_mouvement in types]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(erreurs, [])
+        return quantites
+
+    def _solde_registre(self):
+        totaux = Mouvement.objects.filter(produit=self.produit, magasin=self.magasin).aggregate(
+            entrees=Sum('quantite', filter=Q(type='entrée')),
+            sorties=Sum('quantite', filter=Q(type='sortie')),
+        )
+        return (totaux['entrees'] or 0) - (totaux['sorties'] or 0)
+
+    def _quantite(self):
+        return Stock.objects.get(produit=self.produit, magasin=self.magasin).quantite
+
+    def test_entrees_et_sorties_melangees(self):
+        self._enregistrer('entrée', self.ECRIVAINS * self.ITERATIONS)
+        quantites = self._concurrents(['entrée', 'sortie'] * (self.ECRIVAINS // 2))
+        self.assertGreaterEqual(min(quantites), 0)
+        self.assertEqual(self._quantite(), self._solde_registre())
+        self.assertEqual(self._quantite(), self.ECRIVAINS * self.ITERATIONS)
+
+    def test_sorties_ramenees_a_zero(self):
+        self._enregistrer('entrée', 5)
+        quantites = self._concurrents(['sortie'] * self.ECRIVAINS)
+        self.assertGreaterEqual(min(quantites), 0)
+        self.assertEqual(self._quantite(), 0)
+
+
+class HistoriqueTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produit = self.produits[0]
+        self.aujourdhui = timezone.localdate()
+
+    def _mouvement(self, type_mouvement, quantite, jours_avant, statut='valide'):
+        mouvement = Mouvement.objects.create(
+            produit=self.produit, magasin=self.magasin, user=self.manager, type=type_mouvement,
+            quantite=quantite, motif='livraison' if type_mouvement == 'entrée' else 'vente', statut=statut,
+        )
+        date = historique.debut_jour(self.aujourdhui - timedelta(days=jours_avant)) + timedelta(hours=12)
+        Mouvement.objects.filter(pk=mouvement.pk).update(date=date)
+        mouvement.date = date
+        return mouvement
+
+    def _points(self, debut, fin):
+        return [
+            point['quantite'] for point in
+            historique.serie(debut, fin, produit_id=self.produit.id, magasin_id=self.magasin.id)
+        ]
+
+    def test_mouvement_apres_dernier_snapshot(self):
+        self._mouvement('entrée', 10, 4)
+        historique.construire_snapshots(jusqu_au=self.aujourdhui - timedelta(days=3))
+        date_sortie = self._mouvement('sortie', 4, 2).date
+        Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=6)
+
+        debut = self.aujourdhui - timedelta(days=4)
+        self.assertEqual(self._points(debut, self.aujourdhui), [10, 10, 6, 6, 6])
+        self.assertEqual(self._points(self.aujourdhui - timedelta(days=1), self.aujourdhui), [6, 6])
+        self.assertEqual(historique.quantite_au(self.produit.id, self.magasin.id, date_sortie - timedelta(hours=1)), 10)
+        self.assertEqual(historique.quantite_au(self.produit.id, self.magasin.id, date_sortie), 6)
+
+    def test_sans_snapshot(self):
+        # Stock initial de 7 importé, sans mouvement d'entrée, puis une entrée de 3
+        Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=10)
+        date_entree = self._mouvement('entrée', 3, 1).date
+
+        self.assertEqual(self._points(self.aujourdhui - timedelta(days=2), self.aujourdhui), [7, 10, 10])
+        self.assertEqual(historique.quantite_au(self.produit.id, self.magasin.id, date_entree - timedelta(hours=1)), 7)
+        self.assertEqual(historique.quantite_au(self.produit.id, self.magasin.id, timezone.now()), 10)
+
+    def test_stock_initial_dans_snapshots(self):
+        # 100 en stock au départ (import), une sortie de 10 il y a trois jours
+        Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=90)
+        self._mouvement('sortie', 10, 3)
+        historique.construire_snapshots(jusqu_au=self.aujourdhui - timedelta(days=1))
+
+        self.assertEqual(StockSnapshot.objects.get().quantite, 90)
+        self.assertEqual(self._points(self.aujourdhui - timedelta(days=4), self.aujourdhui), [100, 90, 90, 90, 90])
+        self.assertEqual(historique.quantite_au(self.produit.id, self.magasin.id, timezone.now()), 90)
+
+    def test_acceptation_apres_snapshot(self):
+        Stock.objects.create(produit=self.produit, magasin=self.magasin, quantite=15)
+        self._mouvement('entrée', 5, 2)
+        historique.construire_snapshots(jusqu_au=self.aujourdhui - timedelta(days=1))
+        en_attente = self._mouvement('sortie', 4, 2, statut='attente')
+
+        traiter_mouvements([en_attente.id], 'accepte')
+        self.assertFalse(StockSnapshot.objects.exists())
+        debut = self.aujourdhui - timedelta(days=3)
+        self.assertEqual(self._points(debut, self.aujourdhui), [10, 11, 11, 11])
+        historique.construire_snapshots(jusqu_au=self.aujourdhui - timedelta(days=1))
+        self.assertEqual(StockSnapshot.objects.get().quantite, 11)
+        self.assertEqual(self._points(debut, self.aujourdhui), [10, 11, 11, 11])
+
+    def test_date_impossible(self):
+        for url, params in [
+            ('/api/stock/historique/quantite/', {'produit': self.produit.id, 'date': '2024-02-30T10:00:00'}),
+            ('/api/stock/historique/serie/', {'produit': self.produit.id, 'debut': '2024-02-30'}),
+            ('/api/stock/historique/serie/', {'produit': self.produit.id, 'fin': '2024-02-30'}),
+        ]:
+            reponse = self.client.get(url, params)
+            self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST, (url, params))
+
+
+class ExportStockTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autre_magasin = Magasin.objects.create(nom='Magasin 2', adresse='3 rue', latitude=0, longitude=0)
+        Stock.objects.create(produit=self.produits[0], magasin=self.magasin, quantite=1)
+        Stock.objects.create(produit=self.produits[0], magasin=self.autre_magasin, quantite=2)
+
+    def _lignes(self, params=None):
+        reponse = self.client.get('/api/stock/stocks/export.csv', params or {})
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK)
+        return b''.join(reponse.streaming_content).decode().splitlines()[1:]
+
+    def test_limite_au_magasin_hors_admin(self):
+        employe = User.objects.create_user(
+            'employe@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='employe', magasin=self.magasin
+        )
+        for user in (self.manager, employe):
+            self.client.force_authenticate(user)
+            self.assertEqual(len(self._lignes()), 1)
+            self.assertEqual(self._lignes({'magasin': self.autre_magasin.id}), [])
+
+    def test_admin_tous_magasins(self):
+        self.client.force_authenticate(User.objects.create_user('admin@x.fr', 'motdepasse', nom='A', prenom='A', role='admin'))
+        self.assertEqual(len(self._lignes()), 2)
+
+
+class NotificationAttenteTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Destinataires mis en cache par d'autres tests, dont les transactions ont été annulées
+        cache.clear()
+
+    def test_nom_employe(self):
+        produit = self.produits[0]
+        Produit.objects.filter(pk=produit.pk).update(seuil_mouvement=5)
+        reponse = self.client.post('/api/stock/mouvements/', {
+            'produit': produit.id, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 8, 'motif': 'vente',
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+        notification = Notification.objects.get(type='mouvement_attente')
+        self.assertIn('employé : Prenom Nom (manager@x.fr)', notification.message)
+
+    def test_administrateurs_destinataires(self):
+        admin = User.objects.create_superuser('admin@x.fr', 'motdepasse', nom='A', prenom='A')
+        autre_magasin = Magasin.objects.create(nom='Magasin 2', adresse='3 rue', latitude=0, longitude=0)
+        User.objects.create_user('manager2@x.fr', 'motdepasse', nom='N', prenom='P', role='manager', magasin=autre_magasin)
+        produit = self.produits[0]
+        Produit.objects.filter(pk=produit.pk).update(seuil_mouvement=5)
+        reponse = self.client.post('/api/stock/mouvements/', {
+            'produit': produit.id, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 8, 'motif': 'vente',
+        }, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+        self.assertEqual(
+            set(Notification.objects.filter(type='mouvement_attente').values_list('destinataire_id', flat=True)),
+            {self.manager.id, admin.id},
+        )
+
+
+class TransfertTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.destination = Magasin.objects.create(nom='Magasin 2', adresse='3 rue', latitude=0, longitude=0)
+        self.stocks = [
+            Stock.objects.create(produit=produit, magasin=self.magasin, quantite=quantite)
+            for produit, quantite in zip(self.produits[:2], (10, 3))
+        ]
+
+    def _transferer(self, lignes):
+        return self.client.post('/api/stock/transferts/', {
+            'source': self.magasin.id, 'destination': self.destination.id,
+            'lignes': [{'produit': produit.id, 'quantite': quantite} for produit, quantite in lignes],
+        }, format='json')
+
+    def test_mouvements_appaires(self):
+        reponse = self._transferer([(self.produits[0], 4), (self.produits[1], 3)])
+        self.assertEqual(reponse.status_code, status.HTTP_201_CREATED, reponse.data)
+
+        mouvements = Mouvement.objects.filter(id__in=reponse.data['mouvements'])
+        self.assertEqual({str(m.lot) for m in mouvements}, {reponse.data['lot']})
+        self.assertEqual(
+            sorted((m.produit_id, m.magasin_id, m.type, m.motif, m.quantite) for m in mouvements),
+            sorted([
+                (self.produits[0].id, self.magasin.id, 'sortie', 'transfert_sortant', 4),
+                (self.produits[0].id, self.destination.id, 'entrée', 'transfert_entrant', 4),
+                (self.produits[1].id, self.magasin.id, 'sortie', 'transfert_sortant', 3),
+                (self.produits[1].id, self.destination.id, 'entrée', 'transfert_entrant', 3),
+            ]),
+        )
+        self.assertEqual(
+            dict(Stock.objects.filter(magasin=self.destination).values_list('produit_id', 'quantite')),
+            {self.produits[0].id: 4, self.produits[1].id: 3},
+        )
+        self.assertEqual([stock.quantite for stock in Stock.objects.filter(magasin=self.magasin).order_by('produit_id')], [6, 0])
+
+    def test_source_insuffisante_annule_les_deux_cotes(self):
+        reponse = self._transferer([(self.produits[0], 4), (self.produits[1], 5)])
+        self.assertEqual(reponse.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(reponse.data['lignes'], [{'produit': self.produits[1].id, 'disponible': 3, 'demande': 5}])
+
+        self.assertFalse(Mouvement.objects.exists())
+        self.assertFalse(Stock.objects.filter(magasin=self.destination).exists())
+        self.assertEqual([stock.quantite for stock in Stock.objects.filter(magasin=self.magasin).order_by('produit_id')], [10, 3])
+
+
+class MouvementLotTests(DonneesStockMixin, APITestCase):
+
+    def test_erreurs_par_ligne(self):
+        Stock.objects.create(produit=self.produits[0], magasin=self.magasin, quantite=10)
+        reponse = self.client.post('/api/stock/mouvements/batch/', [
+            {'produit': self.produits[0].id, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 4, 'motif': 'vente'},
+            {'produit': 999999, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 1, 'motif': 'vente'},
+            {'produit': self.produits[0].id, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 0, 'motif': 'vente'},
+            {'produit': self.produits[1].id, 'magasin': self.magasin.id, 'type': 'entrée', 'quantite': 5, 'motif': 'livraison'},
+        ], format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_207_MULTI_STATUS, reponse.data)
+        self.assertEqual((reponse.data['crees'], reponse.data['erreurs']), (2, 2))
+
+        resultats = reponse.data['resultats']
+        self.assertEqual([resultat['index'] for resultat in resultats], [0, 1, 2, 3])
+        self.assertEqual([resultat.get('statut') for resultat in resultats], ['valide', None, None, 'valide'])
+        self.assertIn('produit', resultats[1]['erreurs'])
+        self.assertIn('quantite', resultats[2]['erreurs'])
+        self.assertEqual(
+            dict(Stock.objects.filter(magasin=self.magasin).values_list('produit_id', 'quantite')),
+            {self.produits[0].id: 6, self.produits[1].id: 5},
+        )
+
+    def test_aucune_ligne_valide(self):
+        reponse = self.client.post('/api/stock/mouvements/batch/', [
+            {'produit': 999999, 'magasin': self.magasin.id, 'type': 'sortie', 'quantite': 1, 'motif': 'vente'},
+        ], format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Mouvement.objects.exists())
+
+
+class ValidationLotTests(DonneesStockMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autre_magasin = Magasin.objects.create(nom='Magasin 2', adresse='3 rue', latitude=0, longitude=0)
+        self.employe = User.objects.create_user(
+            'employe@x.fr', 'motdepasse', nom='Nom', prenom='Prenom', role='employe', magasin=self.magasin
+        )
+        Stock.objects.create(produit=self.produits[0], magasin=self.magasin, quantite=10)
+
+    def _en_attente(self, magasin, type_mouvement='sortie', quantite=4):
+        return Mouvement.objects.create(
+            produit=self.produits[0], magasin=magasin, user=self.employe, type=type_mouvement,
+            quantite=quantite, motif='vente' if type_mouvement == 'sortie' else 'livraison', statut='attente',
+        )
+
+    def test_acceptation_groupee(self):
+        premiers = [self._en_attente(self.magasin), self._en_attente(self.magasin, 'entrée', 7)]
+        hors_magasin = self._en_attente(self.autre_magasin)
+        deja_traite = self._en_attente(self.magasin)
+        Mouvement.objects.filter(pk=deja_traite.pk).update(statut='rejete')
+
+        ids = [m.id for m in premiers] + [hors_magasin.id, deja_traite.id]
+        reponse = self.client.post('/api/stock/mouvements/validate/', {'ids': ids, 'action': 'accepte'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK, reponse.data)
+        self.assertEqual(reponse.data['traites'], [m.id for m in premiers])
+        self.assertEqual(reponse.data['ignores'], sorted([hors_magasin.id, deja_traite.id]))
+
+        self.assertEqual(Stock.objects.get(produit=self.produits[0], magasin=self.magasin).quantite, 13)
+        self.assertEqual(Mouvement.objects.get(pk=hors_magasin.pk).statut, 'attente')
+        self.assertEqual(
+            list(Notification.objects.filter(destinataire=self.employe).values_list('mouvement_id', 'type').order_by('mouvement_id')),
+            [(m.id, 'mouvement_valide') for m in premiers],
+        )
+
+    def test_rejet_groupe_sans_effet_sur_le_stock(self):
+        mouvement = self._en_attente(self.magasin)
+        reponse = self.client.post('/api/stock/mouvements/validate/', {'ids': [mouvement.id], 'action': 'rejete'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_200_OK, reponse.data)
+        self.assertEqual(Mouvement.objects.get(pk=mouvement.pk).statut, 'rejete')
+        self.assertEqual(Stock.objects.get(produit=self.produits[0], magasin=self.magasin).quantite, 10)
+
+    def test_employe_refuse(self):
+        self.client.force_authenticate(self.employe)
+        mouvement = self._en_attente(self.magasin)
+        reponse = self.client.post('/api/stock/mouvements/validate/', {'ids': [mouvement.id], 'action': 'accepte'}, format='json')
+        self.assertEqual(reponse.status_code, status.HTTP_403_FORBIDDEN)
@@ -3,11 +3,25 @@ from . import views
 
 urlpatterns = [
     path('stocks/', views.StockListCreateView.as_view(), name='stock_list_create'),
+    path('stocks/export.csv', views.StockExportView.as_view(), name='stock_export'),
     path('stocks/<int:pk>/', views.StockDetailView.as_view(), name='stock_detail'),
+    path('alerts/', views.StockAlerteListView.as_view(), name='stock_alertes'),
     path('mouvements/', views.MouvementListCreateView.as_view(), name='mouvement_list_create'),
+    path('mouvements/export.csv', views.MouvementExportView.as_view(), name='mouvement_export'),
+    path('mouvements/batch/', views.MouvementLotCreateView.as_view(), name='mouvement_batch'),
+    path('mouvements/attente/', views.MouvementAttenteListView.as_view(), name='mouvement_attente'),
+    path('mouvements/validate/', views.MouvementValidationLotView.as_view(), name='mouvement_validate'),
     path('mouvements/<int:mouvement_id>/valider/', views.MouvementValidationView.as_view(), name='mouvement_valider'),
+    path('transferts/', views.TransfertView.as_view(), name='transfert'),
+    path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('historique/quantite/', views.historique_quantite_view, name='historique_quantite'),
+    path('historique/serie/', views.historique_serie_view, name='historique_serie'),
     path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
+    path('notifications/feed/', views.NotificationFluxView.as_view(), name='notification_feed'),
+    path('notifications/unread_count/', views.notifications_non_lues_view, name='notification_unread_count'),
+    path('notifications/mark-all-read/', views.notifications_tout_lire_view, name='notification_mark_all_read'),
     path('commandes/', views.CommandeListCreateView.as_view(), name='commande_list_create'),
     path('commandes/<int:pk>/', views.CommandeDetailView.as_view(), name='commande_detail'),
+    path('commandes/<int:pk>/receive/', views.CommandeReceptionView.as_view(), name='commande_reception'),
     path('commandes/<int:commande_id>/details/', views.CommandeDetailListCreateView.as_view(), name='commande_detail_list_create'),
 ]
\ No newline at end of file
@@ -5,13 +5,38 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db import transaction
 from .models import Stock, Mouvement, Commande, CommandeDetail, Notification
-from .serializers import StockSerializer, MouvementSerializer, CommandeSerializer, CommandeDetailSerializer, NotificationSerializer
-from django.contrib.auth import get_user_model
-from django.db.models import Q
+from .serializers import (
+    StockSerializer, StockAlerteSerializer, MouvementSerializer, MouvementLotItemSerializer,
+    CommandeSerializer, CommandeDetailSerializer, NotificationSerializer, ReceptionLigneSerializer,
+    TransfertSerializer, ValidationLotSerializer, NotificationFluxSerializer,
+)
+from .services import (
+    appliquer_mouvement, appliquer_deltas, creer_mouvements, delta_mouvement, statut_initial, recalculer_total,
+    receptionner_commande, transferer, StockInsuffisant, traiter_mouvements,
+    notifier_mouvements_attente,
+)
+from .tampon import annoter_en_attente, annoter_quantite_lue, get_tampon
+from .pagination import MouvementCursorPagination, MouvementAttentePagination, NotificationCursorPagination
+from . import tableau_de_bord, historique
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from django.db.models import F
+from datetime import timedelta
+from django.http import StreamingHttpResponse
+import csv
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _stocks_lus():
+    """Stocks avec, en écriture différée, les ventes pas encore répercutées"""
+    queryset = Stock.objects.all()
+    if get_tampon() is not None:
+        queryset = annoter_en_attente(queryset)
+    return queryset
+
+
 class StockListCreateView(generics.ListCreateAPIView):
     queryset = Stock.objects.all()
     serializer_class = StockSerializer
@@ -19,6 +44,9 @@ class StockListCreateView(generics.ListCreateAPIView):
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['produit', 'magasin']
     ordering = ['-updated_at']
+
+    def get_queryset(self):
+        return _stocks_lus()
     
     def create(self, request, *args, **kwargs):
         user = request.user
@@ -40,6 +68,11 @@ class StockDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = StockSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return _stocks_lus()
+        return super().get_queryset()
+
     def update(self, request, *args, **kwargs):
         user = request.user
         if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
@@ -52,13 +85,34 @@ class StockDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Response({'error': "Seuls les managers ou admins peuvent supprimer le stock."}, status=status.HTTP_403_FORBIDDEN)
         return super().destroy(request, *args, **kwargs)
 
+class StockAlerteListView(generics.ListAPIView):
+    """Lignes de stock sous le seuil d'alerte du produit (ou en rupture avec ?type=rupture)"""
+    serializer_class = StockAlerteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['produit', 'magasin']
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = Stock.objects.select_related('produit', 'magasin')
+        if getattr(user, 'role', None) != 'admin':
+            if not getattr(user, 'magasin_id', None):
+                return Stock.objects.none()
+            qs = qs.filter(magasin_id=user.magasin_id)
+        if self.request.query_params.get('type') == 'rupture':
+            qs = qs.filter(quantite__lte=0)
+        else:
+            qs = qs.filter(quantite__lte=F('produit__seuil_alerte'))
+        return qs.order_by('quantite', 'id')
+
 class MouvementListCreateView(generics.ListCreateAPIView):
     queryset = Mouvement.objects.all()
     serializer_class = MouvementSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['produit', 'magasin', 'user', 'type']
-    ordering = ['-date']
+    # L'ordre est imposé par le curseur (date, id) : pas d'OrderingFilter
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['produit', 'magasin', 'user', 'type', 'statut']
+    pagination_class = MouvementCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -85,68 +139,217 @@ class MouvementListCreateView(generics.ListCreateAPIView):
             raise Exception("Seuls les managers ou admins peuvent gérer les mouvements de stock.")
         
         # Vérification du seuil mouvement pour notification manager
-        produit = serializer.validated_data['produit']
-        quantite = serializer.validated_data['quantite']
-        seuil_mouvement = getattr(produit, 'seuil_mouvement', None)
-        seuil_ok = True
-        if seuil_mouvement is not None and seuil_mouvement > 0:
-            if quantite > seuil_mouvement:
-                seuil_ok = False
+        statut = statut_initial(serializer.validated_data['produit'], serializer.validated_data['quantite'])
 
         # Création du mouvement avec statut adapté
-        statut = 'valide' if seuil_ok else 'attente'
         mouvement = serializer.save(statut=statut)
 
         # Mettre à jour le stock si validé automatiquement
         if statut == 'valide':
-            stock, created = Stock.objects.get_or_create(
-                produit=mouvement.produit,
-                magasin=mouvement.magasin,
-                defaults={'quantite': 0}
-            )
-            if mouvement.type == 'entrée':
-                stock.quantite += mouvement.quantite
+            tampon = get_tampon()
+            if tampon is not None and mouvement.type == 'sortie' and mouvement.motif == 'vente':
+                # Écriture différée : variation enregistrée avec le mouvement,
+                # la ligne Stock n'est pas verrouillée ici
+                tampon.ajouter(mouvement, delta_mouvement(mouvement))
             else:
-                stock.quantite -= mouvement.quantite
-                if stock.quantite < 0:
-                    stock.quantite = 0
-            stock.save()
+                appliquer_mouvement(mouvement)
         else:
-            # Notification au manager
-            User = get_user_model()
-            managers = User.objects.filter(Q(groups__name__iexact='manager') | Q(is_staff=True)).distinct()
-            for manager in managers:
-                Notification.objects.create(
-                    destinataire=manager,
-                    mouvement=mouvement,
-                    type='mouvement_attente',
-                    message=f"Nouveau mouvement à valider : {mouvement.produit.nom}, quantité : {mouvement.quantite}, motif : {mouvement.motif}, employé : {mouvement.user.get_full_name()} ({mouvement.user.email})"
-                )
+            # Notification aux managers du magasin
+            notifier_mouvements_attente([mouvement], user)
 
 from rest_framework.views import APIView
 
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire"""
+    def write(self, value):
+        return value
+
+
+def _reponse_csv(nom_fichier, entete, lignes):
+    """Réponse CSV en flux : la mémoire reste constante quel que soit le volume"""
+    writer = csv.writer(_Echo())
+
+    def contenu():
+        yield '\ufeff' + writer.writerow(entete)  # BOM pour Excel
+        for ligne in lignes:
+            yield writer.writerow(ligne)
+
+    response = StreamingHttpResponse(contenu(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return response
+
+
+def _par_lots(queryset, champs, taille=2000):
+    """
+    Parcourt un queryset par lots d'id décroissants (pagination par clé).
+    Le client MySQL charge tout le résultat d'une requête en mémoire, même
+    avec .iterator() : des requêtes bornées gardent la mémoire constante.
+    """
+    dernier = None
+    while True:
+        lot = queryset.order_by('-id')
+        if dernier is not None:
+            lot = lot.filter(id__lt=dernier)
+        lignes = list(lot.values_list('id', *champs)[:taille])
+        if not lignes:
+            return
+        yield from lignes
+        dernier = lignes[-1][0]
+
+
+class MouvementExportView(generics.GenericAPIView):
+    """Export CSV de l'historique des mouvements, mêmes filtres que la liste"""
+    queryset = Mouvement.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = MouvementListCreateView.filterset_fields
+
+    def get(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+        lignes = _par_lots(self.filter_queryset(self.get_queryset()), [
+            'date', 'type', 'quantite', 'motif', 'statut',
+            'produit__reference', 'produit__nom', 'magasin__nom', 'user__email', 'user__prenom', 'user__nom',
+        ])
+        return _reponse_csv(
+            'mouvements.csv',
+            ['id', 'date', 'type', 'quantite', 'motif', 'statut',
+             'produit_reference', 'produit_nom', 'magasin', 'utilisateur_email', 'utilisateur_prenom', 'utilisateur_nom'],
+            ((l[0], timezone.localtime(l[1]).isoformat(), *l[2:]) for l in lignes),
+        )
+
+
+class StockExportView(generics.GenericAPIView):
+    """Export CSV des lignes de stock, mêmes filtres que la liste"""
+    queryset = Stock.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = StockListCreateView.filterset_fields
+
+    def get_queryset(self):
+        return annoter_quantite_lue(Stock.objects.all())
+
+    def get(self, request):
+        user = request.user
+        stocks = self.get_queryset()
+        # Hors admin, limité au magasin de l'utilisateur
+        if getattr(user, 'role', None) != 'admin':
+            if not getattr(user, 'magasin_id', None):
+                return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_403_FORBIDDEN)
+            stocks = stocks.filter(magasin_id=user.magasin_id)
+        lignes = _par_lots(self.filter_queryset(stocks), [
+            'produit__reference', 'produit__nom', 'produit__categorie', 'magasin__nom',
+            'quantite_lue', 'produit__seuil_alerte', 'produit__prix_unitaire', 'updated_at',
+        ])
+        return _reponse_csv(
+            'stocks.csv',
+            ['id', 'produit_reference', 'produit_nom', 'categorie', 'magasin',
+             'quantite', 'seuil_alerte', 'prix_unitaire', 'mis_a_jour'],
+            ((*l[:-1], timezone.localtime(l[-1]).isoformat()) for l in lignes),
+        )
+
+# Nombre maximal de lignes acceptées par envoi groupé
+TAILLE_MAX_LOT = 10000
+
+class MouvementLotCreateView(APIView):
+    """Création groupée de mouvements avec un résultat par ligne"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data.get('mouvements') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Une liste de mouvements est attendue.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > TAILLE_MAX_LOT:
+            return Response({'error': f'Au plus {TAILLE_MAX_LOT} mouvements par envoi.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = MouvementLotItemSerializer(data=items, many=True, context={'request': request})
+        valides, erreurs = serializer.valider_lignes()
+
+        resultats = {index: {'index': index, 'erreurs': detail} for index, detail in erreurs.items()}
+        if valides:
+            with transaction.atomic():
+                mouvements = creer_mouvements([
+                    Mouvement(user=user, statut=statut_initial(d['produit'], d['quantite']), **d)
+                    for _, d in valides
+                ])
+                # Les deltas sont appliqués dans l'ordre d'envoi : chaque ligne
+                # Stock touchée n'est écrite qu'une fois
+                appliquer_deltas([
+                    (m.produit_id, m.magasin_id, delta_mouvement(m))
+                    for m in mouvements if m.statut == 'valide'
+                ])
+                notifier_mouvements_attente([m for m in mouvements if m.statut == 'attente'], user)
+
+            for (index, _), mouvement in zip(valides, mouvements):
+                resultats[index] = {'index': index, 'id': mouvement.id, 'statut': mouvement.statut}
+
+        if not valides:
+            code = status.HTTP_400_BAD_REQUEST
+        elif erreurs:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_201_CREATED
+        return Response({
+            'crees': len(valides),
+            'erreurs': len(erreurs),
+            'resultats': [resultats[index] for index in sorted(resultats)],
+        }, status=code)
+
+
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        return Notification.objects.filter(destinataire=user).order_by('-date')
+        return Notification.objects.filter(destinataire=user).select_related('mouvement').order_by('-date')
 
     def post(self, request, *args, **kwargs):
         # Marquer une notification comme lue
         notif_id = request.data.get('notification_id')
-        try:
-            notif = Notification.objects.get(id=notif_id, destinataire=request.user)
-            notif.lu = True
-            notif.save()
-            return Response({'status': 'lu'}, status=200)
-        except Notification.DoesNotExist:
+        if not Notification.objects.filter(id=notif_id, destinataire=request.user).update(lu=True):
             return Response({'error': 'Notification introuvable'}, status=404)
+        return Response({'status': 'lu'}, status=200)
+
+
+class NotificationFluxView(generics.ListAPIView):
+    """Flux compact des notifications de l'utilisateur (?lu=false pour les non-lues)"""
+    serializer_class = NotificationFluxSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['lu', 'type']
+    pagination_class = NotificationCursorPagination
+
+    def get_queryset(self):
+        return Notification.objects.filter(destinataire=self.request.user).select_related('mouvement').only(
+            'id', 'type', 'message', 'date', 'lu', 'mouvement_id', 'stock_id', 'mouvement__statut'
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def notifications_non_lues_view(request):
+    """Nombre de notifications non lues, servi par l'index (destinataire, lu, date)"""
+    return Response({'unread_count': Notification.objects.filter(destinataire=request.user, lu=False).count()})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def notifications_tout_lire_view(request):
+    """Marque toutes les notifications de l'utilisateur comme lues, en un seul UPDATE"""
+    nombre = Notification.objects.filter(destinataire=request.user, lu=False).update(lu=True)
+    return Response({'status': 'lu', 'updated': nombre})
 
 class MouvementValidationView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, mouvement_id):
         user = request.user
         if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
@@ -154,25 +357,18 @@ class MouvementValidationView(APIView):
 
         action = request.data.get('action')  # 'accepte' ou 'rejete'
         try:
-            mouvement = Mouvement.objects.get(id=mouvement_id)
+            # Verrou sur le mouvement : deux validations simultanées ne
+            # peuvent pas appliquer deux fois le même delta
+            mouvement = Mouvement.objects.select_for_update().get(id=mouvement_id)
             if mouvement.statut not in ['attente']:
                 return Response({'error': 'Déjà traité'}, status=400)
 
             if action == 'accepte':
                 mouvement.statut = 'accepte'
                 # Mettre à jour le stock
-                stock, created = Stock.objects.get_or_create(
-                    produit=mouvement.produit,
-                    magasin=mouvement.magasin,
-                    defaults={'quantite': 0}
-                )
-                if mouvement.type == 'entrée':
-                    stock.quantite += mouvement.quantite
-                else:
-                    stock.quantite -= mouvement.quantite
-                    if stock.quantite < 0:
-                        stock.quantite = 0
-                stock.save()
+                appliquer_mouvement(mouvement)
+                # Daté de sa création : les snapshots déjà construits depuis ce jour sont à refaire
+                historique.invalider_snapshots([mouvement])
                 notif_type = 'mouvement_valide'
                 notif_msg = f"Votre mouvement pour {mouvement.produit.nom} a été validé."
             elif action == 'rejete':
@@ -195,8 +391,58 @@ class MouvementValidationView(APIView):
             return Response({'error': 'Mouvement introuvable'}, status=404)
 
 
+
+class MouvementAttenteListView(generics.ListAPIView):
+    """File des mouvements en attente de validation du magasin du manager"""
+    serializer_class = MouvementSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['produit', 'user', 'type', 'motif']
+    pagination_class = MouvementAttentePagination
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Mouvement.objects.filter(statut='attente')
+        if user.role == 'admin':
+            magasin = self.request.query_params.get('magasin')
+            return queryset.filter(magasin_id=magasin) if magasin else queryset
+        return queryset.filter(magasin_id=user.magasin_id)
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+        return super().list(request, *args, **kwargs)
+
+
+class MouvementValidationLotView(APIView):
+    """Acceptation ou rejet groupé de mouvements en attente"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = ValidationLotSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        action = serializer.validated_data['action']
+
+        # Un manager ne traite que les mouvements de son magasin
+        magasin_id = None if user.role == 'admin' else user.magasin_id
+        traites = traiter_mouvements(ids, action, magasin_id)
+        ignores = sorted(ids - {m.id for m in traites})
+        logger.info(f"{len(traites)} mouvements {action}s par {user.email}")
+        return Response({
+            'status': action,
+            'traites': [m.id for m in traites],
+            'ignores': ignores,
+        }, status=status.HTTP_200_OK)
+
+
 class CommandeListCreateView(generics.ListCreateAPIView):
-    queryset = Commande.objects.all()
+    queryset = Commande.objects.select_related('fournisseur').prefetch_related('details__produit')
     serializer_class = CommandeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -204,7 +450,7 @@ class CommandeListCreateView(generics.ListCreateAPIView):
     ordering = ['-date']
 
 class CommandeDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Commande.objects.all()
+    queryset = Commande.objects.select_related('fournisseur').prefetch_related('details__produit')
     serializer_class = CommandeSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -214,9 +460,194 @@ class CommandeDetailListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         commande_id = self.kwargs.get('commande_id')
-        return CommandeDetail.objects.filter(commande_id=commande_id)
+        return CommandeDetail.objects.filter(commande_id=commande_id).select_related('produit')
     
+    @transaction.atomic
     def perform_create(self, serializer):
         commande_id = self.kwargs.get('commande_id')
         commande = Commande.objects.get(id=commande_id)
-        serializer.save(commande=commande)
\ No newline at end of file
+        serializer.save(commande=commande)
+        recalculer_total(commande.id)
+
+
+
+class CommandeReceptionView(APIView):
+    """Réception d'une commande livrée : entrées en stock de toutes ses lignes, idempotente"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+
+        lignes = ReceptionLigneSerializer(data=request.data.get('lignes', []), many=True)
+        lignes.is_valid(raise_exception=True)
+        quantites = {ligne['detail']: ligne['quantite'] for ligne in lignes.validated_data}
+
+        try:
+            commande = Commande.objects.select_related('fournisseur').get(pk=pk)
+        except Commande.DoesNotExist:
+            return Response({'error': 'Commande introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        # Magasin de l'utilisateur, ou magasin choisi par un admin (à défaut celui du fournisseur)
+        try:
+            magasin_id = _magasin_autorise(user, request.data.get('magasin')) or commande.fournisseur.magasin_id
+        except PermissionError:
+            return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_403_FORBIDDEN)
+        except (TypeError, ValueError):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        if magasin_id is None:
+            return Response({'error': 'Magasin de réception non défini'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            commande, mouvements, deja_recue = receptionner_commande(commande.pk, user, magasin_id, quantites)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not deja_recue:
+            logger.info(f"Commande {commande.pk} réceptionnée par {user.email} : {len(mouvements)} mouvements")
+        return Response({
+            'commande': commande.pk,
+            'statut': commande.statut,
+            'deja_recue': deja_recue,
+            'mouvements': [
+                {'id': m.pk, 'produit': m.produit_id, 'magasin': m.magasin_id, 'quantite': m.quantite}
+                for m in mouvements
+            ],
+        }, status=status.HTTP_200_OK if deja_recue else status.HTTP_201_CREATED)
+
+
+
+class TransfertView(APIView):
+    """Transfert atomique de plusieurs produits d'un magasin à un autre"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['manager', 'admin']:
+            return Response({'error': "Accès interdit."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = TransfertSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        # Un manager ne transfère que depuis son propre magasin
+        if user.role != 'admin' and data['source'] != user.magasin_id:
+            return Response({'error': "Transfert autorisé uniquement depuis votre magasin."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            lot, mouvements = transferer(
+                data['source'], data['destination'],
+                [(ligne['produit'], ligne['quantite']) for ligne in data['lignes']], user,
+            )
+        except StockInsuffisant as e:
+            return Response({
+                'error': 'Stock insuffisant dans le magasin source.',
+                'lignes': [
+                    {'produit': produit_id, 'disponible': disponible, 'demande': demande}
+                    for produit_id, _, disponible, demande in e.lignes
+                ],
+            }, status=status.HTTP_409_CONFLICT)
+
+        logger.info(f"Transfert {lot} du magasin {data['source']} vers {data['destination']} : {len(data['lignes'])} lignes")
+        return Response({
+            'lot': str(lot),
+            'source': data['source'],
+            'destination': data['destination'],
+            'mouvements': [m.pk for m in mouvements],
+        }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard_view(request):
+    """Indicateurs agrégés du tableau de bord, limités au magasin de l'utilisateur hors admin"""
+    user = request.user
+    if getattr(user, 'role', None) == 'admin':
+        magasin_id = request.query_params.get('magasin') or None
+    else:
+        magasin_id = getattr(user, 'magasin_id', None)
+        if not magasin_id:
+            return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        magasin_id = int(magasin_id) if magasin_id is not None else None
+    except (TypeError, ValueError):
+        return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(tableau_de_bord.indicateurs(magasin_id))
+
+
+def _magasin_autorise(user, magasin_id):
+    """Magasin imposé pour les non-admins, magasin demandé (ou None) pour les admins"""
+    if getattr(user, 'role', None) == 'admin':
+        return int(magasin_id) if magasin_id else None
+    if not getattr(user, 'magasin_id', None):
+        raise PermissionError
+    return user.magasin_id
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def historique_quantite_view(request):
+    """Quantité d'un produit dans un magasin à un instant donné (?produit=&magasin=&date=)"""
+    try:
+        magasin_id = _magasin_autorise(request.user, request.query_params.get('magasin'))
+        produit_id = int(request.query_params['produit'])
+    except PermissionError:
+        return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_403_FORBIDDEN)
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'Paramètres produit et magasin requis'}, status=status.HTTP_400_BAD_REQUEST)
+    if magasin_id is None:
+        return Response({'error': 'Paramètres produit et magasin requis'}, status=status.HTTP_400_BAD_REQUEST)
+
+    instant = timezone.now()
+    if request.query_params.get('date'):
+        try:
+            instant = parse_datetime(request.query_params['date'])
+        except ValueError:
+            # Bien formée mais impossible (2024-02-30)
+            instant = None
+        if instant is None:
+            return Response({'error': 'Date invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(instant):
+            instant = timezone.make_aware(instant)
+
+    return Response({
+        'produit_id': produit_id,
+        'magasin_id': magasin_id,
+        'date': instant,
+        'quantite': historique.quantite_au(produit_id, magasin_id, instant),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def historique_serie_view(request):
+    """Série de quantités (?produit=&magasin=&debut=&fin=&pas=jour|semaine|mois) pour les graphiques"""
+    params = request.query_params
+    try:
+        magasin_id = _magasin_autorise(request.user, params.get('magasin'))
+        produit_id = int(params['produit']) if params.get('produit') else None
+    except PermissionError:
+        return Response({'error': 'Utilisateur non assigné à un magasin'}, status=status.HTTP_403_FORBIDDEN)
+    except (TypeError, ValueError):
+        return Response({'error': 'Produit ou magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fin = parse_date(params['fin']) if params.get('fin') else timezone.localdate()
+        debut = parse_date(params['debut']) if params.get('debut') else None
+    except ValueError:
+        # Bien formée mais impossible (2024-02-30)
+        fin = debut = None
+    pas = params.get('pas', 'jour')
+    if fin is None or (params.get('debut') and debut is None):
+        return Response({'error': 'Date invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    debut = debut or fin - timedelta(days=29)
+    if debut > fin or pas not in historique.PAS_SERIE:
+        return Response({'error': 'Plage ou pas invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    if historique.nombre_points(debut, fin, pas) > historique.MAX_POINTS_SERIE:
+        return Response({'error': f'Au plus {historique.MAX_POINTS_SERIE} points par série'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'produit_id': produit_id,
+        'magasin_id': magasin_id,
+        'pas': pas,
+        'points': historique.serie(debut, fin, produit_id=produit_id, magasin_id=magasin_id, pas=pas),
+    })
@@ -99,6 +99,20 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hacheur des nouveaux mots de passe. À la connexion, Django réécrit tout
+# hachage produit par un autre algorithme (ou avec moins d'itérations) : la
+# migration vers le hacheur choisi se fait donc au fil des connexions.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='django.contrib.auth.hashers.PBKDF2PasswordHasher')
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+    hasher for hasher in (
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ) if hasher != PASSWORD_HASHER
+]
+
 # Internationalization
 LANGUAGE_CODE = 'fr-fr'
 TIME_ZONE = 'Europe/Paris'
@@ -119,7 +133,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.JWTProfilAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -148,6 +162,7 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CustomTokenRefreshSerializer',
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -174,6 +189,30 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Cache partagé : versions des profils utilisateur, destinataires des
+# notifications, indicateurs du tableau de bord. Avec plusieurs processus, il
+# doit être commun à tous (Redis, Memcached ou
+# django.core.cache.backends.db.DatabaseCache après `manage.py createcachetable`) ;
+# le cache en mémoire par défaut ne convient qu'à un seul processus.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Profils utilisateur servis sans requête par JWTProfilAuthentication :
+# durée (secondes) du cache en mémoire et de confiance dans les claims
+AUTH_PROFIL_TTL = config('AUTH_PROFIL_TTL', default=300, cast=int)
+AUTH_PROFIL_TAILLE_MAX = config('AUTH_PROFIL_TAILLE_MAX', default=10000, cast=int)
+# Refresh tokens révoqués gardés en mémoire (refresh, déconnexion). Purger les
+# tokens expirés avec `manage.py purger_tokens`.
+AUTH_REVOCATIONS_TAILLE_MAX = config('AUTH_REVOCATIONS_TAILLE_MAX', default=10000, cast=int)
+
+# Threads de hachage des mots de passe pour la création d'utilisateurs en lot
+# (0 : un par cœur)
+AUTH_HACHAGE_WORKERS = config('AUTH_HACHAGE_WORKERS', default=0, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -189,6 +228,38 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Écriture différée des sorties 'vente' (voir stock/tampon.py). Les variations
+# sont stockées en base (VariationEnAttente) : sûres avec plusieurs workers et
+# après un arrêt. Chaque processus vide toutes les lignes en attente toutes les
+# STOCK_TAMPON_INTERVALLE_MS ms ou après STOCK_TAMPON_MAX_EVENEMENTS ventes reçues.
+STOCK_TAMPON_VENTES = config('STOCK_TAMPON_VENTES', default=False, cast=bool)
+STOCK_TAMPON_INTERVALLE_MS = config('STOCK_TAMPON_INTERVALLE_MS', default=200, cast=int)
+STOCK_TAMPON_MAX_EVENEMENTS = config('STOCK_TAMPON_MAX_EVENEMENTS', default=100, cast=int)
+
+# Durée de cache (secondes) des indicateurs du tableau de bord. Ce cache et
+# celui des destinataires sont invalidés par une clé de version du cache
+# partagé (CACHES) : une écriture dans un processus vaut pour tous.
+STOCK_TABLEAU_BORD_TTL = config('STOCK_TABLEAU_BORD_TTL', default=30, cast=int)
+
+# Notifications aux managers : durée de cache (secondes) des destinataires par
+# magasin, et diffusion après commit hors du thread de la requête
+STOCK_DESTINATAIRES_TTL = config('STOCK_DESTINATAIRES_TTL', default=300, cast=int)
+STOCK_NOTIFICATIONS_ASYNC = config('STOCK_NOTIFICATIONS_ASYNC', default=False, cast=bool)
+# Ancienneté (jours) au-delà de laquelle les notifications lues sont purgées
+STOCK_NOTIFICATIONS_RETENTION_JOURS = config('STOCK_NOTIFICATIONS_RETENTION_JOURS', default=30, cast=int)
+
+# Flux temps réel notifications/messages (messaging/evenements.py). Chaque
+# connexion ouverte occupe un thread du serveur WSGI pendant sa durée : au
+# plus EVENEMENTS_FLUX_MAX flux par processus (503 au-delà), à garder sous le
+# nombre de threads par worker (gunicorn -k gthread --threads) pour laisser
+# de la place aux autres requêtes. Le flux s'ouvre avec un ticket signé
+# (stream/ticket/) valable EVENEMENTS_TICKET_TTL_S secondes, jamais avec le JWT.
+EVENEMENTS_KEEPALIVE_S = config('EVENEMENTS_KEEPALIVE_S', default=15, cast=int)
+EVENEMENTS_DUREE_MAX_S = config('EVENEMENTS_DUREE_MAX_S', default=300, cast=int)
+EVENEMENTS_FLUX_MAX = config('EVENEMENTS_FLUX_MAX', default=8, cast=int)
+EVENEMENTS_TICKET_TTL_S = config('EVENEMENTS_TICKET_TTL_S', default=60, cast=int)
+EVENEMENTS_POLL_TIMEOUT_S = config('EVENEMENTS_POLL_TIMEOUT_S', default=25, cast=int)
+
 # Logging pour debug
 LOGGING = {
     'version': 1,
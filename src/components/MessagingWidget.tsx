@@ -3,6 +3,7 @@ import { MessageCircle, Send, X, Users, Bot } from 'lucide-react';
 import { messagingService, authService } from '../services/api';
 import { normalizeApiResponse } from '../config/api';
 import { useAuth } from '../hooks/useAuth';
+import { useEvenements } from '../hooks/useEvenements';
 import { Message, User } from '../types';
 import { ChatBot } from './ChatBot';
 import toast from 'react-hot-toast';
@@ -16,6 +17,7 @@ export const MessagingWidget: React.FC = () => {
   const [selectedUser, setSelectedUser] = useState<User | null>(null);
   const [newMessage, setNewMessage] = useState('');
   const [unreadCount, setUnreadCount] = useState(0);
+  const [unreadByUser, setUnreadByUser] = useState<Record<string, number>>({});
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const widgetRef = useRef<HTMLDivElement>(null);
 
@@ -40,13 +42,22 @@ export const MessagingWidget: React.FC = () => {
     if (user) {
       fetchUsers();
       fetchMessages();
-      
-      // Polling pour les nouveaux messages
-      const interval = setInterval(fetchMessages, 30000);
-      return () => clearInterval(interval);
     }
   }, [user]);
 
+  // Nouveaux messages poussés par le flux d'événements, sans polling
+  useEvenements((type, donnees) => {
+    if (type === 'message') fetchMessages();
+    // Accusé de lecture : l'interlocuteur a lu nos messages
+    if (type === 'lecture' && selectedUser?.id.toString() === donnees.lecteur) {
+      setMessages(prev => prev.map(msg =>
+        msg.receiver_id === donnees.lecteur && (!donnees.jusqu_a || Number(msg.id) <= Number(donnees.jusqu_a))
+          ? { ...msg, read: true }
+          : msg
+      ));
+    }
+  }, !!user);
+
   useEffect(() => {
     scrollToBottom();
   }, [messages]);
@@ -84,25 +95,35 @@ export const MessagingWidget: React.FC = () => {
     }
   };
 
+  const formatMessage = (item: any): Message => ({
+    ...item,
+    id: item.id.toString(),
+    sender_id: item.sender_id?.toString() || item.sender?.toString(),
+    receiver_id: item.receiver_id?.toString() || item.receiver?.toString(),
+    timestamp: new Date(item.timestamp)
+  });
+
+  const fetchConversation = async (peer: User) => {
+    const page = await messagingService.getConversationMessages(peer.id.toString());
+    // Page la plus récente, affichée dans l'ordre chronologique
+    const conversationMessages = page.results.map(formatMessage).reverse() as Message[];
+    setMessages(conversationMessages);
+    return conversationMessages;
+  };
+
   const fetchMessages = async () => {
     try {
-      const messagesData = await messagingService.getMessages();
-      
-      const normalizedMessages = normalizeApiResponse(messagesData);
-      const formattedMessages = normalizedMessages.map((item: any) => ({
-        ...item,
-        id: item.id.toString(),
-        sender_id: item.sender_id?.toString() || item.sender?.toString(),
-        receiver_id: item.receiver_id?.toString() || item.receiver?.toString(),
-        timestamp: new Date(item.timestamp)
-      })) as Message[];
-
-      setMessages(formattedMessages);
+      const inbox = await messagingService.getConversations();
+      const parUtilisateur: Record<string, number> = {};
+      inbox.conversations.forEach((conversation: any) => {
+        parUtilisateur[conversation.interlocuteur.id.toString()] = conversation.non_lus;
+      });
+      setUnreadByUser(parUtilisateur);
+      setUnreadCount(inbox.non_lus);
 
-      const unread = formattedMessages.filter(msg => 
-        msg.receiver_id === user?.id.toString() && !msg.read
-      ).length;
-      setUnreadCount(unread);
+      if (selectedUser) {
+        await fetchConversation(selectedUser);
+      }
     } catch (error) {
       toast.error('Erreur lors du chargement des messages');
     }
@@ -126,10 +147,15 @@ export const MessagingWidget: React.FC = () => {
     }
   };
 
-  const markAsRead = async (messageId: string) => {
+  const markConversationAsRead = async (peer: User, conversationMessages: Message[]) => {
+    const unread = conversationMessages.filter(msg => msg.sender_id === peer.id.toString() && !msg.read);
+    if (unread.length === 0) return;
     try {
-      await messagingService.updateMessage(messageId, { read: true });
-      await fetchMessages(); // Recharger les messages
+      // Un seul appel pour toute la conversation, jusqu'au dernier message affiché
+      const result = await messagingService.markConversationRead(peer.id.toString(), unread[unread.length - 1].id);
+      setMessages(prev => prev.map(msg => msg.sender_id === peer.id.toString() ? { ...msg, read: true } : msg));
+      setUnreadByUser(prev => ({ ...prev, [peer.id.toString()]: 0 }));
+      setUnreadCount(result.non_lus);
     } catch (error) {
       console.error('Erreur lors du marquage comme lu:', error);
     }
@@ -141,29 +167,22 @@ export const MessagingWidget: React.FC = () => {
 
   const getConversationMessages = () => {
     if (!selectedUser || !user) return [];
-    
-    return messages.filter(msg => 
-      (msg.sender_id === user.id.toString() && msg.receiver_id === selectedUser.id.toString()) ||
-      (msg.sender_id === selectedUser.id.toString() && msg.receiver_id === user.id.toString())
-    ).sort((a, b) => a.timestamp.getTime() - b.timestamp.getTime());
+    return messages;
   };
 
-  const handleUserSelect = (selectedUser: User) => {
+  const handleUserSelect = async (selectedUser: User) => {
     setSelectedUser(selectedUser);
     
-    const conversationMessages = messages.filter(msg => 
-      msg.sender_id === selectedUser.id.toString() && msg.receiver_id === user?.id.toString() && !msg.read
-    );
-    
-    conversationMessages.forEach(msg => {
-      markAsRead(msg.id);
-    });
+    try {
+      const conversationMessages = await fetchConversation(selectedUser);
+      await markConversationAsRead(selectedUser, conversationMessages);
+    } catch (error) {
+      toast.error('Erreur lors du chargement de la conversation');
+    }
   };
 
   const getUserUnreadCount = (userId: string) => {
-    return messages.filter(msg => 
-      msg.sender_id === userId.toString() && msg.receiver_id === user?.id.toString() && !msg.read
-    ).length;
+    return unreadByUser[userId.toString()] || 0;
   };
 
   if (!user) return null;
@@ -1,28 +1,31 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { Bell, Package, TrendingUp, TrendingDown, X, User as UserIcon } from 'lucide-react';
+import { Bell, Package, TrendingUp, TrendingDown, X, AlertTriangle } from 'lucide-react';
 import { useAuth } from '../hooks/useAuth';
-import { stockService, productsService, storesService, authService } from '../services/api';
-import { normalizeApiResponse } from '../config/api';
-import { Mouvement, Produit, Magasin, User } from '../types';
+import { useEvenements } from '../hooks/useEvenements';
+import { stockService } from '../services/api';
 
 interface Notification {
   id: string;
-  type: 'stock_movement';
+  type: string;
   title: string;
   message: string;
   timestamp: Date;
   read: boolean;
-  user_name?: string;
 }
 
+const TITRES: Record<string, string> = {
+  mouvement_attente: 'Mouvement à valider',
+  mouvement_valide: 'Mouvement validé',
+  mouvement_rejete: 'Mouvement rejeté',
+  stock_bas: 'Stock bas',
+  rupture: 'Rupture de stock',
+};
+
 export const NotificationWidget: React.FC = () => {
   const { user } = useAuth();
   const [notifications, setNotifications] = useState<Notification[]>([]);
   const [isOpen, setIsOpen] = useState(false);
   const [unreadCount, setUnreadCount] = useState(0);
-  const [produits, setProduits] = useState<Produit[]>([]);
-  const [magasins, setMagasins] = useState<Magasin[]>([]);
-  const [users, setUsers] = useState<User[]>([]);
   const dropdownRef = useRef<HTMLDivElement>(null);
 
   // Fermer les notifications quand on clique ailleurs
@@ -42,96 +45,72 @@ export const NotificationWidget: React.FC = () => {
     };
   }, [isOpen]);
 
+  const fetchFeed = async () => {
+    try {
+      const feed = await stockService.getNotificationFeed({ page_size: 10 });
+      setNotifications(feed.results.map((item: any) => ({
+        id: item.id.toString(),
+        type: item.type,
+        title: TITRES[item.type] || 'Notification',
+        message: item.message,
+        timestamp: new Date(item.date),
+        read: item.lu,
+      })));
+    } catch (error) {
+      console.error('Erreur lors du chargement des notifications:', error);
+    }
+  };
+
   useEffect(() => {
-    if (!user || user.role !== 'admin') return;
+    if (!user || (user.role !== 'admin' && user.role !== 'manager')) return;
 
-    const fetchData = async () => {
+    // Compteur initial ; le flux est chargé à l'ouverture
+    const fetchCount = async () => {
       try {
-        const [produitsData, magasinsData, usersData, mouvementsData] = await Promise.all([
-          productsService.getProducts(),
-          storesService.getStores(),
-          authService.getUsers(),
-          stockService.getMovements()
-        ]);
-
-        // Normaliser toutes les réponses
-        const normalizedProduits = normalizeApiResponse(produitsData);
-        const normalizedMagasins = normalizeApiResponse(magasinsData);
-        const normalizedUsers = normalizeApiResponse(usersData);
-        const normalizedMouvements = normalizeApiResponse(mouvementsData);
-
-        setProduits(normalizedProduits.map((item: any) => ({ ...item, createdAt: new Date(item.created_at) })) as Produit[]);
-        setMagasins(normalizedMagasins.map((item: any) => ({ ...item, createdAt: new Date(item.created_at) })) as Magasin[]);
-        setUsers(normalizedUsers.map((item: any) => ({ ...item, createdAt: new Date(item.date_joined || item.created_at) })) as User[]);
-
-        // Traiter les mouvements récents (dernières 24h)
-        const newNotifications: Notification[] = [];
-        const now = new Date();
-        const yesterday = new Date(now.getTime() - 24 * 60 * 60 * 1000);
-        
-        const recentMovements = normalizedMouvements
-          .map((item: any) => ({ ...item, date: new Date(item.date) }))
-          .filter((mouvement: any) => mouvement.date >= yesterday)
-          .sort((a: any, b: any) => b.date.getTime() - a.date.getTime())
-          .slice(0, 20);
-
-        console.log('Mouvements récents trouvés:', recentMovements.length);
-
-        recentMovements.forEach((mouvement: any) => {
-          const produit = normalizedProduits.find((p: any) => p.id.toString() === mouvement.produit_id?.toString());
-          const magasin = normalizedMagasins.find((m: any) => m.id.toString() === mouvement.magasin_id?.toString());
-          const userMouvement = normalizedUsers.find((u: any) => u.id.toString() === mouvement.user_id?.toString());
-
-          console.log('Mouvement:', {
-            produit: produit?.nom,
-            magasin: magasin?.nom,
-            user: userMouvement?.email,
-            type: mouvement.type,
-            quantite: mouvement.quantite
-          });
-
-          // Afficher les mouvements de tous les utilisateurs (admin et employés)
-          if (produit && magasin && userMouvement) {
-            newNotifications.push({
-              id: mouvement.id.toString(),
-              type: 'stock_movement',
-              title: `Mouvement de stock - ${produit.nom}`,
-              message: `${mouvement.type === 'entrée' ? 'Entrée' : 'Sortie'} de ${mouvement.quantite} unités dans ${magasin.nom} (${mouvement.motif})`,
-              timestamp: mouvement.date,
-              read: false,
-              user_name: `${userMouvement.prenom || ''} ${userMouvement.nom || ''}`.trim() || userMouvement.email
-            });
-          }
-        });
-
-        console.log('Notifications créées:', newNotifications.length);
-        setNotifications(newNotifications.slice(0, 10));
-        setUnreadCount(newNotifications.length);
+        setUnreadCount(await stockService.getUnreadNotificationCount());
       } catch (error) {
-        console.error('Erreur lors du chargement des données:', error);
+        console.error('Erreur lors du chargement du compteur de notifications:', error);
       }
     };
 
-    fetchData();
+    fetchCount();
+  }, [user]);
 
-    // Polling pour les nouvelles notifications toutes les 30 secondes
-    const interval = setInterval(fetchData, 30000);
+  // Les nouvelles notifications arrivent par le flux d'événements, sans polling
+  useEvenements((type) => {
+    if (type !== 'notification') return;
+    setUnreadCount(prev => prev + 1);
+    if (isOpen) fetchFeed();
+  }, !!user && (user.role === 'admin' || user.role === 'manager'));
 
-    return () => clearInterval(interval);
-  }, [user]);
+  useEffect(() => {
+    if (isOpen) fetchFeed();
+  }, [isOpen]);
 
-  const markAsRead = (notificationId: string) => {
+  const markAsRead = async (notificationId: string) => {
+    const notification = notifications.find(notif => notif.id === notificationId);
+    if (!notification || notification.read) return;
     setNotifications(prev => 
       prev.map(notif => 
         notif.id === notificationId ? { ...notif, read: true } : notif
       )
     );
     setUnreadCount(prev => Math.max(0, prev - 1));
+    try {
+      await stockService.markNotificationRead(notificationId);
+    } catch (error) {
+      console.error('Erreur lors du marquage de la notification:', error);
+    }
   };
 
-  const markAllAsRead = () => {
+  const markAllAsRead = async () => {
     setNotifications(prev => prev.map(notif => ({ ...notif, read: true })));
     setUnreadCount(0);
+    try {
+      await stockService.markAllNotificationsRead();
+    } catch (error) {
+      console.error('Erreur lors du marquage des notifications:', error);
+    }
   };
 
   // Ne pas afficher pour les employés
@@ -191,10 +170,14 @@ export const NotificationWidget: React.FC = () => {
                 >
                   <div className="flex items-start space-x-3">
                     <div className="p-2 rounded-full bg-blue-100">
-                      {notification.message.includes('Entrée') ? (
-                        <TrendingUp className="h-4 w-4 text-green-600" />
-                      ) : (
+                      {notification.type === 'stock_bas' || notification.type === 'rupture' ? (
+                        <AlertTriangle className="h-4 w-4 text-orange-600" />
+                      ) : notification.type === 'mouvement_rejete' ? (
                         <TrendingDown className="h-4 w-4 text-red-600" />
+                      ) : notification.type === 'mouvement_attente' ? (
+                        <Package className="h-4 w-4 text-blue-600" />
+                      ) : (
+                        <TrendingUp className="h-4 w-4 text-green-600" />
                       )}
                     </div>
                     <div className="flex-1 min-w-0">
@@ -206,12 +189,6 @@ export const NotificationWidget: React.FC = () => {
                       <p className="text-sm text-gray-600 mt-1">
                         {notification.message}
                       </p>
-                      {notification.user_name && (
-                        <div className="flex items-center mt-2 text-xs text-gray-500">
-                          <UserIcon className="h-3 w-3 mr-1" />
-                          Par {notification.user_name}
-                        </div>
-                      )}
                       <p className="text-xs text-gray-500 mt-2">
                         {notification.timestamp.toLocaleString('fr-FR')}
                       </p>
@@ -226,7 +203,7 @@ export const NotificationWidget: React.FC = () => {
               <div className="p-8 text-center">
                 <Bell className="h-12 w-12 text-gray-400 mx-auto mb-4" />
                 <p className="text-gray-500">Aucune notification récente</p>
-                <p className="text-xs text-gray-400 mt-1">Les mouvements de stock des dernières 24h apparaîtront ici</p>
+                <p className="text-xs text-gray-400 mt-1">Les alertes de stock et mouvements à valider apparaîtront ici</p>
               </div>
             )}
           </div>
@@ -1,9 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import { Package, Store, Users, AlertTriangle, TrendingUp, DollarSign } from 'lucide-react';
-import { productsService, storesService, authService, stockService } from '../../services/api';
-import { normalizeApiResponse } from '../../config/api';
-import { Produit, Stock, Magasin, User } from '../../types';
+import { stockService } from '../../services/api';
 import { safeNumber } from '../../utils/numbers';
 
 export const AdminDashboard: React.FC = () => {
@@ -53,101 +51,20 @@ export const AdminDashboard: React.FC = () => {
       setLoading(true);
       setError(null);
       
-      const results = await Promise.allSettled([
-        productsService.getProducts(),
-        storesService.getStores(),
-        authService.getUsers(),
-        stockService.getStocks()
-      ]);
+      // Indicateurs calculés côté serveur (agrégats SQL mis en cache)
+      const dashboard = await stockService.getDashboard();
 
-      const produitsResponse = results[0].status === 'fulfilled' ? results[0].value : [];
-      const magasinsResponse = results[1].status === 'fulfilled' ? results[1].value : [];
-      const utilisateursResponse = results[2].status === 'fulfilled' ? results[2].value : [];
-      const stocksResponse = results[3].status === 'fulfilled' ? results[3].value : [];
-
-      results.forEach((result, index) => {
-        if (result.status === 'rejected') {
-          const serviceName = ['produits', 'magasins', 'utilisateurs', 'stocks'][index];
-          console.error(`❌ Erreur ${serviceName}:`, result.reason);
-        }
-      });
-
-      const produits = normalizeApiResponse(produitsResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        prix_unitaire: safeNumber(item.prix_unitaire, 0),
-        seuil_alerte: safeNumber(item.seuil_alerte, 0),
-        createdAt: new Date(item.created_at || Date.now())
-      })) as Produit[];
-
-      const magasins = normalizeApiResponse(magasinsResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        createdAt: new Date(item.created_at || Date.now())
-      })) as Magasin[];
-
-      const utilisateurs = normalizeApiResponse(utilisateursResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        createdAt: new Date(item.date_joined || item.created_at || Date.now())
-      })) as User[];
-
-      const stocks = normalizeApiResponse(stocksResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        quantite: safeNumber(item.quantite, 0),
-        produit_id: Number(item.produit_id || item.product || item.produit),
-        magasin_id: Number(item.magasin_id || item.magasin || item.store),
-        updatedAt: new Date(item.updated_at || item.updatedAt || Date.now())
-      })).filter(stock => 
-        !isNaN(stock.produit_id) && 
-        !isNaN(stock.magasin_id) && 
-        stock.produit_id > 0 && 
-        stock.magasin_id > 0
-      ) as Stock[];
-
-      let alertesCount = 0;
-      let valeurTotale = 0;
-      const stockDataMap = new Map<string, number>();
-
-      const produitsMap = new Map(produits.map(p => [Number(p.id), p]));
-      const magasinsMap = new Map(magasins.map(m => [Number(m.id), m]));
-
-      stocks.forEach((stock) => {
-        const produit = produitsMap.get(Number(stock.produit_id));
-        const magasin = magasinsMap.get(Number(stock.magasin_id));
-        
-        if (produit && magasin) {
-          const quantite = safeNumber(stock.quantite, 0);
-          const prixUnitaire = safeNumber(produit.prix_unitaire, 0);
-          const seuilAlerte = safeNumber(produit.seuil_alerte, 0);
-          
-          if (quantite <= seuilAlerte) {
-            alertesCount++;
-          }
-          
-          const valeurStock = quantite * prixUnitaire;
-          valeurTotale += valeurStock;
-          
-          const magasinNom = magasin.nom || `Magasin ${magasin.id}`;
-          const currentQuantite = stockDataMap.get(magasinNom) || 0;
-          stockDataMap.set(magasinNom, currentQuantite + quantite);
-        }
-      });
-
-      const stockChartData = Array.from(stockDataMap.entries())
-        .map(([nom, quantite]) => ({
-          magasin: nom,
-          quantite: safeNumber(quantite, 0)
-        }))
-        .sort((a, b) => b.quantite - a.quantite);
+      const stockChartData = (dashboard.par_magasin || []).map((ligne: any) => ({
+        magasin: ligne.magasin_nom || `Magasin ${ligne.magasin_id}`,
+        quantite: safeNumber(ligne.quantite, 0)
+      }));
 
       const finalStats = {
-        totalProduits: produits.length,
-        totalMagasins: magasins.length,
-        totalUtilisateurs: utilisateurs.length,
-        alertesStock: alertesCount,
-        valeurTotaleStock: safeNumber(valeurTotale, 0)
+        totalProduits: safeNumber(dashboard.total_produits, 0),
+        totalMagasins: safeNumber(dashboard.total_magasins, 0),
+        totalUtilisateurs: safeNumber(dashboard.total_utilisateurs, 0),
+        alertesStock: safeNumber(dashboard.alertes, 0),
+        valeurTotaleStock: safeNumber(dashboard.valeur_totale, 0)
       };
 
       setStats(finalStats);
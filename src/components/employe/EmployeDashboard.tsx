@@ -147,7 +147,7 @@ export const EmployeDashboard: React.FC = () => {
         type: 'arrivee'
       };
 
-      await attendanceService.createAttendance(pointageData);
+      await attendanceService.pointer(pointageData);
 
       setPointageMessage('Pointage enregistré avec succès !');
       
@@ -227,7 +227,7 @@ export const PointagePage: React.FC = () => {
       console.log('=== ENVOI POINTAGE ===');
       console.log('Données:', pointageData);
       
-      const result = await attendanceService.createAttendance(pointageData);
+      const result = await attendanceService.pointer(pointageData);
       console.log('✅ Pointage enregistré:', result);
       
       const messages = {
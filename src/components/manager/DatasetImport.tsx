@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { Upload, Download, FileText, AlertCircle, CheckCircle, X, Package, Truck, Database } from 'lucide-react';
-import { productsService, suppliersService, stockService } from '../../services/api';
+import { productsService } from '../../services/api';
 import { useAuth } from '../../hooks/useAuth';
 import toast from 'react-hot-toast';
 
@@ -197,102 +197,29 @@ export const DatasetImport: React.FC<DatasetImportProps> = ({ isOpen, onClose, o
     if (!user?.magasin_id) {
       throw new Error('Magasin non défini pour ce manager');
     }
+    if (!file) {
+      throw new Error('Aucun fichier sélectionné');
+    }
+
+    // Import complet côté serveur en une seule requête
+    const rapport = await productsService.importDataset(file);
+    const erreurs: string[] = rapport.erreurs.map((erreur: { ligne: number; erreurs: Record<string, string> }) =>
+      `Ligne ${erreur.ligne}: ${Object.entries(erreur.erreurs).map(([champ, message]) => `${champ} ${message}`).join(', ')}`
+    );
 
     const result: ImportResult = {
-      success: true,
-      message: '',
+      success: rapport.importees > 0,
+      message: `Import terminé: ${rapport.fournisseurs_crees} fournisseurs, ${rapport.produits_crees} produits créés, ${rapport.produits_mis_a_jour} mis à jour, ${rapport.stocks_importes} stocks importés`,
       details: {
-        fournisseurs_crees: 0,
-        produits_crees: 0,
-        stocks_crees: 0,
-        erreurs: []
+        fournisseurs_crees: rapport.fournisseurs_crees,
+        produits_crees: rapport.produits_crees,
+        stocks_crees: rapport.stocks_importes,
+        erreurs
       }
     };
 
-    // Map pour éviter les doublons de fournisseurs
-    const fournisseursMap = new Map<string, string>();
-
-    for (const row of preview) {
-      try {
-        // 1. Créer ou récupérer le fournisseur
-        let fournisseurId = fournisseursMap.get(row.fournisseur_nom);
-        
-        if (!fournisseurId) {
-          try {
-            const fournisseurData = {
-              nom: row.fournisseur_nom,
-              adresse: row.fournisseur_adresse,
-              contact: row.fournisseur_contact,
-              magasin: user.magasin_id
-            };
-
-            const fournisseur = await suppliersService.createSupplier(fournisseurData);
-            fournisseurId = fournisseur.id;
-            fournisseursMap.set(row.fournisseur_nom, fournisseurId);
-            result.details!.fournisseurs_crees++;
-          } catch (error: any) {
-            // Si le fournisseur existe déjà, on continue
-            if (error.message?.includes('existe déjà') || error.message?.includes('unique')) {
-              console.warn(`Fournisseur ${row.fournisseur_nom} existe déjà`);
-            } else {
-              result.details!.erreurs.push(`Erreur fournisseur ${row.fournisseur_nom}: ${error.message}`);
-              continue;
-            }
-          }
-        }
-
-        // 2. Créer le produit
-        try {
-          const produitData = {
-            nom: row.produit_nom,
-            reference: row.produit_reference,
-            categorie: row.produit_categorie,
-            prix_unitaire: row.produit_prix_unitaire,
-            seuil_alerte: row.produit_seuil_alerte,
-            fournisseur: fournisseurId,
-            magasin: user.magasin_id
-          };
-
-          const produit = await productsService.createProduct(produitData);
-          result.details!.produits_crees++;
-
-          // 3. Créer le stock
-          if (row.stock_quantite > 0) {
-            try {
-              const stockData = {
-                produit: produit.id,
-                magasin: user.magasin_id,
-                quantite: row.stock_quantite
-              };
-
-              await stockService.createStock(stockData);
-              result.details!.stocks_crees++;
-            } catch (error: any) {
-              result.details!.erreurs.push(`Erreur stock pour ${row.produit_nom}: ${error.message}`);
-            }
-          }
-
-        } catch (error: any) {
-          if (error.message?.includes('existe déjà') || error.message?.includes('unique')) {
-            result.details!.erreurs.push(`Produit ${row.produit_reference} existe déjà`);
-          } else {
-            result.details!.erreurs.push(`Erreur produit ${row.produit_nom}: ${error.message}`);
-          }
-        }
-
-      } catch (error: any) {
-        result.details!.erreurs.push(`Erreur ligne ${row.produit_nom}: ${error.message}`);
-      }
-    }
-
-    // Construire le message de résultat
-    const { fournisseurs_crees, produits_crees, stocks_crees, erreurs } = result.details!;
-    
-    result.message = `Import terminé: ${fournisseurs_crees} fournisseurs, ${produits_crees} produits, ${stocks_crees} stocks créés`;
-    
     if (erreurs.length > 0) {
       result.message += `. ${erreurs.length} erreurs rencontrées.`;
-      result.success = erreurs.length < preview.length; // Succès partiel si pas toutes les lignes en erreur
     }
 
     return result;
@@ -1,10 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell, LineChart, Line } from 'recharts';
 import { Package, Store, Users, AlertTriangle, TrendingUp, DollarSign, Calendar } from 'lucide-react';
-import { productsService, storesService, authService, stockService } from '../../services/api';
-import { normalizeApiResponse } from '../../config/api';
+import { stockService } from '../../services/api';
 import { useAuth } from '../../hooks/useAuth';
-import { Produit, Stock, User } from '../../types';
 import { safeNumber } from '../../utils/numbers';
 import ManagerNotifications from './ManagerNotifications';
 
@@ -45,96 +43,20 @@ export const ManagerDashboard: React.FC = () => {
       setLoading(true);
       setError(null);
       
-      const results = await Promise.allSettled([
-        productsService.getProducts(),
-        authService.getUsers(),
-        stockService.getStocks(),
-        storesService.getStores()
-      ]);
+      // Indicateurs du magasin calculés côté serveur (agrégats SQL mis en cache)
+      const dashboard = await stockService.getDashboard();
+      setMagasinNom(dashboard.magasin_nom || 'Magasin inconnu');
 
-      const produitsResponse = results[0].status === 'fulfilled' ? results[0].value : [];
-      const utilisateursResponse = results[1].status === 'fulfilled' ? results[1].value : [];
-      const stocksResponse = results[2].status === 'fulfilled' ? results[2].value : [];
-      const magasinsResponse = results[3].status === 'fulfilled' ? results[3].value : [];
-
-      // Récupérer le nom du magasin
-      const magasins = normalizeApiResponse(magasinsResponse || []);
-      const currentMagasin = magasins.find((m: any) => m.id.toString() === user.magasin_id?.toString());
-      setMagasinNom(currentMagasin?.nom || 'Magasin inconnu');
-
-      const produits = normalizeApiResponse(produitsResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        prix_unitaire: safeNumber(item.prix_unitaire, 0),
-        seuil_alerte: safeNumber(item.seuil_alerte, 0),
-        createdAt: new Date(item.created_at || Date.now())
-      })) as Produit[];
-
-      const utilisateurs = normalizeApiResponse(utilisateursResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        createdAt: new Date(item.date_joined || item.created_at || Date.now())
-      })) as User[];
-
-      const stocks = normalizeApiResponse(stocksResponse || []).map((item: any) => ({
-        ...item,
-        id: Number(item.id),
-        quantite: safeNumber(item.quantite, 0),
-        produit_id: Number(item.produit_id || item.product || item.produit),
-        magasin_id: Number(item.magasin_id || item.magasin || item.store),
-        updatedAt: new Date(item.updated_at || item.updatedAt || Date.now())
-      })).filter(stock => 
-        !isNaN(stock.produit_id) && 
-        !isNaN(stock.magasin_id) && 
-        stock.produit_id > 0 && 
-        stock.magasin_id > 0 &&
-        Number(stock.magasin_id) === Number(user.magasin_id)
-      ) as Stock[];
-
-      // Employés du magasin
-      const employesDuMagasin = utilisateurs.filter(u => 
-        u.role === 'employe' && u.magasin_id === user.magasin_id
-      );
-
-      let alertesCount = 0;
-      let valeurTotale = 0;
-      const stockDataMap = new Map<string, number>();
-
-      const produitsMap = new Map(produits.map(p => [Number(p.id), p]));
-
-      stocks.forEach((stock) => {
-        const produit = produitsMap.get(Number(stock.produit_id));
-        
-        if (produit) {
-          const quantite = safeNumber(stock.quantite, 0);
-          const prixUnitaire = safeNumber(produit.prix_unitaire, 0);
-          const seuilAlerte = safeNumber(produit.seuil_alerte, 0);
-          
-          if (quantite <= seuilAlerte) {
-            alertesCount++;
-          }
-          
-          const valeurStock = quantite * prixUnitaire;
-          valeurTotale += valeurStock;
-          
-          const categorie = produit.categorie || 'Autre';
-          const currentQuantite = stockDataMap.get(categorie) || 0;
-          stockDataMap.set(categorie, currentQuantite + quantite);
-        }
-      });
-
-      const stockChartData = Array.from(stockDataMap.entries())
-        .map(([categorie, quantite]) => ({
-          categorie,
-          quantite: safeNumber(quantite, 0)
-        }))
-        .sort((a, b) => b.quantite - a.quantite);
+      const stockChartData = (dashboard.par_categorie || []).map((ligne: any) => ({
+        categorie: ligne.categorie || 'Autre',
+        quantite: safeNumber(ligne.quantite, 0)
+      }));
 
       const finalStats = {
-        totalProduits: stocks.length,
-        totalEmployes: employesDuMagasin.length,
-        alertesStock: alertesCount,
-        valeurTotaleStock: safeNumber(valeurTotale, 0)
+        totalProduits: safeNumber(dashboard.total_stocks, 0),
+        totalEmployes: safeNumber(dashboard.total_employes, 0),
+        alertesStock: safeNumber(dashboard.alertes, 0),
+        valeurTotaleStock: safeNumber(dashboard.valeur_totale, 0)
       };
 
       setStats(finalStats);
@@ -24,7 +24,7 @@ interface Mouvement {
 interface Notification {
   id: number;
   destinataire: number;
-  mouvement: Mouvement;
+  mouvement: Mouvement | null;
   type: string;
   message: string;
   date: string;
@@ -68,14 +68,16 @@ const ManagerNotifications: React.FC = () => {
   }, []);
 
   const handleAction = async (notif: Notification, action: 'accepte' | 'rejete') => {
+    const mouvement = notif.mouvement;
+    if (!mouvement) return;
     Modal.confirm({
       title: action === 'accepte' ? 'Valider ce mouvement ?' : 'Rejeter ce mouvement ?',
-      content: `Produit : ${notif.mouvement.produit_id}\nQuantité : ${notif.mouvement.quantite}\nMotif : ${notif.mouvement.motif}`,
+      content: `Produit : ${mouvement.produit_id}\nQuantité : ${mouvement.quantite}\nMotif : ${mouvement.motif}`,
       onOk: async () => {
         try {
           const token = localStorage.getItem('token');
           await axios.post(
-            `${API_BASE}/stock/mouvements/${notif.mouvement.id}/valider/`,
+            `${API_BASE}/stock/mouvements/${mouvement.id}/valider/`,
             { action },
             { headers: { Authorization: `Bearer ${token}` } }
           );
@@ -115,7 +117,7 @@ const ManagerNotifications: React.FC = () => {
           renderItem={notif => (
             <List.Item
               actions={[
-                notif.mouvement.statut === 'attente' && (
+                notif.mouvement?.statut === 'attente' && (
                   <>
                     <Button
                       type="primary"
@@ -130,11 +132,13 @@ const ManagerNotifications: React.FC = () => {
                     >Rejeter</Button>
                   </>
                 ),
-                <Button
-                  icon={<FileTextOutlined />}
-                  onClick={() => setModal({visible: true, justificatif: notif.mouvement.justificatif_url})}
-                  disabled={!notif.mouvement.justificatif_url}
-                >Justificatif</Button>,
+                notif.mouvement && (
+                  <Button
+                    icon={<FileTextOutlined />}
+                    onClick={() => setModal({visible: true, justificatif: notif.mouvement?.justificatif_url})}
+                    disabled={!notif.mouvement.justificatif_url}
+                  >Justificatif</Button>
+                ),
                 !notif.lu && (
                   <Button onClick={() => markAsRead(notif.id)} type="default">Marquer comme lue</Button>
                 )
@@ -143,16 +147,22 @@ const ManagerNotifications: React.FC = () => {
             >
               <List.Item.Meta
                 title={<>
-                  <Tag color={statusColor(notif.mouvement.statut)}>{notif.mouvement.statut.toUpperCase()}</Tag>
+                  {notif.mouvement && (
+                    <Tag color={statusColor(notif.mouvement.statut)}>{notif.mouvement.statut.toUpperCase()}</Tag>
+                  )}
                   <Text strong>{notif.message}</Text>
                 </>}
                 description={
-                  <>
-                    <div>Produit : <b>{notif.mouvement.produit_id}</b></div>
-                    <div>Quantité : <b>{notif.mouvement.quantite}</b> | Motif : <b>{notif.mouvement.motif}</b></div>
-                    <div>Employé : <b>{notif.mouvement.user_id}</b></div>
-                    <div>Date : {new Date(notif.mouvement.date).toLocaleString()}</div>
-                  </>
+                  notif.mouvement ? (
+                    <>
+                      <div>Produit : <b>{notif.mouvement.produit_id}</b></div>
+                      <div>Quantité : <b>{notif.mouvement.quantite}</b> | Motif : <b>{notif.mouvement.motif}</b></div>
+                      <div>Employé : <b>{notif.mouvement.user_id}</b></div>
+                      <div>Date : {new Date(notif.mouvement.date).toLocaleString()}</div>
+                    </>
+                  ) : (
+                    <div>Date : {new Date(notif.date).toLocaleString()}</div>
+                  )
                 }
               />
             </List.Item>
@@ -143,6 +143,7 @@ export const endpoints = {
   
   // Products
   products: '/products/',
+  productsImport: '/products/import/',
   
   // Stores
   stores: '/stores/',
@@ -154,11 +155,21 @@ export const endpoints = {
   stocks: '/stock/stocks/',
   movements: '/stock/mouvements/',
   orders: '/stock/commandes/',
+  dashboard: '/stock/dashboard/',
+  stockAlerts: '/stock/alerts/',
+  notifications: '/stock/notifications/',
+  notificationsFeed: '/stock/notifications/feed/',
+  notificationsUnreadCount: '/stock/notifications/unread_count/',
+  notificationsMarkAllRead: '/stock/notifications/mark-all-read/',
   
   // Attendance
   attendance: '/attendance/presences/',
+  attendancePointage: '/attendance/pointage/',
   plannings: '/planning/plannings/',
   
   // Messaging
   messages: '/messaging/messages/',
+  conversations: '/messaging/conversations/',
+  eventsStream: '/messaging/stream/',
+  eventsTicket: '/messaging/stream/ticket/',
 };
\ No newline at end of file
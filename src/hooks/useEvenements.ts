@@ -0,0 +1,95 @@
+import { useEffect, useRef } from 'react';
+import { apiConfig, apiRequest, endpoints } from '../config/api';
+
+export type TypeEvenement = 'notification' | 'message' | 'lecture';
+type Abonne = (type: TypeEvenement, donnees: any) => void;
+
+const DELAI_MIN_MS = 3000;
+const DELAI_MAX_MS = 60000;
+
+// Une seule connexion EventSource par onglet, partagée par tous les composants
+const abonnes = new Set<Abonne>();
+let source: EventSource | null = null;
+// Curseur 'n-m' du dernier événement reçu, repris à chaque réouverture
+let dernierId: string | null = null;
+let delai = DELAI_MIN_MS;
+let relance: ReturnType<typeof setTimeout> | null = null;
+// Incrémenté à chaque fermeture : une ouverture en cours devenue inutile s'abandonne
+let generation = 0;
+
+const planifier = () => {
+  const attendue = generation;
+  relance = setTimeout(() => {
+    relance = null;
+    if (attendue === generation) ouvrir();
+  }, delai);
+  delai = Math.min(delai * 2, DELAI_MAX_MS);
+};
+
+const ouvrir = async () => {
+  if (!localStorage.getItem('access_token')) return;
+  const attendue = generation;
+  let ticket: string;
+  try {
+    // Ticket court dédié au flux : le JWT ne passe jamais dans l'URL.
+    // apiRequest rafraîchit l'access token expiré.
+    const reponse = await apiRequest(endpoints.eventsTicket, { method: 'POST' });
+    ticket = reponse.ticket;
+    dernierId = dernierId ?? reponse.curseur;
+  } catch {
+    if (attendue === generation) planifier();
+    return;
+  }
+  if (attendue !== generation || source) return;
+
+  const params = new URLSearchParams({ ticket });
+  if (dernierId) params.set('since', dernierId);
+  const ouverte = new EventSource(`${apiConfig.baseURL}${endpoints.eventsStream}?${params}`);
+  source = ouverte;
+  ouverte.onopen = () => {
+    delai = DELAI_MIN_MS;
+  };
+  (['notification', 'message', 'lecture'] as TypeEvenement[]).forEach(type => {
+    ouverte.addEventListener(type, (event) => {
+      const message = event as MessageEvent;
+      if (message.lastEventId) dernierId = message.lastEventId;
+      const donnees = JSON.parse(message.data);
+      abonnes.forEach(abonne => abonne(type, donnees));
+    });
+  });
+  // EventSource se reconnecte seul après une fermeture du serveur, avec le
+  // même ticket ; une fois celui-ci expiré (401) ou le serveur saturé (503),
+  // il abandonne : on rouvre alors avec un nouveau ticket.
+  ouverte.onerror = () => {
+    if (ouverte.readyState !== EventSource.CLOSED || source !== ouverte) return;
+    source = null;
+    planifier();
+  };
+};
+
+const fermer = () => {
+  generation += 1;
+  if (relance) clearTimeout(relance);
+  relance = null;
+  source?.close();
+  source = null;
+  dernierId = null;
+  delai = DELAI_MIN_MS;
+};
+
+export const useEvenements = (onEvenement: Abonne, actif = true) => {
+  const callback = useRef(onEvenement);
+  callback.current = onEvenement;
+
+  useEffect(() => {
+    if (!actif) return;
+    const abonne: Abonne = (type, donnees) => callback.current(type, donnees);
+    abonnes.add(abonne);
+    if (abonnes.size === 1) ouvrir();
+
+    return () => {
+      abonnes.delete(abonne);
+      if (abonnes.size === 0) fermer();
+    };
+  }, [actif]);
+};
@@ -192,6 +192,26 @@ export const productsService = {
     });
   },
   
+  importDataset: (file: File) => {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    // Rapport par ligne renvoyé aussi en cas d'import partiel (207) ou sans ligne valide (400)
+    return fetch(`http://localhost:8000/api${endpoints.productsImport}`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+      },
+      body: formData,
+    }).then(async response => {
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok && !Array.isArray(data.erreurs)) {
+        throw new Error(data.error || data.message || `Erreur HTTP: ${response.status}`);
+      }
+      return data;
+    });
+  },
+  
   updateProduct: (id: string, productData: any) => {
     const formData = new FormData();
     
@@ -714,6 +734,52 @@ export const stockService = {
     }
   },
   
+  getDashboard: async () => {
+    try {
+      return await apiRequest(endpoints.dashboard);
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  getAlerts: async (params: { type?: 'rupture'; page?: number } = {}) => {
+    try {
+      const query = new URLSearchParams(params as Record<string, string>).toString();
+      return await apiRequest(`${endpoints.stockAlerts}${query ? `?${query}` : ''}`);
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  getNotificationFeed: async (params: { lu?: boolean; page_size?: number } = {}) => {
+    try {
+      const query = new URLSearchParams(
+        Object.entries(params).map(([key, value]) => [key, String(value)])
+      ).toString();
+      return await apiRequest(`${endpoints.notificationsFeed}${query ? `?${query}` : ''}`);
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  getUnreadNotificationCount: async () => {
+    try {
+      const response = await apiRequest(endpoints.notificationsUnreadCount);
+      return response.unread_count as number;
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  markNotificationRead: (id: string) =>
+    apiRequest(endpoints.notifications, {
+      method: 'POST',
+      body: JSON.stringify({ notification_id: id }),
+    }),
+  
+  markAllNotificationsRead: () =>
+    apiRequest(endpoints.notificationsMarkAllRead, { method: 'POST' }),
+  
   createMovement: async (movementData: any) => {
     try {
       const response = await apiRequest(endpoints.movements, {
@@ -814,6 +880,14 @@ export const stockService = {
     }
   },
      
+  // Pointage arrivée / pause / fin de pause / départ (transition côté serveur)
+  pointer: async (pointageData: { type: string; latitude: number; longitude: number; date_pointage?: string }) => {
+    return await apiRequest(endpoints.attendancePointage, {
+      method: 'POST',
+      body: JSON.stringify(pointageData),
+    });
+  },
+     
   updateAttendance: async (id: string, attendanceData: any) => {
     try {
       console.log('=== API: Mise à jour présence ===');
@@ -854,6 +928,37 @@ export const messagingService = {
     }
   },
   
+  getConversations: async () => {
+    try {
+      return await apiRequest(endpoints.conversations);
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  getConversationMessages: async (peerId: string, cursorUrl?: string) => {
+    try {
+      // cursorUrl : lien 'next' renvoyé par la page précédente
+      const endpoint = cursorUrl
+        ? cursorUrl.replace(/^.*\/api/, '')
+        : `${endpoints.conversations}${peerId}/messages/`;
+      return await apiRequest(endpoint);
+    } catch (error) {
+      throw error;
+    }
+  },
+  
+  markConversationRead: async (peerId: string, upToId?: string) => {
+    try {
+      return await apiRequest(`${endpoints.conversations}${peerId}/read/`, {
+        method: 'POST',
+        body: JSON.stringify(upToId ? { jusqu_a: upToId } : {}),
+      });
+    } catch (error) {
+      throw error;
+    }
+  },
+  
   createMessage: async (messageData: any) => {
     try {
       const response = await apiRequest(endpoints.messages, {